@@ -0,0 +1,133 @@
+"""
+Benchmark: vectorized sparse co-occurrence engine vs. the original dict loop.
+
+Both implementations receive the same pre-tokenized documents, read from the
+token cache built by the analysis scripts, so only the counting and the
+conversion to the ``word1, word2, count`` table are timed. The benchmark runs
+on the real corpus and on a synthetic corpus ``--scale`` times larger, and
+checks that both implementations produce the same table.
+
+Usage (from the repository root, after running python -m eth_discourse cooccurrences):
+
+    python benchmarks/bench_cooccurrences.py [--scale 50] [--skip-legacy]
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import time
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from eth_discourse.cooccurrence_engine import CooccurrenceCounter, cooccurrence_frame  # noqa: E402
+from eth_discourse.token_store import open_cached_store  # noqa: E402
+
+CACHE_DIR = './data/token_cache/'
+WINDOW_SIZE = 5
+SPAN_LENGTH = 50
+
+
+# --- ORIGINAL IMPLEMENTATION ---
+
+def legacy_cooccurrences(documents, window_size):
+    cooccurrence_counts = defaultdict(int)
+    for tokens in documents:
+        for i in range(len(tokens)):
+            window = tokens[i:i+window_size]
+            for pair in itertools.combinations(window, 2):
+                if pair[0] != pair[1]:
+                    pair_sorted = tuple(sorted(pair))
+                    cooccurrence_counts[pair_sorted] += 1
+
+    data = [{'word1': pair[0], 'word2': pair[1], 'count': count} for pair, count in cooccurrence_counts.items()]
+    df = pd.DataFrame(data)
+    df.sort_values(by=['count', 'word1', 'word2'], ascending=[False, True, True], inplace=True)
+    return df
+
+
+# --- VECTORIZED ENGINE ---
+
+def engine_cooccurrences(documents, vocabulary, ranks, window_size):
+    counter = CooccurrenceCounter(len(vocabulary), window_size, ranks)
+    for ids in documents:
+        counter.add(ids)
+    return cooccurrence_frame(counter.result(), vocabulary, ranks)
+
+
+# --- SYNTHETIC CORPUS ---
+
+def synthetic_corpus(documents, scale, seed=0):
+    """
+    Corpus ``scale`` times larger than ``documents``, built from random spans.
+
+    Every synthetic document has the length of a real one and is a sequence of
+    ``SPAN_LENGTH``-token spans copied from random real documents, which keeps
+    realistic local word order while creating new pairs at span boundaries.
+    """
+    rng = np.random.default_rng(seed)
+    sources = [ids for ids in documents if len(ids) > SPAN_LENGTH]
+    synthetic = []
+    for _ in range(scale):
+        for ids in documents:
+            spans = []
+            remaining = len(ids)
+            while remaining > 0:
+                source = sources[rng.integers(len(sources))]
+                start = rng.integers(len(source) - SPAN_LENGTH + 1)
+                spans.append(source[start:start + min(SPAN_LENGTH, remaining)])
+                remaining -= SPAN_LENGTH
+            synthetic.append(np.concatenate(spans) if spans else ids)
+    return synthetic
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def run(name, id_documents, vocabulary, ranks, skip_legacy):
+    tokens = sum(len(ids) for ids in id_documents)
+    print(f"\n{name}: {len(id_documents)} documents, {tokens:,} tokens")
+
+    engine_df, engine_time = timed(engine_cooccurrences, id_documents, vocabulary, ranks, WINDOW_SIZE)
+    print(f"  engine : {engine_time:8.2f} s  ({tokens / engine_time:,.0f} tokens/s, {len(engine_df):,} pairs)")
+
+    if skip_legacy:
+        return
+    word_documents = [[vocabulary[i] for i in ids.tolist()] for ids in id_documents]
+    legacy_df, legacy_time = timed(legacy_cooccurrences, word_documents, WINDOW_SIZE)
+    print(f"  legacy : {legacy_time:8.2f} s  ({tokens / legacy_time:,.0f} tokens/s, {len(legacy_df):,} pairs)")
+    print(f"  speedup: {legacy_time / engine_time:8.1f} x")
+
+    identical = legacy_df.reset_index(drop=True).equals(engine_df.reset_index(drop=True))
+    print(f"  identical output: {identical}")
+    if not identical:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--scale', type=int, default=50, help="size of the synthetic corpus (x real corpus)")
+    parser.add_argument('--skip-legacy', action='store_true', help="only time the vectorized engine")
+    args = parser.parse_args()
+
+    store = open_cached_store(args.cache_dir)
+    vocabulary = store.vocabulary_array
+    ranks = store.word_ranks()
+    documents = [np.asarray(store.token_ids(filename)) for filename in store.documents]
+
+    run("Real corpus", documents, vocabulary, ranks, args.skip_legacy)
+    if args.scale > 1:
+        run(f"Synthetic corpus ({args.scale}x)", synthetic_corpus(documents, args.scale),
+            vocabulary, ranks, args.skip_legacy)
+
+
+if __name__ == '__main__':
+    main()
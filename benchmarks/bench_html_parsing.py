@@ -0,0 +1,113 @@
+"""
+Benchmark of the article parsing paths of the blog extractor.
+
+Parses saved HTML pages with the original path of
+``EthereumBlogExtractor.parse_article`` (full ``html.parser`` tree) and with
+the fast path (only ``<h1>``, ``<article>`` and ``<main>`` built, lxml when
+installed), plus the two intermediate combinations. It reports pages/sec and
+MB/sec for each, then checks that both paths return the same fields on every
+page.
+
+Pages come from a directory written by
+``corpus_documentation/local_blog_server.py`` (``record`` or ``fixtures``);
+without ``--pages``, fixtures are generated from data/corpus_raw in a
+temporary directory.
+
+Usage (from the repository root):
+
+    python benchmarks/bench_html_parsing.py [--pages DIR] [--limit 100] [--repeat 3]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'corpus_documentation'))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+import ethereum_blog_extractor as extractor_module  # noqa: E402
+import local_blog_server  # noqa: E402
+
+CORPUS_DIR = './data/corpus_raw'
+BASE_URL = 'https://blog.ethereum.org'
+
+
+def load_pages(directory):
+    """(url, html bytes) of every saved article page, in URL order."""
+    pages = []
+    for root, _, filenames in os.walk(directory):
+        for filename in filenames:
+            if filename.endswith('.html'):
+                path = os.path.join(root, filename)
+                url_path = os.path.relpath(path, directory)[:-len('.html')].replace(os.sep, '/')
+                with open(path, 'rb') as f:
+                    pages.append((f"{BASE_URL}/{url_path}", f.read()))
+    return sorted(pages)
+
+
+def parsing_paths(extractor):
+    """(name, function(url, html)) pairs, from the original path to the new one."""
+    def strained(parser):
+        return lambda url, html: extractor.parse_fields(
+            BeautifulSoup(html, parser, parse_only=extractor_module.ARTICLE_PARTS))
+
+    return [
+        ('html.parser, full page (old)', lambda url, html: extractor.parse_article(url, html, fast=False)),
+        ('lxml, full page', lambda url, html: extractor.parse_fields(BeautifulSoup(html, 'lxml'))),
+        ('html.parser, article parts', strained('html.parser')),
+        (f'{extractor_module.FAST_PARSER}, article parts (new)', extractor.parse_article),
+    ]
+
+
+def measure(function, pages, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for url, html in pages:
+            function(url, html)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def without_timestamp(article):
+    return {key: value for key, value in article.items() if key != 'extraction_metadata'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--pages', default=None, help="directory of saved pages")
+    parser.add_argument('--corpus-dir', default=CORPUS_DIR)
+    parser.add_argument('--limit', type=int, default=None, help="fixtures to generate")
+    parser.add_argument('--repeat', type=int, default=3, help="keep the best of N runs")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = args.pages
+        if directory is None:
+            directory = tmp
+            local_blog_server.build_fixtures(directory, args.corpus_dir, args.limit)
+        pages = load_pages(directory)
+
+    extractor = extractor_module.EthereumBlogExtractor(base_url=BASE_URL)
+    megabytes = sum(len(html) for _, html in pages) / (1024 * 1024)
+    print(f"{len(pages)} pages, {megabytes:.1f} MB\n")
+    print(f"{'path':<36} {'pages/s':>9} {'MB/s':>7}")
+    for name, function in parsing_paths(extractor):
+        elapsed = measure(function, pages, args.repeat)
+        print(f"{name:<36} {len(pages) / elapsed:>9,.0f} {megabytes / elapsed:>7.1f}")
+
+    fallbacks = sum(extractor.parse_fields_fast(html) is None for _, html in pages)
+    identical = sum(
+        without_timestamp(extractor.parse_article(url, html)) ==
+        without_timestamp(extractor.parse_article(url, html, fast=False))
+        for url, html in pages
+    )
+    print(f"\nFast path fell back to the full page on {fallbacks} pages")
+    print(f"Identical fields on {identical}/{len(pages)} pages")
+
+
+if __name__ == '__main__':
+    main()
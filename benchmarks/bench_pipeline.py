@@ -0,0 +1,356 @@
+"""
+Scaled benchmark suite of every pipeline stage on synthetic corpora.
+
+A seeded generator writes corpora shaped like data/corpus_txt (same .txt
+header, same document length distribution) at ``--scales`` times its number
+of documents. Words are drawn from a Zipf distribution (exponent
+``ZIPF_EXPONENT``) whose vocabulary grows with the corpus following Heaps'
+law; the stopwords take the most frequent ranks so the stopword filter works
+as on real text, and sentences end with a period.
+
+Each stage runs in a fresh process (peak RSS is then the stage's own):
+
+    parsing         EthereumBlogExtractor.parse_article on a rendered page per article
+    tokenize        token store build (clean_text_advanced + tokenize_strict)
+    frequencies     word counts + word_frequencies.csv
+    cooccurrences   sparse co-occurrence matrix + association measures + CSV
+    network         backbone extraction, graph build and layout
+    rendering       frequency-charts and network commands
+
+For every scale and stage the suite records wall time, tokens/sec (corpus
+tokens after cleaning / wall time) and peak RSS to ``--output`` (JSON), then
+compares them with ``--baseline``: a stage regresses when it is more than
+``--time-threshold`` slower (and at least ``MIN_SECONDS_DELTA`` slower), or
+uses more than ``--memory-threshold`` more memory. The exit status is 1 on
+any regression. ``--update-baseline`` stores the scales of the run in the
+baseline, keeping its other scales.
+
+Stages after the last one reported are not run. The exact co-occurrence
+matrix needs about 2.4 GB at 10x, so on a machine that cannot hold the 100x
+matrix (about ten times more), record 100x without the stages from
+``cooccurrences`` on. The baseline is only comparable on the machine that
+recorded it: refresh it there whenever a change to the stages is accepted:
+
+    python benchmarks/bench_pipeline.py --scales 1 10 --update-baseline
+    python benchmarks/bench_pipeline.py --scales 100 --stages parsing tokenize frequencies --update-baseline
+
+Usage (from the repository root):
+
+    python benchmarks/bench_pipeline.py [--scales 1 10 100] [--stages tokenize cooccurrences]
+                                        [--update-baseline]
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'corpus_documentation'))
+
+from eth_discourse import corpus_store  # noqa: E402
+from eth_discourse.memory_usage import peak_rss_bytes  # noqa: E402
+from eth_discourse.text_normalization import STOPWORDS_MINIMAL  # noqa: E402
+
+REFERENCE_DIR = './data/corpus_txt'
+BASELINE_FILE = os.path.join(BENCH_DIR, 'baseline_pipeline.json')
+OUTPUT_FILE = './bench_pipeline_results.json'
+
+SCALES = (1, 10, 100)
+STAGES = ('parsing', 'tokenize', 'frequencies', 'cooccurrences', 'network', 'rendering')
+SEED = 20240501
+
+# Synthetic text
+ZIPF_EXPONENT = 1.07
+HEAPS_EXPONENT = 0.5
+SENTENCE_LENGTH = 15
+# Used without a reference corpus: documents and words per document of data/corpus_txt
+REFERENCE_DOCUMENTS = 567
+REFERENCE_WORDS = 1300
+REFERENCE_VOCABULARY = 60_000
+
+# Regression thresholds
+TIME_THRESHOLD = 0.25
+MEMORY_THRESHOLD = 0.20
+MIN_SECONDS_DELTA = 0.1
+
+# Paths inside a workspace, as the commands expect them
+DATA_DIR = './data/corpus_txt'
+CACHE_DIR = './data/token_cache/'
+OUTPUT_DIR = './outputs/'
+WINDOW_SIZE = 5
+
+
+# --- SYNTHETIC CORPUS ---
+
+def reference_shape(reference_dir=REFERENCE_DIR):
+    """Words per document and vocabulary size of the reference corpus."""
+    if not os.path.isdir(reference_dir):
+        return [REFERENCE_WORDS] * REFERENCE_DOCUMENTS, REFERENCE_VOCABULARY
+    lengths, vocabulary = [], set()
+    for article in corpus_store.read_txt_corpus(reference_dir):
+        words = article['content'].lower().split()
+        lengths.append(len(words))
+        vocabulary.update(words)
+    return lengths, len(vocabulary)
+
+
+def synthetic_vocabulary(size, rng):
+    """Stopwords first (most frequent ranks), then distinct pseudo-words of 3 to 11 letters."""
+    words = sorted(STOPWORDS_MINIMAL)
+    seen = set(words)
+    letters = np.array(list('abcdefghijklmnopqrstuvwxyz'))
+    while len(words) < size:
+        for length in rng.integers(3, 12, size=size - len(words)):
+            word = ''.join(rng.choice(letters, size=length))
+            if word not in seen:
+                seen.add(word)
+                words.append(word)
+    return np.array(words[:size], dtype=object)
+
+
+def generate_corpus(directory, scale, seed=SEED, reference_dir=REFERENCE_DIR):
+    """Write ``scale`` times the reference number of documents to ``directory``; returns their count."""
+    rng = np.random.default_rng(seed)
+    lengths, vocabulary_size = reference_shape(reference_dir)
+    vocabulary = synthetic_vocabulary(int(vocabulary_size * scale ** HEAPS_EXPONENT), rng)
+    cumulative = np.cumsum(1.0 / np.arange(1, len(vocabulary) + 1) ** ZIPF_EXPONENT)
+    cumulative /= cumulative[-1]
+
+    os.makedirs(directory, exist_ok=True)
+    documents = len(lengths) * scale
+    for i, length in enumerate(rng.choice(lengths, size=documents)):
+        words = vocabulary[np.searchsorted(cumulative, rng.random(max(int(length), 1)))]
+        words[SENTENCE_LENGTH - 1::SENTENCE_LENGTH] += '.'
+        year, month, day = 2014 + i % 12, 1 + i % 12, 1 + i % 28
+        header = '\\n'.join([
+            f"Titre: Synthetic article {i}",
+            f"Auteur: Author {i % 40}",
+            f"Date: {year}-{month:02d}-{day:02d}",
+            f"URL: https://blog.ethereum.org/{year}/{month:02d}/{day:02d}/synthetic-{i}",
+            "Catégorie: Non catégorisé",
+        ])
+        filename = f"{year}-{month:02d}-{day:02d}-synthetic-{i}.txt"
+        with open(os.path.join(directory, filename), 'w', encoding='utf-8') as f:
+            f.write(f"{header}\\n\\n{'=' * 50}\\n\\n{' '.join(words)}")
+    return documents
+
+
+# --- STAGES (run inside the workspace, in a fresh process) ---
+
+def stage_parsing():
+    # Only parse_article is timed; rendering the page is setup
+    import ethereum_blog_extractor
+    import local_blog_server
+
+    extractor = ethereum_blog_extractor.EthereumBlogExtractor()
+    elapsed = 0.0
+    for article in corpus_store.read_txt_corpus(DATA_DIR):
+        words = article['content'].split(' ')
+        paragraphs = [' '.join(words[i:i + 100]) for i in range(0, len(words), 100)]
+        page = local_blog_server.render_fixture(article['title'], article['author'], article['publication_date'],
+                                                article['category'], paragraphs)
+        start = time.perf_counter()
+        extractor.parse_article(article['url'], page)
+        elapsed += time.perf_counter() - start
+    return elapsed
+
+
+def stage_tokenize():
+    from eth_discourse import text_normalization
+    from eth_discourse.token_store import open_token_store, tokenizer_fingerprint
+
+    open_token_store(DATA_DIR, CACHE_DIR, text_normalization.tokenize_document,
+                     fingerprint=tokenizer_fingerprint(text_normalization))
+
+
+def stage_frequencies():
+    from eth_discourse.extract_word_frequencies import frequency_frame, process_corpus
+    from eth_discourse.token_store import open_cached_store
+
+    store = open_cached_store(CACHE_DIR)
+    counts = process_corpus(store)
+    frequency_frame(store.vocabulary_array, counts, store.word_ranks()).to_csv(
+        os.path.join(OUTPUT_DIR, 'word_frequencies.csv'), index=False)
+
+
+def stage_cooccurrences():
+    from eth_discourse.cooccurrence_engine import cooccurrence_frame, count_cooccurrences
+    from eth_discourse.extract_word_frequencies import process_corpus
+    from eth_discourse.token_store import open_cached_store
+
+    store = open_cached_store(CACHE_DIR)
+    matrix = count_cooccurrences(store, WINDOW_SIZE)
+    cooccurrence_frame(matrix, store.vocabulary_array, store.word_ranks(), process_corpus(store), WINDOW_SIZE).to_csv(
+        os.path.join(OUTPUT_DIR, 'cooccurrence_pairs.csv'), index=False, float_format='%.6g')
+
+
+def stage_network():
+    import networkx as nx
+    import pandas as pd
+    from eth_discourse import visualize_lexical_network as network
+
+    df = pd.read_csv(network.INPUT_FILE, keep_default_na=False)
+    df = network.backbone(df[df['count'] >= network.THRESHOLD], 'disparity')
+    G = nx.Graph()
+    G.add_weighted_edges_from(zip(df['word1'].tolist(), df['word2'].tolist(), df['count'].tolist()))
+    strength = dict(G.degree(weight='weight'))
+    drawn = sorted(G, key=lambda node: (-strength[node], node))[:network.MAX_DRAWN_NODES]
+    network.layout(G.subgraph(drawn), network.LAYOUT_FILE, use_cache=False)
+
+
+def stage_rendering():
+    from eth_discourse.cli import main
+
+    main(['frequency-charts'])
+    # Reuses the layout cached by the network stage
+    main(['network'])
+
+
+STAGE_FUNCTIONS = {
+    'parsing': stage_parsing,
+    'tokenize': stage_tokenize,
+    'frequencies': stage_frequencies,
+    'cooccurrences': stage_cooccurrences,
+    'network': stage_network,
+    'rendering': stage_rendering,
+}
+
+
+def run_stage(stage, workspace):
+    """(seconds, peak RSS bytes) of one stage; a stage may return its own timed seconds."""
+    os.chdir(workspace)
+    with open(os.devnull, 'w') as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            start = time.perf_counter()
+            seconds = STAGE_FUNCTIONS[stage]()
+            elapsed = time.perf_counter() - start
+        finally:
+            sys.stdout = stdout
+    return (elapsed if seconds is None else seconds), peak_rss_bytes()
+
+
+def corpus_tokens(workspace):
+    with open(os.path.join(workspace, CACHE_DIR, 'manifest.json'), 'r', encoding='utf-8') as f:
+        return sum(entry['tokens'] for entry in json.load(f)['documents'].values())
+
+
+def benchmark_scale(scale, stages, workspace):
+    os.makedirs(os.path.join(workspace, OUTPUT_DIR), exist_ok=True)
+    start = time.perf_counter()
+    documents = generate_corpus(os.path.join(workspace, DATA_DIR), scale)
+    print(f"\nscale {scale}x: {documents:,} documents generated in {time.perf_counter() - start:.1f} s")
+
+    results, tokens = {}, None
+    # Stages depend on the outputs of the earlier ones, so they all run in
+    # order up to the last one reported
+    last = max(STAGES.index(stage) for stage in stages)
+    for stage in STAGES[:last + 1]:
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+            seconds, peak = executor.submit(run_stage, stage, workspace).result()
+        if stage == 'tokenize':
+            tokens = corpus_tokens(workspace)
+        if stage not in stages:
+            continue
+        results[stage] = {'seconds': round(seconds, 4), 'peak_rss_mb': round(peak / (1024 * 1024), 1)}
+        print(f"  {stage:<14} {seconds:>9.2f} s  {results[stage]['peak_rss_mb']:>8.1f} MB")
+
+    for result in results.values():
+        result['tokens_per_second'] = round(tokens / result['seconds']) if result['seconds'] else None
+    return {'documents': documents, 'tokens': tokens, 'stages': results}
+
+
+# --- BASELINE COMPARISON ---
+
+def compare(results, baseline, time_threshold=TIME_THRESHOLD, memory_threshold=MEMORY_THRESHOLD):
+    """Regression messages of ``results`` against ``baseline`` (same scales and stages only)."""
+    regressions = []
+    for scale, run in results['scales'].items():
+        reference = baseline.get('scales', {}).get(scale)
+        if reference is None:
+            continue
+        for stage, result in run['stages'].items():
+            before = reference['stages'].get(stage)
+            if before is None:
+                continue
+            slower = result['seconds'] - before['seconds']
+            if slower > MIN_SECONDS_DELTA and result['seconds'] > before['seconds'] * (1 + time_threshold):
+                regressions.append(f"{scale}x {stage}: {before['seconds']:.2f} s -> {result['seconds']:.2f} s "
+                                   f"(+{slower / before['seconds']:.0%})")
+            if result['peak_rss_mb'] > before['peak_rss_mb'] * (1 + memory_threshold):
+                regressions.append(f"{scale}x {stage}: peak RSS {before['peak_rss_mb']:.0f} MB -> "
+                                   f"{result['peak_rss_mb']:.0f} MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=list(SCALES),
+                        help="corpus sizes, in multiples of data/corpus_txt (default: 1 10 100)")
+    parser.add_argument('--stages', nargs='+', default=list(STAGES), choices=STAGES,
+                        help="stages reported (the others still run when later stages need them)")
+    parser.add_argument('--output', default=OUTPUT_FILE, help=f"results file (default: {OUTPUT_FILE})")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="baseline results file")
+    parser.add_argument('--time-threshold', type=float, default=TIME_THRESHOLD,
+                        help=f"relative slowdown reported as a regression (default: {TIME_THRESHOLD})")
+    parser.add_argument('--memory-threshold', type=float, default=MEMORY_THRESHOLD,
+                        help=f"relative peak RSS increase reported as a regression (default: {MEMORY_THRESHOLD})")
+    parser.add_argument('--update-baseline', action='store_true', help="store this run as the baseline")
+    args = parser.parse_args()
+
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'seed': SEED,
+        'scales': {},
+    }
+    for scale in args.scales:
+        workspace = tempfile.mkdtemp(prefix=f'bench_pipeline_{scale}x_')
+        try:
+            results['scales'][str(scale)] = benchmark_scale(scale, set(args.stages), workspace)
+        finally:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=1)
+    print(f"\nResults written to {args.output}")
+
+    if args.update_baseline:
+        baseline = {'scales': {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        results['scales'] = {**baseline['scales'], **results['scales']}
+        results['scales'] = {scale: results['scales'][scale] for scale in sorted(results['scales'], key=int)}
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=1)
+        print(f"Baseline updated: {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline} (run with --update-baseline to create it)")
+        return
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        regressions = compare(results, json.load(f), args.time_threshold, args.memory_threshold)
+    if regressions:
+        print("\nRegressions against the baseline:")
+        print('\n'.join(f"  {line}" for line in regressions))
+        sys.exit(1)
+    print("No regression against the baseline")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Micro-benchmark of the text normalization rules.
+
+Every rule of eth_discourse/text_normalization.py is timed in isolation over the
+documents of the corpus, followed by the full cleaner/tokenizer and the
+original per-script ``clean_text_advanced`` for reference. For each entry the
+benchmark reports documents/sec and MB/sec (UTF-8 input size), and it ends
+with the number of times each rule fired on the corpus.
+
+Usage (from the repository root):
+
+    python benchmarks/bench_text_normalization.py [--data-dir DIR] [--repeat 3]
+"""
+
+import argparse
+import os
+import re
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from eth_discourse import text_normalization as tn  # noqa: E402
+
+DATA_DIR = './data/corpus_txt'
+
+
+# --- ORIGINAL IMPLEMENTATION (before text_normalization.py) ---
+
+def legacy_clean_text_advanced(text):
+    text = text.lower()
+    text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\,]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
+    text = re.sub(r'\\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\\.[A-Z|a-z]{2,}\\b', '', text)
+    text = re.sub(r'0x[a-fA-F0-9]{40,}', '', text)
+    text = text.translate(str.maketrans('', '', string.punctuation))
+    text = re.sub(r'\\d+', '', text)
+    text = re.sub(r'\\s+', ' ', text).strip()
+    return text
+
+
+# --- RULES IN ISOLATION ---
+
+# Rejected alternatives, kept to re-check the choices of text_normalization.py
+COMBINED_STRUCTURED = re.compile('|'.join(f'(?:{pattern.pattern})' for _, _, pattern in tn.STRUCTURED_RULES))
+TRANSLATE_TABLE = str.maketrans('', '', string.punctuation + string.digits)
+
+
+def rule_benchmarks():
+    """(name, takes raw text, function) triples; other functions take lowercased text."""
+    normalizer = tn.TextNormalizer()
+    rules = [('lowercase', True, str.lower)]
+    for name, marker, pattern in tn.STRUCTURED_RULES:
+        rules.append((name, False, lambda text, pattern=pattern: pattern.sub('', text)))
+        rules.append((f'{name} (marker check)', False, lambda text, marker=marker: marker in text))
+    rules += [
+        ('punctuation_digits', False, lambda text: tn.PUNCTUATION_DIGITS.sub('', text)),
+        ('whitespace split', False, str.split),
+        ('stopword filter', False, tn.tokenize_strict),
+        ('clean (full)', True, normalizer.clean),
+        ('tokenize (full)', True, normalizer.tokenize),
+        ('alt: structured alternation', False, lambda text: COMBINED_STRUCTURED.sub('', text)),
+        ('alt: str.translate deletion', False, lambda text: text.translate(TRANSLATE_TABLE)),
+        ('legacy clean_text_advanced', True, legacy_clean_text_advanced),
+        ('legacy clean + tokenize', True, lambda text: tn.tokenize_strict(legacy_clean_text_advanced(text))),
+    ]
+    return rules
+
+
+def measure(function, documents, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in documents:
+            function(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--repeat', type=int, default=3, help="keep the best of N runs")
+    args = parser.parse_args()
+
+    documents = []
+    for filename in sorted(os.listdir(args.data_dir)):
+        if filename.endswith('.txt'):
+            with open(os.path.join(args.data_dir, filename), 'r', encoding='utf-8') as f:
+                documents.append(f.read())
+    megabytes = sum(len(text.encode('utf-8')) for text in documents) / (1024 * 1024)
+    lowered = [text.lower() for text in documents]
+
+    print(f"{len(documents)} documents, {megabytes:.1f} MB\n")
+    print(f"{'rule':<32} {'docs/s':>10} {'MB/s':>9}")
+    for name, raw_input, function in rule_benchmarks():
+        elapsed = measure(function, documents if raw_input else lowered, args.repeat)
+        print(f"{name:<32} {len(documents) / elapsed:>10,.0f} {megabytes / elapsed:>9.1f}")
+
+    normalizer = tn.TextNormalizer()
+    for text in documents:
+        normalizer.tokenize(text)
+    print("\nRule hits on the corpus:")
+    for name in [rule[0] for rule in tn.STRUCTURED_RULES] + ['punctuation_digits']:
+        print(f"  {name:<20} {normalizer.hits[name]:>10,}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+TÉLÉCHARGEMENT CONCURRENT ET RESPECTUEUX DU SERVEUR
+
+Ce module regroupe la partie « réseau » de l'extracteur :
+
+- TokenBucket : limiteur de débit « seau à jetons ». Chaque requête consomme
+  un jeton, les jetons se rechargent à vitesse constante. Un seau par hôte
+  garantit qu'on ne dépasse jamais N requêtes par seconde sur un même site,
+  quel que soit le nombre de threads.
+- PoliteFetcher : une session HTTP partagée (pool de connexions réutilisées),
+  le limiteur par hôte, et de nouvelles tentatives avec attente exponentielle
+  qui respectent max_retries et l'en-tête Retry-After envoyé par le serveur.
+
+Le nombre de téléchargements simultanés est borné par le pool de threads
+de l'appelant (voir EthereumBlogExtractor.extract_all_articles).
+"""
+
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Codes HTTP pour lesquels une nouvelle tentative a du sens
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+def parse_retry_after(value):
+    """
+    Convertit un en-tête Retry-After en nombre de secondes
+
+    L'en-tête peut contenir un nombre de secondes ("120") ou une date HTTP
+    ("Wed, 21 Oct 2015 07:28:00 GMT").
+
+    Returns:
+        float: secondes à attendre, ou None si l'en-tête est absent/invalide
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """
+    Limiteur de débit « seau à jetons », partagé entre threads
+
+    Args:
+        rate (float): jetons ajoutés par seconde (= requêtes par seconde)
+        capacity (float): nombre maximal de jetons (= rafale autorisée)
+    """
+
+    def __init__(self, rate, capacity=1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Bloque jusqu'à ce qu'un jeton soit disponible, puis le consomme"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now >= self.blocked_until:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+                else:
+                    wait = self.blocked_until - now
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Suspend toutes les requêtes vers l'hôte (utilisé pour Retry-After)"""
+        with self.lock:
+            now = time.monotonic()
+            self.blocked_until = max(self.blocked_until, now + seconds)
+            self.tokens = 0.0
+            self.updated = max(now, self.blocked_until)
+
+
+class PoliteFetcher:
+    """
+    Client HTTP partagé par tous les threads de l'extracteur
+
+    Args:
+        requests_per_second (float): débit maximal par hôte
+        max_retries (int): nombre de nouvelles tentatives après un échec
+        timeout (float): timeout par requête en secondes
+        max_connections (int): taille du pool de connexions par hôte
+        backoff_base (float): attente (secondes) avant la première nouvelle tentative
+        backoff_max (float): attente maximale entre deux tentatives
+    """
+
+    def __init__(self, requests_per_second=1.0, max_retries=3, timeout=30,
+                 max_connections=8, backoff_base=1.0, backoff_max=60.0):
+        self.requests_per_second = requests_per_second
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        # Session unique : les connexions TCP/TLS sont réutilisées d'une requête à l'autre
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_connections, pool_maxsize=max_connections)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._buckets = {}
+        self._buckets_lock = threading.Lock()
+
+    def bucket(self, url):
+        """Seau à jetons de l'hôte de l'URL (créé au premier usage)"""
+        host = urlsplit(url).netloc
+        with self._buckets_lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.requests_per_second)
+            return self._buckets[host]
+
+    def backoff(self, attempt):
+        """Attente exponentielle avec gigue : ~base, ~2*base, ~4*base..."""
+        delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        return delay * random.uniform(0.5, 1.0)
+
+    def get(self, url, **kwargs):
+        """
+        Requête GET avec limitation de débit et nouvelles tentatives
+
+        Les erreurs réseau et les codes 429/5xx déclenchent une nouvelle
+        tentative (au plus max_retries). Si le serveur envoie Retry-After,
+        ce délai est respecté pour tout l'hôte, à la place de l'attente
+        exponentielle. Les autres erreurs HTTP (404...) sont levées tout de suite.
+
+        Returns:
+            requests.Response: la réponse (code < 400, ou 304)
+        """
+        bucket = self.bucket(url)
+
+        for attempt in range(self.max_retries + 1):
+            bucket.acquire()
+            try:
+                response = self.session.get(url, timeout=self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+                delay = self.backoff(attempt)
+            else:
+                if response.status_code not in RETRYABLE_STATUS:
+                    response.raise_for_status()
+                    return response
+
+                error = requests.HTTPError(f"{response.status_code} pour {url}", response=response)
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                if retry_after is not None:
+                    bucket.pause(retry_after)
+                    delay = 0.0
+                else:
+                    delay = self.backoff(attempt)
+
+            if attempt == self.max_retries:
+                raise error
+            time.sleep(delay)
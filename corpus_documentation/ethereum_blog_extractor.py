@@ -7,27 +7,36 @@ Ce script est conçu pour être utilisé par des débutants en programmation.
 Chaque étape est largement commentée et expliquée.
 
 Utilisation :
-    python3 ethereum_blog_extractor.py
+    python3 ethereum_blog_extractor.py [--workers 4] [--yes]
 
 Le script va :
 1. Récupérer toutes les URLs d'articles depuis le sitemap
 2. Extraire le contenu de chaque article
 3. Nettoyer et structurer les données
 4. Sauvegarder dans plusieurs formats (JSON, CSV, TXT)
+5. Écrire les mesures de performance de l'extraction (extraction_metrics.json,
+   voir extraction_metrics.py)
 """
 
-import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.builder import builder_registry
+import argparse
 import json
 import csv
 import re
-import time
 import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime
 from urllib.parse import urljoin
 import pandas as pd
 from tqdm import tqdm
 import logging
+import time
+
+from concurrent_fetcher import PoliteFetcher
+from extraction_metrics import ExtractionMetrics
+from html_archive import HtmlArchive
 
 # Configuration du logging pour suivre le processus
 logging.basicConfig(
@@ -39,6 +48,18 @@ logging.basicConfig(
     ]
 )
 
+# Analyse rapide des pages : seules les balises utiles sont construites
+# (titre H1, <article>, <main> et tout leur contenu), avec le parseur lxml
+# (écrit en C) s'il est installé
+ARTICLE_PARTS = SoupStrainer(['h1', 'article', 'main'])
+# Conteneurs de catégorie (balises <span>/<div> dont la classe contient
+# « category » ou « tag ») : CATEGORY_CLASS dans l'arbre analysé,
+# CATEGORY_MARKUP dans le HTML brut (tous ceux de la page, au moins)
+CATEGORY_CLASS = re.compile(r'category|tag')
+CATEGORY_MARKUP = re.compile(rb'<(?:span|div)\b[^>]*\bclass\s*=[^>]*(?:category|tag)', re.IGNORECASE)
+BYLINE = 'Posted by'
+FAST_PARSER = 'lxml' if builder_registry.lookup('lxml') else 'html.parser'
+
 class EthereumBlogExtractor:
     """
     Classe principale pour l'extraction du blog Ethereum Foundation
@@ -47,26 +68,47 @@ class EthereumBlogExtractor:
     facilement utilisable et modifiable.
     """
     
-    def __init__(self):
-        """Initialisation de l'extracteur avec la configuration par défaut"""
+    def __init__(self, base_url="https://blog.ethereum.org", max_workers=1,
+                 journal_path="ethereum_extraction_journal.jsonl",
+                 archive_path="ethereum_html_archive.sqlite", profile_dir=None):
+        """
+        Initialisation de l'extracteur avec la configuration par défaut
+        
+        Args:
+            base_url (str): racine du blog (une autre adresse permet de viser
+                            un serveur local, voir local_blog_server.py)
+            max_workers (int): nombre de téléchargements simultanés
+            journal_path (str): journal JSONL permettant de reprendre une
+                                extraction interrompue
+            archive_path (str): archive compressée des pages téléchargées
+                                (requêtes conditionnelles, réextraction hors ligne)
+            profile_dir (str): répertoire des profils cProfile de chaque étape
+                               (None : pas de profilage)
+        """
         
         # URLs de base du site Ethereum
-        self.base_url = "https://blog.ethereum.org"
-        self.sitemap_url = "https://blog.ethereum.org/sitemap-0.xml"
+        self.base_url = base_url.rstrip('/')
+        self.sitemap_url = f"{self.base_url}/sitemap-0.xml"
         
         # Configuration pour être respectueux du serveur
-        self.delay_between_requests = 1.0  # 1 seconde entre chaque requête
-        self.max_retries = 3               # Nombre de tentatives en cas d'échec
+        self.delay_between_requests = 1.0  # 1 seconde entre deux requêtes vers le même hôte
+        self.max_retries = 3               # Nombre de nouvelles tentatives en cas d'échec
         self.timeout = 30                  # Timeout par requête en secondes
-        self.batch_size = 50               # Sauvegarde tous les 50 articles
+        self.journal_path = journal_path   # Journal de reprise (une ligne par article)
+        self.max_workers = max_workers     # Téléchargements simultanés (1 = séquentiel)
+        self.archive = HtmlArchive(archive_path)
+        self._fetcher = None
+        self._metadata_lock = threading.Lock()
+        self.metrics = ExtractionMetrics(profile_dir)   # Durées, octets lus, articles les plus lents
         
         # Pattern pour identifier les URLs d'articles
         # Format attendu : /YYYY/MM/DD/slug-title
-        self.article_pattern = re.compile(r'https://blog\.ethereum\.org/(\d{4})/(\d{2})/(\d{2})/(.+)')
+        self.article_pattern = re.compile(re.escape(self.base_url) + r'/(\d{4})/(\d{2})/(\d{2})/(.+)')
         
         # Stockage des données extraites
         self.articles = []
         self.failed_urls = []
+        self.sitemap_lastmod = {}          # URL -> date <lastmod> du sitemap (ou None)
         
         # Métadonnées de l'extraction
         self.extraction_metadata = {
@@ -74,17 +116,38 @@ class EthereumBlogExtractor:
             'total_articles_found': 0,
             'successfully_extracted': 0,
             'failed_extractions': 0,
+            'unchanged_skipped': 0,        # lastmod identique : aucune requête
+            'not_modified': 0,             # réponse 304 : page reprise de l'archive HTML
             'source': self.base_url
         }
         
         logging.info("Extracteur Ethereum Blog initialisé")
     
+    @property
+    def fetcher(self):
+        """
+        Client HTTP partagé (créé au premier usage avec la configuration courante)
+        
+        Le débit par hôte est de 1 / delay_between_requests requêtes par seconde,
+        quel que soit le nombre de threads.
+        """
+        if self._fetcher is None:
+            self._fetcher = PoliteFetcher(
+                requests_per_second=1.0 / self.delay_between_requests if self.delay_between_requests > 0 else float('inf'),
+                max_retries=self.max_retries,
+                timeout=self.timeout,
+                max_connections=max(1, self.max_workers)
+            )
+        return self._fetcher
+    
     def get_article_urls_from_sitemap(self):
         """
         Étape 1 : Récupération de toutes les URLs d'articles depuis le sitemap
         
         Le sitemap est un fichier XML officiel qui liste toutes les pages du site.
         C'est la méthode la plus fiable pour obtenir une liste complète.
+        La date <lastmod> de chaque article est gardée dans self.sitemap_lastmod
+        pour repérer les articles modifiés depuis l'exécution précédente.
         
         Returns:
             list: Liste des URLs d'articles trouvées
@@ -92,12 +155,11 @@ class EthereumBlogExtractor:
         logging.info("Récupération des URLs depuis le sitemap...")
         
         try:
-            # Téléchargement du sitemap XML
-            response = requests.get(self.sitemap_url, timeout=self.timeout)
-            response.raise_for_status()  # Lève une exception si erreur HTTP
+            # Téléchargement conditionnel du sitemap XML (lève une exception si erreur HTTP)
+            sitemap, _ = self.archive.get(self.fetcher, self.sitemap_url)
             
             # Parsing du XML avec BeautifulSoup
-            soup = BeautifulSoup(response.content, 'xml')
+            soup = BeautifulSoup(sitemap, 'xml')
             
             # Extraction de toutes les URLs
             urls = []
@@ -109,6 +171,8 @@ class EthereumBlogExtractor:
                     # Vérification que l'URL correspond au pattern d'un article
                     if self.article_pattern.match(url):
                         urls.append(url)
+                        lastmod_tag = url_tag.find('lastmod')
+                        self.sitemap_lastmod[url] = lastmod_tag.text.strip() if lastmod_tag else None
             
             # Tri chronologique (du plus ancien au plus récent)
             urls.sort()
@@ -127,7 +191,9 @@ class EthereumBlogExtractor:
         Étape 2 : Extraction du contenu d'un article individuel
         
         Pour chaque URL d'article, cette fonction :
-        - Télécharge la page HTML
+        - Télécharge la page HTML (requête conditionnelle : si la page n'a pas
+          changé depuis le dernier téléchargement, le serveur répond 304 et la
+          copie de l'archive HTML est utilisée)
         - Extrait le titre, auteur, date, contenu
         - Nettoie et structure les données
         
@@ -139,97 +205,176 @@ class EthereumBlogExtractor:
         """
         
         try:
-            # Téléchargement de la page de l'article
-            response = requests.get(url, timeout=self.timeout)
-            response.raise_for_status()
-            
-            # Parsing HTML
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Extraction du titre principal (balise H1)
-            title_tag = soup.find('h1')
-            title = title_tag.get_text(strip=True) if title_tag else "Titre non trouvé"
-            
-            # Extraction de l'auteur et de la date
-            # Format attendu : "Posted by [Auteur] on [Date]"
-            author = "Auteur non trouvé"
-            publication_date = "Date non trouvée"
-            
-            # Recherche dans tout le texte de la page
-            for text in soup.stripped_strings:
-                if "Posted by" in text and " on " in text:
-                    # Utilisation d'expressions régulières pour extraire auteur et date
-                    author_match = re.search(r'Posted by (.+?) on', text)
-                    date_match = re.search(r'on (.+)$', text)
-                    
-                    if author_match:
-                        author = author_match.group(1).strip()
-                    if date_match:
-                        publication_date = date_match.group(1).strip()
-                    break
-            
-            # Extraction de la catégorie (si disponible)
-            category = "Non catégorisé"
-            category_tags = soup.find_all(['span', 'div'], class_=re.compile(r'category|tag'))
-            if category_tags:
-                category = category_tags[0].get_text(strip=True)
-            
-            # Extraction du contenu principal
-            # Tentative avec plusieurs sélecteurs possibles
-            content_selectors = [
-                'article',           # Balise article HTML5
-                '.post-content',     # Classe CSS commune
-                '.content',          # Classe CSS générique
-                'main',              # Balise main HTML5
-                '.entry-content'     # Autre classe CSS commune
-            ]
-            
-            content = ""
-            for selector in content_selectors:
-                content_elem = soup.select_one(selector)
-                if content_elem:
-                    # Extraction du texte en préservant les paragraphes
-                    content = content_elem.get_text(separator='\\n\\n', strip=True)
-                    break
-            
-            # Si aucun sélecteur spécifique ne fonctionne, extraction de tout le texte
-            if not content:
-                content = soup.get_text(separator='\\n\\n', strip=True)
-            
-            # Nettoyage du contenu
-            content = self.clean_content(content)
+            # Téléchargement de la page de l'article (avec nouvelles tentatives)
+            start = time.perf_counter()
+            html, from_cache = self.archive.get(self.fetcher, url)
+            downloaded = time.perf_counter()
+            if from_cache:
+                with self._metadata_lock:
+                    self.extraction_metadata['not_modified'] += 1
+            article_data = self.parse_article(url, html)
+            self.metrics.record_article(url, downloaded - start, time.perf_counter() - downloaded,
+                                        len(html), article_data['word_count'])
+            return article_data
             
-            # Extraction des métadonnées de l'URL
-            url_match = self.article_pattern.match(url)
-            year, month, day, slug = url_match.groups() if url_match else ("", "", "", "")
+        except Exception as e:
+            logging.error(f"Erreur lors de l'extraction de {url} : {e}")
+            return None
+    
+    def parse_article(self, url, html, fast=True):
+        """
+        Extraction des champs d'un article à partir de son HTML
+        
+        Par défaut, l'analyse rapide (parse_fields_fast) est tentée d'abord ;
+        si elle ne trouve pas tous les champs, la page entière est analysée
+        avec html.parser comme auparavant.
+        
+        Args:
+            url (str): URL de l'article
+            html (bytes|str): contenu HTML de la page
+            fast (bool): False pour toujours analyser la page entière
             
-            # Construction de l'objet article structuré
-            article_data = {
-                'id': f"{year}-{month}-{day}-{slug}",
-                'url': url,
-                'title': title,
-                'author': author,
-                'publication_date': publication_date,
-                'year': year,
-                'month': month,
-                'day': day,
-                'slug': slug,
-                'category': category,
-                'content': content,
-                'word_count': len(content.split()) if content else 0,
-                'character_count': len(content) if content else 0,
-                'extraction_metadata': {
-                    'extracted_at': datetime.now().isoformat(),
-                    'extraction_success': True,
-                    'content_length': len(content) if content else 0
-                }
+        Returns:
+            dict: Données structurées de l'article
+        """
+        fields = self.parse_fields_fast(html) if fast else None
+        if fields is None:
+            fields = self.parse_fields(BeautifulSoup(html, 'html.parser'))
+        title, author, publication_date, category, content = fields
+        
+        # Nettoyage du contenu
+        content = self.clean_content(content)
+        
+        # Extraction des métadonnées de l'URL
+        url_match = self.article_pattern.match(url)
+        year, month, day, slug = url_match.groups() if url_match else ("", "", "", "")
+        
+        # Construction de l'objet article structuré
+        article_data = {
+            'id': f"{year}-{month}-{day}-{slug}",
+            'url': url,
+            'title': title,
+            'author': author,
+            'publication_date': publication_date,
+            'year': year,
+            'month': month,
+            'day': day,
+            'slug': slug,
+            'category': category,
+            'content': content,
+            'word_count': len(content.split()) if content else 0,
+            'character_count': len(content) if content else 0,
+            'extraction_metadata': {
+                'extracted_at': datetime.now().isoformat(),
+                'extraction_success': True,
+                'content_length': len(content) if content else 0
             }
+        }
+        
+        return article_data
+    
+    def parse_fields(self, soup):
+        """
+        Recherche du titre, de l'auteur, de la date, de la catégorie et du texte
+        
+        Args:
+            soup (BeautifulSoup): page analysée
             
-            return article_data
+        Returns:
+            tuple: (titre, auteur, date, catégorie, contenu brut)
+        """
+        # Extraction du titre principal (balise H1)
+        title_tag = soup.find('h1')
+        title = title_tag.get_text(strip=True) if title_tag else "Titre non trouvé"
+        
+        # Extraction de l'auteur et de la date
+        # Format attendu : "Posted by [Auteur] on [Date]"
+        author = "Auteur non trouvé"
+        publication_date = "Date non trouvée"
+        
+        # Recherche dans tout le texte de la page
+        for text in soup.stripped_strings:
+            if BYLINE in text and " on " in text:
+                # Utilisation d'expressions régulières pour extraire auteur et date
+                author_match = re.search(r'Posted by (.+?) on', text)
+                date_match = re.search(r'on (.+)$', text)
+                
+                if author_match:
+                    author = author_match.group(1).strip()
+                if date_match:
+                    publication_date = date_match.group(1).strip()
+                break
+        
+        # Extraction de la catégorie (si disponible)
+        category = "Non catégorisé"
+        category_tags = soup.find_all(['span', 'div'], class_=CATEGORY_CLASS)
+        if category_tags:
+            category = category_tags[0].get_text(strip=True)
+        
+        # Extraction du contenu principal
+        # Tentative avec plusieurs sélecteurs possibles
+        content_selectors = [
+            'article',           # Balise article HTML5
+            '.post-content',     # Classe CSS commune
+            '.content',          # Classe CSS générique
+            'main',              # Balise main HTML5
+            '.entry-content'     # Autre classe CSS commune
+        ]
+        
+        content = ""
+        for selector in content_selectors:
+            content_elem = soup.select_one(selector)
+            if content_elem:
+                # Extraction du texte en préservant les paragraphes
+                content = content_elem.get_text(separator='\\n\\n', strip=True)
+                break
+        
+        # Si aucun sélecteur spécifique ne fonctionne, extraction de tout le texte
+        if not content:
+            content = soup.get_text(separator='\\n\\n', strip=True)
+        
+        return title, author, publication_date, category, content
+    
+    def parse_fields_fast(self, html):
+        """
+        Analyse rapide : seuls le titre H1, <article> et <main> sont construits
+        
+        Le menu, le pied de page, les scripts et l'en-tête <head> sont ignorés
+        dès la lecture du HTML, ce qui évite de construire la plus grande partie
+        de l'arbre. Les champs sont cherchés exactement comme dans parse_fields,
+        mais uniquement dans ces balises : si la page n'a pas de <h1>, pas de
+        <article> avec du texte ou pas de ligne « Posted by ... on ... », on
+        renvoie None et la page entière sera analysée.
+        
+        La page entière est aussi analysée quand le HTML brut contient un
+        conteneur de catégorie ou une ligne « Posted by » de plus que les
+        balises conservées : placé avant l'article (en-tête, barre latérale),
+        c'est lui que parse_fields aurait trouvé en premier. Les champs rendus
+        sont donc toujours ceux de parse_fields.
+        
+        Args:
+            html (bytes|str): contenu HTML de la page
             
-        except Exception as e:
-            logging.error(f"Erreur lors de l'extraction de {url} : {e}")
+        Returns:
+            tuple: comme parse_fields, ou None si un champ manque
+        """
+        soup = BeautifulSoup(html, FAST_PARSER, parse_only=ARTICLE_PARTS)
+        article = soup.find('article')
+        if soup.find('h1') is None or article is None or not article.get_text(strip=True):
             return None
+        
+        fields = self.parse_fields(soup)
+        if fields[1] == "Auteur non trouvé" or fields[2] == "Date non trouvée":
+            return None
+        
+        # Catégorie ou signature hors des balises conservées
+        raw = html.encode('utf-8') if isinstance(html, str) else html
+        categories = soup.find_all(['span', 'div'], class_=CATEGORY_CLASS)
+        if len(CATEGORY_MARKUP.findall(raw)) > len(categories):
+            return None
+        if raw.count(BYLINE.encode()) > sum(text.count(BYLINE) for text in soup.strings):
+            return None
+        return fields
     
     def clean_content(self, content):
         """
@@ -261,75 +406,180 @@ class EthereumBlogExtractor:
         
         Cette fonction orchestre l'extraction de tous les articles :
         1. Récupère les URLs depuis le sitemap
-        2. Extrait chaque article individuellement
-        3. Sauvegarde périodiquement les résultats
-        4. Gère les erreurs et reprises
+        2. Relit le journal d'une exécution précédente (reprise après arrêt)
+        3. Extrait chaque article restant : nouveaux articles, échecs précédents
+           et articles dont la date <lastmod> du sitemap a changé
+        4. Ajoute chaque résultat au journal dès qu'il est obtenu
+        
+        Lors d'une mise à jour planifiée, la plupart des articles ont le même
+        <lastmod> que dans le journal et ne coûtent aucune requête ; les autres,
+        y compris ceux dont le sitemap ne donne pas de <lastmod>, sont demandés
+        de façon conditionnelle (voir extract_article_content).
         """
         logging.info("Début de l'extraction complète...")
         
         # Récupération de toutes les URLs
-        urls = self.get_article_urls_from_sitemap()
+        with self.metrics.stage('sitemap'):
+            urls = self.get_article_urls_from_sitemap()
         
         if not urls:
             logging.error("Aucune URL trouvée, arrêt de l'extraction")
             return
         
-        logging.info(f"Extraction de {len(urls)} articles...")
-        
-        # Barre de progression pour suivre l'avancement
-        with tqdm(total=len(urls), desc="Extraction des articles") as pbar:
+        # Reprise : les articles déjà extraits et inchangés ne sont pas retéléchargés
+        extracted = {}
+        changed = 0
+        unknown = 0
+        for url, record in self.load_journal().items():
+            if record['status'] != 'ok':
+                continue
+            lastmod = self.sitemap_lastmod.get(url)
+            if lastmod is None:
+                # Sans <lastmod>, rien ne dit que l'article est inchangé :
+                # il est redemandé de façon conditionnelle (304 si inchangé)
+                unknown += 1
+            elif record.get('lastmod') == lastmod:
+                extracted[url] = record['article']
+            else:
+                changed += 1
+        remaining = [url for url in urls if url not in extracted]
+        self.extraction_metadata['unchanged_skipped'] = len(urls) - len(remaining)
+        if extracted:
+            logging.info(f"Reprise : {len(urls) - len(remaining)} articles déjà extraits d'après le journal")
+        if changed:
+            logging.info(f"{changed} articles modifiés depuis leur extraction (lastmod du sitemap)")
+        if unknown:
+            logging.info(f"{unknown} articles sans lastmod dans le sitemap, vérifiés par requête conditionnelle")
+        logging.info(f"Extraction de {len(remaining)} articles...")
+        
+        # Pool de threads : au plus max_workers téléchargements simultanés.
+        # Le débit par hôte reste limité par le fetcher (delay_between_requests).
+        with self.metrics.stage('articles'), \
+                open(self.journal_path, 'a', encoding='utf-8') as journal, \
+                ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as executor, \
+                tqdm(total=len(urls), initial=len(urls) - len(remaining),
+                     desc="Extraction des articles") as pbar:
             
-            for i, url in enumerate(urls):
-                # Extraction de l'article
-                article_data = self.extract_article_content(url)
+            futures = {executor.submit(self.extract_article_content, url): url for url in remaining}
+            failures = 0
+            for future in as_completed(futures):
+                url = futures[future]
+                article_data = future.result()
                 
                 if article_data:
-                    self.articles.append(article_data)
-                    self.extraction_metadata['successfully_extracted'] += 1
-                    pbar.set_postfix({
-                        'Succès': self.extraction_metadata['successfully_extracted'],
-                        'Échecs': len(self.failed_urls)
+                    extracted[url] = article_data
+                    self.append_to_journal(journal, {
+                        'url': url, 'status': 'ok',
+                        'lastmod': self.sitemap_lastmod.get(url), 'article': article_data,
                     })
                 else:
-                    self.failed_urls.append(url)
-                    self.extraction_metadata['failed_extractions'] += 1
+                    failures += 1
+                    self.append_to_journal(journal, {'url': url, 'status': 'failed'})
                 
                 # Mise à jour de la barre de progression
+                pbar.set_postfix({'Succès': len(extracted), 'Échecs': failures})
                 pbar.update(1)
-                
-                # Sauvegarde intermédiaire tous les N articles
-                if (i + 1) % self.batch_size == 0:
-                    self.save_intermediate_results(i + 1)
-                
-                # Délai respectueux entre les requêtes
-                time.sleep(self.delay_between_requests)
+        
+        # Résultats dans l'ordre du sitemap
+        self.articles = [extracted[url] for url in urls if url in extracted]
+        self.failed_urls = [url for url in urls if url not in extracted]
+        self.extraction_metadata['successfully_extracted'] = len(self.articles)
+        self.extraction_metadata['failed_extractions'] = len(self.failed_urls)
         
         logging.info(f"Extraction terminée : {len(self.articles)} articles extraits avec succès")
+        logging.info(f"Requêtes évitées : {self.extraction_metadata['unchanged_skipped']} articles inchangés, "
+                     f"{self.extraction_metadata['not_modified']} réponses 304")
         
         # Finalisation des métadonnées
         self.finalize_metadata()
     
-    def save_intermediate_results(self, current_count):
+    def extract_from_archive(self):
         """
-        Sauvegarde intermédiaire pour éviter la perte de données
+        Réextraction hors ligne : toutes les pages d'articles de l'archive HTML
+        sont réanalysées, sans aucune requête réseau
+        
+        Utile après une modification de clean_content ou de parse_article :
+        quelques secondes de calcul au lieu d'une nouvelle collecte complète.
+        Avec max_workers > 1, les pages sont réparties entre plusieurs
+        processus (l'analyse HTML occupe le processeur, les threads
+        n'apporteraient rien ici). Les articles réanalysés sont ajoutés au
+        journal, pour que la prochaine collecte reparte de ces résultats.
+        """
+        urls = [url for url in self.archive.urls() if self.article_pattern.match(url)]
+        self.extraction_metadata['total_articles_found'] = len(urls)
+        if not urls:
+            logging.error(f"Aucune page d'article de {self.base_url} dans l'archive {self.archive.path}")
+            return
+        logging.info(f"Réanalyse de {len(urls)} pages archivées...")
+        
+        # Paquets d'URLs consécutives, rendus dans l'ordre par executor.map
+        workers = max(1, self.max_workers)
+        size = max(1, min(ARCHIVE_CHUNK_SIZE, -(-len(urls) // (workers * 4))))
+        chunks = [urls[i:i + size] for i in range(0, len(urls), size)]
+        with self.metrics.stage('archive'):
+            if workers == 1:
+                results = [parse_archived_pages(chunk, self) for chunk in chunks]
+            else:
+                with ProcessPoolExecutor(max_workers=workers, initializer=init_archive_worker,
+                                         initargs=(self.base_url, self.archive.path)) as executor:
+                    results = list(executor.map(parse_archived_pages, chunks))
+            # Coûts mesurés dans chaque processus, ajoutés aux mesures de l'extracteur
+            for _, costs in results:
+                for cost in costs:
+                    self.metrics.record_article(*cost)
+        parsed = [article for chunk, _ in results for article in chunk]
+        
+        # Journal : le lastmod déjà connu de chaque article est conservé
+        journal_records = self.load_journal()
+        with open(self.journal_path, 'a', encoding='utf-8') as journal:
+            for url, article_data in zip(urls, parsed):
+                if article_data:
+                    self.append_to_journal(journal, {
+                        'url': url, 'status': 'ok',
+                        'lastmod': journal_records.get(url, {}).get('lastmod'), 'article': article_data,
+                    })
         
-        Args:
-            current_count (int): Nombre d'articles traités jusqu'à présent
+        self.articles = [article for article in parsed if article]
+        self.failed_urls = [url for url, article in zip(urls, parsed) if not article]
+        self.extraction_metadata['successfully_extracted'] = len(self.articles)
+        self.extraction_metadata['failed_extractions'] = len(self.failed_urls)
+        logging.info(f"Réanalyse terminée : {len(self.articles)} articles extraits de l'archive")
+        
+        self.finalize_metadata()
+    
+    def load_journal(self):
         """
-        filename = f"ethereum_articles_partial_{current_count}.json"
+        Relecture du journal des exécutions précédentes
         
-        try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump({
-                    'metadata': self.extraction_metadata,
-                    'articles': self.articles,
-                    'failed_urls': self.failed_urls
-                }, f, indent=2, ensure_ascii=False)
-            
-            logging.info(f"Sauvegarde intermédiaire : {filename}")
-            
-        except Exception as e:
-            logging.error(f"Erreur lors de la sauvegarde intermédiaire : {e}")
+        Le journal est un fichier JSONL : une ligne par article traité, ajoutée
+        dès que l'article est extrait (ou a échoué). Pour une même URL, c'est la
+        dernière ligne qui compte. Une dernière ligne tronquée par un arrêt
+        brutal est supprimée.
+        
+        Returns:
+            dict: URL -> dernier enregistrement ({'url', 'status', 'article'?})
+        """
+        records = {}
+        if not os.path.exists(self.journal_path):
+            return records
+        
+        with open(self.journal_path, 'rb+') as f:
+            data = f.read()
+            complete = data.rfind(b'\n') + 1
+            if complete < len(data):
+                logging.warning("Dernière ligne du journal incomplète : ignorée")
+                f.truncate(complete)
+        
+        for line in data[:complete].decode('utf-8').splitlines():
+            if line.strip():
+                record = json.loads(line)
+                records[record['url']] = record
+        return records
+    
+    def append_to_journal(self, journal, record):
+        """Ajoute un enregistrement au journal et le vide sur disque immédiatement"""
+        journal.write(json.dumps(record, ensure_ascii=False) + '\n')
+        journal.flush()
     
     def finalize_metadata(self):
         """Finalisation des métadonnées d'extraction"""
@@ -394,7 +644,12 @@ class EthereumBlogExtractor:
                 f.write("\\n" + "="*50 + "\\n\\n")
                 f.write(article['content'])
         
-        # 4. Rapport d'extraction
+        # 4. Corpus complet en colonnes (un seul fichier, voir save_corpus_file)
+        corpus_file = os.path.join(output_dir, "ethereum_blog_corpus.arrow")
+        if self.articles:
+            self.save_corpus_file(corpus_file)
+        
+        # 5. Rapport d'extraction
         report_file = os.path.join(output_dir, "extraction_report.txt")
         with open(report_file, 'w', encoding='utf-8') as f:
             f.write("RAPPORT D'EXTRACTION - BLOG ETHEREUM FOUNDATION\\n")
@@ -414,14 +669,120 @@ class EthereumBlogExtractor:
         logging.info(f"  - {json_file} (données complètes JSON)")
         logging.info(f"  - {csv_file} (métadonnées CSV)")
         logging.info(f"  - {txt_dir}/ (articles individuels)")
+        logging.info(f"  - {corpus_file} (corpus en colonnes Arrow/Feather)")
         logging.info(f"  - {report_file} (rapport d'extraction)")
 
+    def save_metrics(self, output_dir="ethereum_blog_data"):
+        """
+        Écriture des mesures de performance (extraction_metrics.json)
+        
+        Durée et pic mémoire de chaque étape, octets HTML lus, mots produits,
+        croissance du vocabulaire et articles les plus lents : voir
+        extraction_metrics.py.
+        """
+        self.metrics.record_corpus(self.articles)
+        metrics_file = os.path.join(output_dir, "extraction_metrics.json")
+        self.metrics.save(metrics_file)
+        for name, stage in self.metrics.stages.items():
+            logging.info(f"Étape {name} : {stage['seconds']:.1f} s, {stage['articles']} articles, "
+                         f"{stage['bytes_read'] / 1024 / 1024:.1f} Mo lus")
+        logging.info(f"Mesures de performance : {metrics_file}")
+
+    def save_corpus_file(self, corpus_file):
+        """
+        Sauvegarde de tout le corpus dans un seul fichier en colonnes (Arrow/Feather)
+        
+        Une ligne par article : les métadonnées dans des colonnes typées
+        (dates, entiers, catégorie) et le texte seul dans la colonne content,
+        sans l'en-tête Titre/Auteur/... des fichiers TXT. Le fichier n'est pas
+        compressé pour pouvoir être lu directement depuis le disque (memory
+        map), colonne par colonne : c'est le format lu par
+        eth_discourse/corpus_store.py et par l'option --corpus des commandes d'analyse.
+        
+        Nécessite pyarrow (pip install pyarrow) ; sinon le fichier est ignoré.
+        
+        Args:
+            corpus_file (str): chemin du fichier .arrow à écrire
+        """
+        df = pd.DataFrame(self.articles).sort_values('id', kind='stable').reset_index(drop=True)
+        for column, dtype in [('year', 'int16'), ('month', 'int8'), ('day', 'int8'),
+                              ('word_count', 'int32'), ('character_count', 'int32')]:
+            df[column] = pd.to_numeric(df[column]).astype(dtype)
+        df['date'] = pd.to_datetime(df[['year', 'month', 'day']]).dt.date
+        df['category'] = df['category'].astype('category')
+        df = df[['id', 'url', 'title', 'author', 'publication_date', 'date', 'year', 'month', 'day',
+                 'slug', 'category', 'word_count', 'character_count', 'content']]
+        
+        try:
+            df.to_feather(corpus_file + '.tmp', compression='uncompressed')
+        except ImportError:
+            logging.warning("pyarrow n'est pas installé : corpus en colonnes non écrit")
+            return
+        os.replace(corpus_file + '.tmp', corpus_file)
+
+# --- RÉANALYSE DE L'ARCHIVE EN PARALLÈLE ---
+
+ARCHIVE_CHUNK_SIZE = 64   # Pages au plus par paquet envoyé à un processus
+_worker_extractor = None  # Extracteur propre à chaque processus du pool
+
+def init_archive_worker(base_url, archive_path):
+    """Ouvre l'archive (une connexion SQLite par processus) au démarrage du processus"""
+    global _worker_extractor
+    _worker_extractor = EthereumBlogExtractor(base_url=base_url, archive_path=archive_path)
+
+def parse_archived_pages(urls, extractor=None):
+    """
+    Analyse d'un paquet de pages archivées
+    
+    Returns:
+        tuple: (un article (dict) ou None (échec) par URL, dans l'ordre ;
+                coûts des articles analysés, arguments de ExtractionMetrics.record_article)
+    """
+    extractor = extractor or _worker_extractor
+    articles = []
+    costs = []
+    for url in urls:
+        try:
+            start = time.perf_counter()
+            html = extractor.archive.body(url)
+            read = time.perf_counter()
+            article_data = extractor.parse_article(url, html)
+            costs.append((url, read - start, time.perf_counter() - read, len(html), article_data['word_count']))
+            articles.append(article_data)
+        except Exception as e:
+            logging.error(f"Erreur lors de l'analyse de {url} : {e}")
+            articles.append(None)
+    return articles, costs
+
 def main():
     """
     Fonction principale - Point d'entrée du script
     
     Cette fonction lance l'extraction complète et gère les erreurs globales.
     """
+    parser = argparse.ArgumentParser(description="Extraction du blog Ethereum Foundation")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="téléchargements simultanés (défaut : 1)")
+    parser.add_argument('--base-url', default="https://blog.ethereum.org",
+                        help="racine du blog, par ex. un serveur local_blog_server.py")
+    parser.add_argument('--output-dir', default="ethereum_blog_data",
+                        help="répertoire de sortie (défaut : ethereum_blog_data)")
+    parser.add_argument('--yes', '-y', action='store_true',
+                        help="ne pas demander de confirmation")
+    parser.add_argument('--journal', default="ethereum_extraction_journal.jsonl",
+                        help="journal de reprise (défaut : ethereum_extraction_journal.jsonl)")
+    parser.add_argument('--fresh', action='store_true',
+                        help="ignorer le journal existant et tout réextraire")
+    parser.add_argument('--archive', default="ethereum_html_archive.sqlite",
+                        help="archive compressée des pages HTML "
+                             "(défaut : ethereum_html_archive.sqlite)")
+    parser.add_argument('--from-archive', action='store_true',
+                        help="réanalyser les pages de l'archive, sans aucune requête réseau "
+                             "(--workers processus en parallèle)")
+    parser.add_argument('--profile', default=None, metavar='RÉPERTOIRE',
+                        help="profiler chaque étape avec cProfile, profils écrits dans ce répertoire")
+    args = parser.parse_args()
+    
     print("="*60)
     print("EXTRACTEUR BLOG ETHEREUM FOUNDATION")
     print("="*60)
@@ -434,20 +795,30 @@ def main():
     print()
     
     # Demande de confirmation
-    response = input("Voulez-vous continuer ? (o/n) : ").lower().strip()
-    if response not in ['o', 'oui', 'y', 'yes']:
-        print("Extraction annulée.")
-        return
+    if not args.yes:
+        response = input("Voulez-vous continuer ? (o/n) : ").lower().strip()
+        if response not in ['o', 'oui', 'y', 'yes']:
+            print("Extraction annulée.")
+            return
     
     try:
         # Création et lancement de l'extracteur
-        extractor = EthereumBlogExtractor()
-        
-        # Extraction complète
-        extractor.extract_all_articles()
-        
-        # Sauvegarde des résultats
-        extractor.save_results()
+        if args.fresh and os.path.exists(args.journal):
+            os.remove(args.journal)
+        extractor = EthereumBlogExtractor(base_url=args.base_url, max_workers=args.workers,
+                                          journal_path=args.journal, archive_path=args.archive,
+                                          profile_dir=args.profile)
+        
+        # Extraction complète (ou réanalyse de l'archive)
+        if args.from_archive:
+            extractor.extract_from_archive()
+        else:
+            extractor.extract_all_articles()
+        
+        # Sauvegarde des résultats, puis des mesures de performance
+        with extractor.metrics.stage('save'):
+            extractor.save_results(args.output_dir)
+        extractor.save_metrics(args.output_dir)
         
         print()
         print("="*60)
@@ -455,7 +826,7 @@ def main():
         print("="*60)
         print(f"Articles extraits : {extractor.extraction_metadata['successfully_extracted']}")
         print(f"Échecs : {extractor.extraction_metadata['failed_extractions']}")
-        print("Consultez le répertoire 'ethereum_blog_data' pour les résultats.")
+        print(f"Consultez le répertoire '{args.output_dir}' pour les résultats.")
         
     except KeyboardInterrupt:
         print("\\nExtraction interrompue par l'utilisateur.")
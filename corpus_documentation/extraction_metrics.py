@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+MESURES DE PERFORMANCE DE L'EXTRACTION
+
+Pendant une extraction, l'extracteur note ici :
+
+- la durée de chaque étape (sitemap, extraction des articles, sauvegarde)
+  et sa mémoire : peak_rss_increase_mb, la hausse du pic de mémoire
+  résidente (RSS) causée par l'étape, et cumulative_peak_rss_mb, le pic du
+  processus depuis son lancement (il ne redescend jamais : les étapes qui
+  suivent la plus gourmande reprennent sa valeur)
+- le nombre d'articles et d'octets HTML lus, le nombre de mots produits
+- la croissance du vocabulaire (mots distincts après les k premiers articles)
+- les articles les plus lents, avec le temps de téléchargement et d'analyse
+  de chacun
+
+Le tout est écrit dans extraction_metrics.json, à côté des résultats. Si une
+extraction devient beaucoup plus lente, on voit ainsi quelle étape et quels
+articles en sont la cause.
+
+Le profilage est optionnel : avec un répertoire de profils (option --profile
+de l'extracteur), chaque étape est exécutée sous cProfile et ses statistiques
+sont écrites dans <répertoire>/ethereum_blog_extractor.<étape>.prof (lecture :
+python -m pstats <fichier>). Seul le processus principal est profilé.
+"""
+
+import cProfile
+import heapq
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SLOWEST_ARTICLES = 10   # Articles les plus lents gardés dans le rapport
+GROWTH_POINTS = 50      # Points de la courbe de croissance du vocabulaire
+
+
+def peak_rss_mb():
+    """Pic de mémoire résidente du processus en Mo, ou None si indisponible"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en octets sous macOS, en kilo-octets ailleurs
+    return round((peak if sys.platform == 'darwin' else peak * 1024) / (1024 * 1024), 1)
+
+
+def vocabulary_growth(articles, points=GROWTH_POINTS):
+    """
+    Courbe [articles, mots, mots distincts] après les k premiers articles
+
+    Les mots sont ceux du texte brut (en minuscules, séparés par les espaces),
+    pas ceux des scripts d'analyse (sans nettoyage ni mots vides).
+    """
+    seen = set()
+    words = 0
+    step = max(1, -(-len(articles) // points))
+    curve = []
+    for k, article in enumerate(articles, 1):
+        tokens = (article['content'] or '').lower().split()
+        words += len(tokens)
+        seen.update(tokens)
+        if k % step == 0 or k == len(articles):
+            curve.append([k, words, len(seen)])
+    return curve
+
+
+class ExtractionMetrics:
+    """
+    Mesures d'une extraction, utilisables depuis plusieurs threads
+
+    Args:
+        profile_dir (str): répertoire des profils cProfile (None : pas de profilage)
+        slowest (int): nombre d'articles les plus lents gardés
+    """
+
+    def __init__(self, profile_dir=None, slowest=SLOWEST_ARTICLES):
+        self.profile_dir = profile_dir
+        self.slowest = slowest
+        self.started = datetime.now().isoformat(timespec='seconds')
+        self.stages = {}
+        self.corpus = None
+        self._articles = []
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        """Mesure du bloc comme étape ``name``"""
+        stage = self.stages.setdefault(name, {'seconds': 0.0, 'articles': 0, 'bytes_read': 0, 'words': 0})
+        profiler = cProfile.Profile() if self.profile_dir else None
+        start_peak = peak_rss_mb()
+        start = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield stage
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                os.makedirs(self.profile_dir, exist_ok=True)
+                profiler.dump_stats(os.path.join(self.profile_dir, f"ethereum_blog_extractor.{name}.prof"))
+            stage['seconds'] += time.perf_counter() - start
+            peak = peak_rss_mb()
+            if peak is not None:
+                stage['peak_rss_increase_mb'] = round(stage.get('peak_rss_increase_mb', 0) + peak - start_peak, 1)
+            stage['cumulative_peak_rss_mb'] = peak
+            with self._lock:
+                articles, self._articles = self._articles, []
+            stage['articles'] += len(articles)
+            stage['bytes_read'] += sum(article['bytes'] for article in articles)
+            stage['words'] += sum(article['words'] for article in articles)
+            stage['slowest_articles'] = heapq.nlargest(
+                self.slowest, stage.get('slowest_articles', []) + articles, key=lambda article: article['seconds'])
+
+    def record_article(self, url, download_seconds, parse_seconds, nbytes, words):
+        """Coût d'un article (appelé depuis les threads de téléchargement)"""
+        with self._lock:
+            self._articles.append({
+                'url': url,
+                'seconds': round(download_seconds + parse_seconds, 6),
+                'download_seconds': round(download_seconds, 6),
+                'parse_seconds': round(parse_seconds, 6),
+                'bytes': nbytes,
+                'words': words,
+            })
+
+    def record_corpus(self, articles):
+        growth = vocabulary_growth(articles)
+        self.corpus = {
+            'articles': len(articles),
+            'words': growth[-1][1] if growth else 0,
+            'vocabulary': growth[-1][2] if growth else 0,
+            'vocabulary_growth': {'columns': ['articles', 'words', 'vocabulary'], 'points': growth},
+        }
+
+    def report(self):
+        return {
+            'script': 'ethereum_blog_extractor',
+            'started': self.started,
+            'seconds': round(time.perf_counter() - self._start, 4),
+            'peak_rss_mb': peak_rss_mb(),
+            'profile_dir': self.profile_dir,
+            'stages': {name: dict(stage, seconds=round(stage['seconds'], 4)) for name, stage in self.stages.items()},
+            'corpus': self.corpus,
+        }
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2, ensure_ascii=False)
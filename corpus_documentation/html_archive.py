@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+ARCHIVE COMPRESSÉE DES PAGES HTML TÉLÉCHARGÉES
+
+Chaque page téléchargée (articles et sitemap) est gardée telle quelle,
+compressée, dans un unique fichier SQLite. Cela sert à deux choses :
+
+1. Requêtes conditionnelles : avec la page, l'archive garde ses
+   « validateurs » HTTP, l'en-tête ETag (empreinte de la page calculée par le
+   serveur) et l'en-tête Last-Modified (date de dernière modification). Au
+   téléchargement suivant, ils sont renvoyés au serveur (If-None-Match /
+   If-Modified-Since) ; si la page n'a pas changé, le serveur répond
+   « 304 Not Modified » sans la renvoyer et on réutilise la copie archivée.
+
+2. Réextraction hors ligne : après une modification de clean_content ou des
+   sélecteurs de parse_article, toutes les pages peuvent être réanalysées
+   depuis l'archive, sans aucune requête réseau (option --from-archive de
+   l'extracteur).
+
+Organisation du fichier (une ligne par URL, l'URL est la clé primaire, donc
+indexée : accès direct à n'importe quelle page) :
+
+    pages(url, fetched_at, etag, last_modified, size, html)
+
+La colonne html contient la page compressée avec zlib (environ 4 à 5 fois
+plus petite), size sa taille d'origine en octets.
+"""
+
+import sqlite3
+import threading
+import zlib
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    fetched_at TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    size INTEGER NOT NULL,
+    html BLOB NOT NULL
+)
+"""
+
+
+class HtmlArchive:
+    """
+    Archive des pages HTML, utilisable depuis plusieurs threads
+
+    Une seule connexion SQLite est partagée, protégée par un verrou. Chaque
+    page est enregistrée dans sa propre transaction : un arrêt brutal ne perd
+    au plus que la page en cours. Le mode WAL permet à d'autres processus de
+    lire l'archive pendant qu'elle est complétée.
+
+    Args:
+        path (str): fichier de l'archive (créé à la première utilisation)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._connection = None
+        self._lock = threading.Lock()
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(SCHEMA)
+        return self._connection
+
+    def _row(self, url, columns):
+        with self._lock:
+            return self.connection.execute(
+                f"SELECT {columns} FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+
+    def conditional_headers(self, url):
+        """
+        En-têtes à ajouter à la requête pour ne recevoir la page que si elle a changé
+
+        Returns:
+            dict: If-None-Match / If-Modified-Since (vide si l'URL n'est pas archivée)
+        """
+        row = self._row(url, "etag, last_modified")
+        headers = {}
+        if row:
+            etag, last_modified = row
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+        return headers
+
+    def body(self, url):
+        """Page archivée (bytes), ou None si l'URL n'est pas dans l'archive"""
+        row = self._row(url, "html")
+        return zlib.decompress(row[0]) if row else None
+
+    def store(self, url, response):
+        """Archive (ou remplace) la page d'une réponse 200 avec ses validateurs"""
+        compressed = zlib.compress(response.content)
+        with self._lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)",
+                (url, datetime.now().isoformat(), response.headers.get('ETag'),
+                 response.headers.get('Last-Modified'), len(response.content), compressed)
+            )
+
+    def urls(self):
+        """Toutes les URLs archivées, triées"""
+        with self._lock:
+            return [url for url, in self.connection.execute("SELECT url FROM pages ORDER BY url")]
+
+    def get(self, fetcher, url):
+        """
+        Téléchargement conditionnel de url avec fetcher (PoliteFetcher)
+
+        Returns:
+            (bytes, bool): le corps de la page et True s'il vient de l'archive (304)
+        """
+        response = fetcher.get(url, headers=self.conditional_headers(url))
+        if response.status_code == 304:
+            return self.body(url), True
+        self.store(url, response)
+        return response.content, False
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
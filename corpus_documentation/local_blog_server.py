@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+SERVEUR LOCAL QUI IMITE LE BLOG ETHEREUM FOUNDATION
+
+Permet de tester l'extracteur sans solliciter blog.ethereum.org : le serveur
+sert des pages enregistrées au préalable, avec la même arborescence d'URL
+que le vrai blog (/sitemap-0.xml, /YYYY/MM/DD/slug).
+
+Organisation d'un répertoire de pages enregistrées :
+
+    sitemap-0.xml                  sitemap (URLs du vrai blog)
+    2014/01/15/slasher-....html    une page par article
+
+Utilisation :
+    # Enregistrer 20 vraies pages du blog (requêtes espacées d'une seconde)
+    python3 local_blog_server.py record pages_enregistrees --limit 20
+
+    # Ou fabriquer des pages hors ligne à partir du corpus existant
+    python3 local_blog_server.py fixtures pages_enregistrees --corpus-dir ../data/corpus_raw
+
+    # Servir les pages (10 % de réponses 503, Retry-After d'une seconde)
+    python3 local_blog_server.py serve pages_enregistrees --port 8000 --flaky 0.1 --retry-after 1
+
+    # Puis lancer l'extracteur contre le serveur local
+    python3 ethereum_blog_extractor.py --base-url http://127.0.0.1:8000 --workers 4 --yes
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import os
+import random
+import re
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+LIVE_BASE_URL = "https://blog.ethereum.org"
+SITEMAP_FILE = "sitemap-0.xml"
+ARTICLE_PATH = re.compile(r'^/(\d{4})/(\d{2})/(\d{2})/([^/?#]+)/?$')
+
+
+def page_path(directory, url_path):
+    """Fichier enregistré correspondant à un chemin d'URL d'article (ou None)"""
+    match = ARTICLE_PATH.match(url_path)
+    if not match:
+        return None
+    year, month, day, slug = match.groups()
+    return os.path.join(directory, year, month, day, slug + '.html')
+
+
+class RecordedBlogHandler(BaseHTTPRequestHandler):
+    """Sert le sitemap (URLs réécrites vers ce serveur) et les pages enregistrées"""
+
+    # Configurés par make_server
+    directory = None
+    flaky = 0.0
+    retry_after = None
+    random = random.Random(0)
+    random_lock = threading.Lock()
+
+    def do_GET(self):
+        with self.random_lock:
+            failing = self.random.random() < self.flaky
+        if failing:
+            # Panne simulée : 429 + Retry-After si demandé, sinon 503
+            self.send_response(429 if self.retry_after is not None else 503)
+            if self.retry_after is not None:
+                self.send_header('Retry-After', str(self.retry_after))
+            self.end_headers()
+            return
+
+        if self.path.split('?')[0] == '/' + SITEMAP_FILE:
+            path = os.path.join(self.directory, SITEMAP_FILE)
+            with open(path, 'r', encoding='utf-8') as f:
+                body = f.read().replace(LIVE_BASE_URL, f"http://{self.headers['Host']}")
+            self._send(body.encode('utf-8'), 'application/xml', os.path.getmtime(path))
+            return
+
+        path = page_path(self.directory, self.path)
+        if path is None or not os.path.exists(path):
+            self.send_error(404)
+            return
+        with open(path, 'rb') as f:
+            self._send(f.read(), 'text/html; charset=utf-8', os.path.getmtime(path))
+
+    def _send(self, body, content_type, mtime):
+        # Validateurs comme un vrai serveur : ETag (empreinte du contenu) et
+        # Last-Modified (date du fichier) ; 304 si le client a déjà cette version
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        last_modified = formatdate(mtime, usegmt=True)
+        if self.headers.get('If-None-Match') == etag or (
+                'If-None-Match' not in self.headers
+                and self.headers.get('If-Modified-Since') == last_modified):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', last_modified)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(directory, port=0, flaky=0.0, retry_after=None, seed=0):
+    """
+    Crée le serveur (port 0 = port libre choisi par le système)
+
+    Returns:
+        (ThreadingHTTPServer, str): le serveur et son URL de base
+    """
+    handler = type('Handler', (RecordedBlogHandler,), {
+        'directory': directory,
+        'flaky': flaky,
+        'retry_after': retry_after,
+        'random': random.Random(seed),
+        'random_lock': threading.Lock(),
+    })
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def serve_in_thread(directory, **kwargs):
+    """Démarre le serveur en arrière-plan ; penser à appeler server.shutdown()"""
+    server, base_url = make_server(directory, **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, base_url
+
+
+# --- ENREGISTREMENT DES PAGES ---
+
+def write_sitemap(directory, entries):
+    """Écrit sitemap-0.xml à partir de couples (url, lastmod)"""
+    with open(os.path.join(directory, SITEMAP_FILE), 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+        for url, lastmod in entries:
+            f.write(f'<url><loc>{html.escape(url)}</loc>')
+            if lastmod:
+                f.write(f'<lastmod>{lastmod}</lastmod>')
+            f.write('</url>\n')
+        f.write('</urlset>\n')
+
+
+def save_page(directory, url, body):
+    path = page_path(directory, url[len(LIVE_BASE_URL):])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(body)
+
+
+def record(directory, limit=None):
+    """Télécharge le sitemap et les pages du vrai blog (débit limité)"""
+    from bs4 import BeautifulSoup
+    from concurrent_fetcher import PoliteFetcher
+
+    fetcher = PoliteFetcher(requests_per_second=1.0)
+    os.makedirs(directory, exist_ok=True)
+    sitemap = fetcher.get(f"{LIVE_BASE_URL}/{SITEMAP_FILE}").content
+    entries = []
+    for url_tag in BeautifulSoup(sitemap, 'xml').find_all('url'):
+        loc = url_tag.find('loc')
+        lastmod = url_tag.find('lastmod')
+        if loc and ARTICLE_PATH.match(loc.text.strip()[len(LIVE_BASE_URL):]):
+            entries.append((loc.text.strip(), lastmod.text.strip() if lastmod else None))
+    entries.sort()
+    entries = entries[:limit] if limit else entries
+
+    write_sitemap(directory, entries)
+    for url, _ in entries:
+        save_page(directory, url, fetcher.get(url).content)
+        print(f"Enregistré : {url}")
+
+
+NAV_LINKS = ['Research', 'Protocol', 'Ecosystem Support Program', 'Devcon', 'Security',
+             'Organizational', 'Ethereum.org', 'Next Billion', 'Education', 'Events']
+
+
+def render_fixture(title, author, date, category, paragraphs):
+    """
+    Page HTML dont la structure reprend celle des articles du blog
+
+    Comme sur le vrai site (Next.js), l'article est entouré d'un en-tête
+    <head> chargé, de menus et d'un pied de page, et le contenu est répété
+    dans le JSON __NEXT_DATA__ : la plus grande partie de la page n'est pas
+    l'article lui-même.
+    """
+    body = '\n'.join(f'<p>{html.escape(p)}</p>' for p in paragraphs)
+    meta = '\n'.join(
+        f'<link rel="preload" href="/_next/static/chunks/{i:02d}.js" as="script">' for i in range(20)
+    )
+    links = ''.join(
+        f'<li class="nav-item"><a class="nav-link" href="/category/{name.lower().replace(" ", "-")}">{name}</a></li>'
+        for name in NAV_LINKS
+    )
+    next_data = html.escape(json.dumps({'props': {'pageProps': {
+        'frontmatter': {'title': title, 'author': author, 'date': date, 'category': category},
+        'content': '\n\n'.join(paragraphs),
+    }}}), quote=False)
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head><meta charset="utf-8"><title>{html.escape(title)} | Ethereum Foundation Blog</title>
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<meta property="og:title" content="{html.escape(title)}">
+{meta}
+<style>body{{margin:0;font-family:sans-serif}}.post-content p{{line-height:1.6}}</style>
+</head>
+<body>
+<div id="__next">
+<header><nav><a href="/">Blog</a><ul class="nav-list">{links}</ul></nav></header>
+<main>
+<article>
+<h1>{html.escape(title)}</h1>
+<div class="byline"><span>Posted by {html.escape(author)} on {html.escape(date)}</span></div>
+<span class="post-category">{html.escape(category)}</span>
+<div class="post-content">
+{body}
+</div>
+</article>
+</main>
+<footer><ul class="footer-list">{links}{links}</ul><p>Ethereum Foundation</p></footer>
+</div>
+<script id="__NEXT_DATA__" type="application/json">{next_data}</script>
+</body>
+</html>
+"""
+
+
+def build_fixtures(directory, corpus_dir, limit=None):
+    """
+    Fabrique des pages hors ligne à partir de data/corpus_raw
+
+    Les champs viennent de ethereum_blog_articles.csv et le texte des fichiers
+    individual_articles, découpé en paragraphes d'environ 5 phrases.
+    """
+    df = pd.read_csv(os.path.join(corpus_dir, 'ethereum_blog_articles.csv'))
+    df = df.sort_values('url').head(limit) if limit else df.sort_values('url')
+    os.makedirs(directory, exist_ok=True)
+
+    entries = []
+    for row in df.itertuples():
+        path = os.path.join(corpus_dir, 'individual_articles', f"{row.id}.txt")
+        if not os.path.exists(path):
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read().split('=' * 50, 1)[-1].replace('\\n', ' ').strip()
+        sentences = re.split(r'(?<=\.) ', text)
+        paragraphs = [' '.join(sentences[i:i + 5]) for i in range(0, len(sentences), 5)]
+
+        page = render_fixture(row.title, row.author, row.publication_date, row.category, paragraphs)
+        save_page(directory, row.url, page.encode('utf-8'))
+        entries.append((row.url, f"{int(row.year):04d}-{int(row.month):02d}-{int(row.day):02d}"))
+
+    write_sitemap(directory, entries)
+    print(f"{len(entries)} pages écrites dans {directory}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveur local imitant blog.ethereum.org")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve = commands.add_parser('serve', help="servir un répertoire de pages enregistrées")
+    serve.add_argument('directory')
+    serve.add_argument('--port', type=int, default=8000)
+    serve.add_argument('--flaky', type=float, default=0.0, help="proportion de réponses en erreur")
+    serve.add_argument('--retry-after', type=int, default=None,
+                       help="répondre 429 avec ce Retry-After (secondes) au lieu de 503")
+
+    rec = commands.add_parser('record', help="enregistrer des pages du vrai blog")
+    rec.add_argument('directory')
+    rec.add_argument('--limit', type=int, default=None)
+
+    fixtures = commands.add_parser('fixtures', help="fabriquer des pages à partir du corpus")
+    fixtures.add_argument('directory')
+    fixtures.add_argument('--corpus-dir', default='../data/corpus_raw')
+    fixtures.add_argument('--limit', type=int, default=None)
+
+    args = parser.parse_args()
+    if args.command == 'serve':
+        server, base_url = make_server(args.directory, args.port, args.flaky, args.retry_after)
+        print(f"Pages de {args.directory} servies sur {base_url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    elif args.command == 'record':
+        record(args.directory, args.limit)
+    else:
+        build_fixtures(args.directory, args.corpus_dir, args.limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Discourse analysis of the Ethereum Foundation blog corpus.
+
+The analysis scripts as a library: every command of ``python -m eth_discourse``
+is a module of this package, and the main functions are importable from the
+package itself to count in-process, e.g. from a notebook::
+
+    from eth_discourse import open_token_store, process_corpus, tokenize_document, tokenizer_fingerprint
+    from eth_discourse import text_normalization
+
+    store = open_token_store('./data/corpus_txt', './data/token_cache/', tokenize_document,
+                             fingerprint=tokenizer_fingerprint(text_normalization))
+    counts = process_corpus(store)
+
+Names are resolved on first use, so importing the package loads neither NumPy
+nor pandas; only the module defining a name is imported.
+"""
+
+import importlib
+
+# Public name -> module defining it
+_EXPORTS = {
+    'tokenize_document': 'text_normalization',
+    'TextNormalizer': 'text_normalization',
+    'open_token_store': 'token_store',
+    'open_cached_store': 'token_store',
+    'tokenizer_fingerprint': 'token_store',
+    'process_corpus': 'extract_word_frequencies',
+    'frequency_frame': 'extract_word_frequencies',
+    'count_cooccurrences': 'cooccurrence_engine',
+    'cooccurrence_frame': 'cooccurrence_engine',
+    'read_corpus': 'corpus_store',
+    'write_corpus': 'corpus_store',
+    'load_metadata': 'corpus_views',
+    'select': 'corpus_views',
+    'segment': 'corpus_views',
+    'view_counts': 'corpus_views',
+    'build_index': 'positional_index',
+    'PositionalIndex': 'positional_index',
+    'build_manifest': 'corpus_manifest',
+    'verify_corpus': 'corpus_manifest',
+    'dedup_view': 'near_duplicates',
+    'lsh_clusters': 'near_duplicates',
+    'RunMetrics': 'stage_metrics',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{_EXPORTS[name]}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,5 @@
+from .cli import main
+
+# Guarded: worker processes started with "spawn" re-import this module
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Format of the .txt article files written by the extractor.
+
+Each file is named ``YYYY-MM-DD-<slug>.txt`` and holds a header
+(``Titre:``, ``Auteur:``, ``Date:``, ``URL:``, ``Catégorie:``) separated by
+literal ``\\n`` sequences, a line of ``=`` and the article body. Only the
+standard library is used, so that the corpus manifest reads these files
+without loading pandas or pyarrow (see ``corpus_store`` for the columnar
+corpus file).
+"""
+
+import re
+
+ID_COLUMN = 'id'
+
+# Header of the .txt files written by the extractor (literal "\n" separators)
+HEADER_SEPARATOR = '=' * 50
+HEADER_FIELDS = {
+    'Titre': 'title',
+    'Auteur': 'author',
+    'Date': 'publication_date',
+    'URL': 'url',
+    'Catégorie': 'category',
+}
+LEADING_NEWLINES = re.compile(r'\A(?:\\n|\s)+')
+ARTICLE_ID = re.compile(r'^(\d{4})-(\d{2})-(\d{2})-(.+)$')
+
+
+def parse_txt_article(filename, text):
+    """Article dict of one data/corpus_txt file: header fields + body."""
+    header, body = text.split(HEADER_SEPARATOR, 1)
+    article = {}
+    for line in header.split('\\n'):
+        key, _, value = line.partition(': ')
+        if key.strip() in HEADER_FIELDS:
+            article[HEADER_FIELDS[key.strip()]] = value.strip()
+
+    article[ID_COLUMN] = filename[:-len('.txt')]
+    year, month, day, slug = ARTICLE_ID.match(article[ID_COLUMN]).groups()
+    content = LEADING_NEWLINES.sub('', body)
+    article.update({
+        'year': year, 'month': month, 'day': day, 'slug': slug,
+        'content': content,
+        'word_count': len(content.split()),
+        'character_count': len(content),
+    })
+    return article
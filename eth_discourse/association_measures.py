@@ -0,0 +1,81 @@
+"""
+Vectorized association measures of co-occurrence pairs.
+
+Raw co-occurrence counts favour frequent words: "ethereum" co-occurs with
+everything. The measures below compare the observed count ``O`` of a pair with
+the count ``E`` expected if the two words were placed independently, using the
+unigram counts of ``extract_word_frequencies.py``. Every measure is computed
+for all pairs at once from NumPy arrays.
+
+With window size ``W``, one occurrence of a word is paired with its
+``W - 1`` neighbours on each side, the neighbour at distance ``d`` being
+counted in ``W - d`` windows (see ``cooccurrence_engine``). Each occurrence
+therefore carries ``k = W * (W - 1)`` pair counts, and for words ``x`` and
+``y`` of frequencies ``f1`` and ``f2`` in a corpus of ``N`` tokens::
+
+    E = k * f1 * f2 / N
+
+The contingency table used for G² is the one of the ``k * N`` oriented
+pair counts (Evert, "Corpora and collocations", surface co-occurrence)::
+
+                 second = y        second != y
+    first = x    O11 = O           O12 = k*f1 - O
+    first != x   O21 = k*f2 - O    O22 = k*N - k*f1 - k*f2 + O
+
+Columns::
+
+    pmi       log2(O / E)
+    ppmi      max(pmi, 0)
+    g2        log-likelihood ratio 2 * sum(Oij * ln(Oij / Eij)) over the table
+    t_score   (O - E) / sqrt(O)
+    dice      2 * O / (k*f1 + k*f2)
+"""
+
+import numpy as np
+from scipy.special import xlogy
+
+MEASURES = ('pmi', 'ppmi', 'g2', 't_score', 'dice')
+
+
+def pair_weight(window_size):
+    """Pair counts carried by one token occurrence (``k``)."""
+    return window_size * (window_size - 1)
+
+
+def association_measures(rows, cols, counts, unigram_counts, window_size):
+    """
+    Association measures of the pairs ``(rows[i], cols[i])`` counted ``counts[i]`` times.
+
+    ``rows`` and ``cols`` are token IDs indexing ``unigram_counts``. Returns
+    ``{measure: float64 array}`` aligned with the input arrays.
+    """
+    unigram_counts = np.asarray(unigram_counts, dtype=np.float64)
+    k = float(pair_weight(window_size))
+    total = k * unigram_counts.sum()
+
+    o11 = np.asarray(counts, dtype=np.float64)
+    r1 = k * unigram_counts[rows]
+    c1 = k * unigram_counts[cols]
+    e11 = r1 * c1 / total
+
+    # Pairs spanning document boundaries are never counted, so the margins
+    # are slight overestimates; clipping keeps the table non-negative.
+    # xlogy(0, ...) is 0: empty cells do not contribute.
+    g2 = xlogy(o11, o11 / e11)
+    o12 = np.maximum(r1 - o11, 0)
+    g2 += xlogy(o12, o12 / (r1 * (total - c1) / total))
+    o21 = np.maximum(c1 - o11, 0)
+    g2 += xlogy(o21, o21 / ((total - r1) * c1 / total))
+    o22 = np.maximum(total - r1 - c1 + o11, 0)
+    g2 += xlogy(o22, o22 / ((total - r1) * (total - c1) / total))
+    g2 *= 2
+
+    pmi = np.log2(o11 / e11)
+
+    return {
+        'pmi': pmi,
+        'ppmi': np.maximum(pmi, 0),
+        'g2': np.maximum(g2, 0),
+        't_score': (o11 - e11) / np.sqrt(o11),
+        'dice': 2 * o11 / (r1 + c1),
+    }
@@ -0,0 +1,71 @@
+"""
+Command line of the analysis package: ``python -m eth_discourse <command>``.
+
+Every command is implemented by one module of the package with an
+``add_arguments(parser)`` and a ``run(args)`` function. Only the module of the
+command being run is imported, so ``--help`` and the light commands
+(``count-files``) start without loading NumPy, pandas or matplotlib.
+
+    python -m eth_discourse --help
+    python -m eth_discourse frequencies --workers 4
+    python -m eth_discourse index kwic "proof of stake"
+"""
+
+import argparse
+import importlib
+import sys
+
+from .config import UsageError
+
+# Command name -> (module, help), in pipeline order
+COMMANDS = {
+    'tokenize': ('token_store', "tokenize the corpus into the token cache"),
+    'duplicates': ('near_duplicates', "near-duplicate articles and repeated passages, left out with --dedup"),
+    'frequencies': ('extract_word_frequencies', "word frequencies (outputs/word_frequencies.csv)"),
+    'cooccurrences': ('compute_cooccurrences', "word co-occurrences (outputs/cooccurrence_pairs.csv)"),
+    'collocations': ('extract_collocations', "bigram and trigram collocations in bounded memory"),
+    'frequency-charts': ('visualize_frequencies', "bar chart and word cloud of the word frequencies"),
+    'network': ('visualize_lexical_network', "draw the lexical co-occurrence network"),
+    'segments': ('module_segmentation_corpus', "frequencies and co-occurrences of metadata segments"),
+    'diachronic': ('diachronic_counts', "per-year and per-month frequencies and co-occurrences"),
+    'index': ('positional_index', "positional index with KWIC, phrase and proximity queries"),
+    'corpus-file': ('corpus_store', "convert the .txt corpus into a single columnar corpus file"),
+    'count-files': ('corpus_files', "count the .txt files of a corpus directory"),
+    'manifest': ('corpus_manifest', "hashed corpus manifest; verify the raw, txt and CSV corpus"),
+    'pipeline': ('run_pipeline', "run the analysis pipeline, skipping up-to-date stages"),
+}
+
+
+def requested_command(argv):
+    """The command named in ``argv``: its first argument that is not an option, or None."""
+    return next((argument for argument in argv if not argument.startswith('-')), None)
+
+
+def build_parser(command=None):
+    """
+    Parser of every command; only ``command`` gets its options (and its module imported).
+
+    Returns the parser and the subparser of ``command`` (None if unknown).
+    """
+    parser = argparse.ArgumentParser(prog='python -m eth_discourse',
+                                     description="Discourse analysis of the Ethereum Foundation blog corpus.")
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND', required=True)
+    selected = None
+    for name, (module_name, help_text) in COMMANDS.items():
+        subparser = commands.add_parser(name, help=help_text, description=help_text)
+        if name == command:
+            module = importlib.import_module(f'.{module_name}', __package__)
+            module.add_arguments(subparser)
+            subparser.set_defaults(run=module.run)
+            selected = subparser
+    return parser, selected
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    parser, subparser = build_parser(requested_command(argv))
+    args = parser.parse_args(argv)
+    try:
+        args.run(args)
+    except UsageError as error:
+        subparser.error(str(error))
@@ -0,0 +1,116 @@
+import os
+from functools import partial
+
+from .config import (STATE_DIR, UsageError, add_corpus_arguments, add_dedup_argument, add_metadata_argument,
+                     add_metrics_arguments, add_output_argument, corpus_source)
+from .cooccurrence_engine import cooccurrence_frame, count_cooccurrences, document_cooccurrences
+from .cooccurrence_sketch import heavy_cooccurrences
+from .corpus_views import load_metadata, select, view_documents
+from .extract_word_frequencies import process_corpus as count_words
+from .incremental_counts import IncrementalCounts, format_changes
+from .memory_usage import format_peak_rss
+from .near_duplicates import dedup_view, format_dedup
+from . import stage_metrics
+from . import text_normalization
+from .text_normalization import tokenize_document
+from .token_store import open_token_store, tokenizer_fingerprint
+
+# --- CO-OCCURRENCE EXTRACTION ---
+
+WINDOW_SIZE = 5
+# Smallest count kept by --memory-budget (THRESHOLD of visualize_lexical_network.py)
+MIN_COUNT = 5
+
+def process_corpus(store, window_size, workers=1, documents=None):
+    return count_cooccurrences(store, window_size, documents=documents, workers=workers)
+
+def add_arguments(parser):
+    add_corpus_arguments(parser)
+    add_output_argument(parser)
+    parser.add_argument('--incremental', action='store_true',
+                        help="only count added/edited/deleted documents since the last incremental run")
+    parser.add_argument('--state-dir', default=os.path.join(STATE_DIR, 'cooccurrences'),
+                        help="state of --incremental (default: %(default)s)")
+    parser.add_argument('--memory-budget', type=float, default=None, metavar='MB',
+                        help="only keep pairs counted --min-count times or more, counting them in this "
+                             "much memory (count-min sketch and candidate pairs) instead of every distinct pair")
+    parser.add_argument('--min-count', type=int, default=MIN_COUNT,
+                        help=f"smallest pair count kept with --memory-budget (default: {MIN_COUNT})")
+    parser.add_argument('--sketch-only', action='store_true',
+                        help="with --memory-budget, report the sketch estimates (upper bounds) "
+                             "instead of exact counts")
+    parser.add_argument('--where', action='append', default=[], metavar='COLUMN=VALUE',
+                        help="only count the articles matching this metadata filter, e.g. "
+                             "author=Vitalik Buterin or year=2014..2016 (repeatable, see corpus_views.py)")
+    parser.add_argument('--counts-only', action='store_true',
+                        help="only write word1, word2, count (no association measure columns)")
+    add_metadata_argument(parser)
+    add_dedup_argument(parser)
+    add_metrics_arguments(parser)
+
+def run(args):
+    if args.memory_budget is not None and args.incremental:
+        raise UsageError("--memory-budget and --incremental cannot be combined")
+    if args.where and (args.incremental or args.memory_budget is not None):
+        raise UsageError("--where cannot be combined with --incremental or --memory-budget")
+    if args.dedup and args.incremental:
+        raise UsageError("--dedup cannot be combined with --incremental")
+    metrics = stage_metrics.from_arguments('compute_cooccurrences', args)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    with metrics.stage('tokenize'):
+        store = open_token_store(
+            corpus_source(args), args.cache_dir, tokenize_document,
+            fingerprint=tokenizer_fingerprint(text_normalization),
+            workers=args.workers
+        )
+    if args.dedup:
+        store, stale = dedup_view(store, args.dedup)
+        print(format_dedup(args.dedup, store, stale))
+    documents = None
+    if args.where:
+        documents, missing = view_documents(store, select(load_metadata(args.corpus or args.metadata), args.where))
+        print(f"{len(documents)} articles match {' and '.join(args.where)}")
+        if missing:
+            print(f"WARNING: {len(missing)} matching articles are not in the corpus")
+        if args.dedup:
+            documents = store.kept(documents)
+    metrics.record_corpus(store, documents)
+
+    with metrics.stage('count'):
+        if args.incremental:
+            vocab_size = len(store.vocabulary)
+            count_document = partial(document_cooccurrences, window_size=WINDOW_SIZE, ranks=store.word_ranks())
+            cooccurrences, changes = IncrementalCounts(args.state_dir, f'cooccurrences:window={WINDOW_SIZE}').update(
+                store, count_document, (vocab_size, vocab_size), args.workers
+            )
+            print(format_changes(changes))
+        elif args.memory_budget is not None:
+            try:
+                cooccurrences, sketch = heavy_cooccurrences(
+                    store, WINDOW_SIZE, args.min_count, int(args.memory_budget * 1024 * 1024),
+                    exact=not args.sketch_only, workers=args.workers
+                )
+            except ValueError as error:
+                raise UsageError(str(error))
+            print(f"Count-min sketch: {sketch.depth} x {sketch.width:,} counters "
+                  f"({sketch.nbytes / 1024 / 1024:.1f} MB of the {args.memory_budget:g} MB budget), "
+                  f"{cooccurrences.nnz:,} pairs with count >= {args.min_count}")
+        else:
+            cooccurrences = process_corpus(store, WINDOW_SIZE, args.workers, documents)
+
+    with metrics.stage('measures'):
+        # Unigram counts of word_frequencies.csv, for PMI, PPMI, G², t-score and Dice
+        unigram_counts = None if args.counts_only else count_words(store, args.workers, documents)
+
+        # Convert to dataframe (most frequent first, ties in alphabetical order)
+        df = cooccurrence_frame(cooccurrences, store.vocabulary_array, store.word_ranks(),
+                                unigram_counts, WINDOW_SIZE)
+
+    with metrics.stage('write'):
+        df.to_csv(os.path.join(args.output_dir, 'cooccurrence_pairs.csv'), index=False, float_format='%.6g')
+
+    print("Co-occurrence extraction completed and saved successfully.")
+    print(format_peak_rss())
+    metrics.write()
@@ -0,0 +1,67 @@
+"""
+Default locations of the corpus, caches and outputs, and the command line
+options shared by the commands to change them.
+
+Paths are relative to the working directory, the repository root by
+default. This module imports nothing: the command line builds its parser
+from it without loading NumPy or pandas.
+"""
+
+DATA_DIR = './data/corpus_txt'
+RAW_DIR = './data/corpus_raw/individual_articles'
+METADATA_FILE = './data/corpus_raw/ethereum_blog_articles.csv'
+CORPUS_FILE = './data/corpus.arrow'
+MANIFEST_FILE = './data/corpus_manifest.json'
+CACHE_DIR = './data/token_cache/'
+STATE_DIR = './data/incremental_state/'
+INDEX_DIR = './data/positional_index/'
+PIPELINE_STATE_FILE = './data/pipeline_state.json'
+DEDUP_FILE = './data/near_duplicates.json'
+OUTPUT_DIR = './outputs/'
+METRICS_DIR = './outputs/metrics/'
+
+
+class UsageError(ValueError):
+    """Invalid combination of command options, reported by the command line as a usage error."""
+
+
+def add_corpus_arguments(parser, workers=True):
+    """Corpus source and token cache options: ``--data-dir``, ``--corpus``, ``--cache-dir``, ``--workers``."""
+    parser.add_argument('--data-dir', default=DATA_DIR,
+                        help=f"directory of the .txt articles (default: {DATA_DIR})")
+    parser.add_argument('--corpus', default=None,
+                        help="read a columnar corpus file (see corpus_store.py) instead of --data-dir")
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help=f"token cache directory (default: {CACHE_DIR})")
+    if workers:
+        parser.add_argument('--workers', type=int, default=1, help="number of worker processes (default: 1)")
+
+
+def add_metadata_argument(parser):
+    parser.add_argument('--metadata', default=METADATA_FILE,
+                        help=f"article metadata CSV, used without --corpus (default: {METADATA_FILE})")
+
+
+def add_output_argument(parser, default=OUTPUT_DIR):
+    parser.add_argument('--output-dir', default=default, help=f"output directory (default: {default})")
+
+
+def add_metrics_arguments(parser):
+    parser.add_argument('--metrics', default=None, metavar='FILE',
+                        help=f"run metrics file (default: {METRICS_DIR}<module>.json)")
+    parser.add_argument('--profile', default=None, metavar='DIR',
+                        help="dump a cProfile of every stage to DIR/<module>.<stage>.prof "
+                             "(default: $PIPELINE_PROFILE_DIR if set)")
+    parser.add_argument('--vocabulary-growth', action='store_true',
+                        help="also record the vocabulary growth curve of the corpus, an extra pass over "
+                             "every document (default: on if $PIPELINE_VOCABULARY_GROWTH is set)")
+
+
+def add_dedup_argument(parser):
+    parser.add_argument('--dedup', default=None, metavar='PLAN',
+                        help=f"leave out the near-duplicates and repeated passages of a plan written by "
+                             f"the duplicates command (e.g. {DEDUP_FILE})")
+
+
+def corpus_source(args):
+    """The corpus file if given, else the .txt directory."""
+    return args.corpus or args.data_dir
@@ -0,0 +1,159 @@
+"""
+Vectorized sparse co-occurrence counting.
+
+Counts the same quantity as the original sliding-window loop of
+``compute_cooccurrences.py``: for every token position ``i`` the window
+``tokens[i:i+window_size]`` is taken, and every pair of positions inside the
+window holding two different words is counted once.
+
+A pair of positions at distance ``d`` (``0 < d < window_size``) whose left
+position is ``i`` belongs to ``min(i + 1, window_size - d)`` windows, so the
+whole count can be produced from ``window_size - 1`` shifted copies of the
+token-ID array instead of enumerating windows in Python.
+
+Counts are accumulated in a SciPy sparse matrix indexed by token ID. Each
+unordered pair is stored once, with the alphabetically smaller word as the
+row, so the matrix holds the upper triangle of the symmetric count matrix
+(``M + M.T`` gives the full symmetric form).
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from .association_measures import association_measures
+from .corpus_parallel import map_shards
+from .stage_metrics import timed_document
+
+COUNT_DTYPE = np.int64
+# Number of buffered pair entries before they are folded into the matrix
+FLUSH_ENTRIES = 4_000_000
+
+
+def window_pairs(ids, window_size, ranks):
+    """
+    Return the (row, col, weight) arrays of every pair counted in one document.
+
+    ``ranks`` gives the alphabetical rank of every token ID; it orients each
+    pair so that ``row`` is the ID of the alphabetically smaller word.
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    n = len(ids)
+    rows, cols, weights = [], [], []
+
+    for d in range(1, min(window_size, n)):
+        left = ids[:n - d]
+        right = ids[d:]
+        weight = np.minimum(np.arange(1, n - d + 1, dtype=COUNT_DTYPE), window_size - d)
+
+        keep = left != right
+        left, right, weight = left[keep], right[keep], weight[keep]
+
+        swap = ranks[left] > ranks[right]
+        rows.append(np.where(swap, right, left))
+        cols.append(np.where(swap, left, right))
+        weights.append(weight)
+
+    if not rows:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0, dtype=COUNT_DTYPE)
+    return np.concatenate(rows), np.concatenate(cols), np.concatenate(weights)
+
+
+def run_pairs(runs, window_size, ranks):
+    """``window_pairs`` of the token runs of one document (``TokenStore.token_runs``), no window crossing two runs."""
+    if len(runs) == 1:
+        return window_pairs(runs[0], window_size, ranks)
+    return tuple(np.concatenate(parts) for parts in zip(*(window_pairs(ids, window_size, ranks) for ids in runs)))
+
+
+def document_cooccurrences(ids, vocab_size, window_size, ranks):
+    """Co-occurrence counts of a single document as a sparse matrix."""
+    rows, cols, weights = window_pairs(ids, window_size, ranks)
+    return sparse.coo_matrix((weights, (rows, cols)), shape=(vocab_size, vocab_size)).tocsr()
+
+
+class CooccurrenceCounter:
+    """Accumulates window pair counts of many documents into one sparse matrix."""
+
+    def __init__(self, vocab_size, window_size, ranks):
+        self.shape = (vocab_size, vocab_size)
+        self.window_size = window_size
+        self.ranks = ranks
+        self.matrix = sparse.csr_matrix(self.shape, dtype=COUNT_DTYPE)
+        self._buffer = []
+        self._buffered = 0
+
+    def add(self, ids):
+        rows, cols, weights = window_pairs(ids, self.window_size, self.ranks)
+        self._buffer.append((rows, cols, weights))
+        self._buffered += len(weights)
+        if self._buffered >= FLUSH_ENTRIES:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        rows, cols, weights = (np.concatenate(parts) for parts in zip(*self._buffer))
+        # Duplicate (row, col) entries are summed by the COO -> CSR conversion
+        self.matrix = self.matrix + sparse.coo_matrix(
+            (weights, (rows, cols)), shape=self.shape
+        ).tocsr()
+        self._buffer = []
+        self._buffered = 0
+
+    def result(self):
+        self._flush()
+        return self.matrix
+
+
+def _count_shard(filenames, store, window_size, ranks):
+    counter = CooccurrenceCounter(len(store.vocabulary), window_size, ranks)
+    for filename in filenames:
+        with timed_document(filename, store):
+            for ids in store.token_runs(filename):
+                counter.add(ids)
+    return counter.result()
+
+
+def count_cooccurrences(store, window_size, documents=None, workers=1):
+    """
+    Co-occurrence matrix of the documents of a ``TokenStore`` (all by default).
+
+    With ``workers > 1`` every worker process counts a shard of documents into
+    its own sparse matrix; the partial matrices are summed in shard order.
+    """
+    documents = store.documents if documents is None else documents
+    ranks = store.word_ranks()
+    matrix = sparse.csr_matrix((len(store.vocabulary),) * 2, dtype=COUNT_DTYPE)
+    for partial in map_shards(_count_shard, documents, workers,
+                              store=store, window_size=window_size, ranks=ranks):
+        matrix = matrix + partial
+    return matrix
+
+
+def cooccurrence_frame(matrix, vocabulary, ranks, unigram_counts=None, window_size=None):
+    """
+    Convert a co-occurrence matrix to the ``word1, word2, count`` table.
+
+    Rows are sorted by decreasing count, ties in alphabetical order, exactly
+    like ``cooccurrence_pairs.csv``. With ``unigram_counts`` (word counts by
+    token ID) the association measures of ``association_measures`` are added
+    as extra columns.
+    """
+    coo = matrix.tocoo()
+    keep = coo.data > 0
+    rows, cols, counts = coo.row[keep], coo.col[keep], coo.data[keep]
+
+    order = np.lexsort((ranks[cols], ranks[rows], -counts))
+    rows, cols, counts = rows[order], cols[order], counts[order]
+    words = np.asarray(vocabulary, dtype=object)
+    frame = pd.DataFrame({
+        'word1': words[rows],
+        'word2': words[cols],
+        'count': counts,
+    })
+    if unigram_counts is not None:
+        for name, values in association_measures(rows, cols, counts, unigram_counts, window_size).items():
+            frame[name] = values
+    return frame
@@ -0,0 +1,359 @@
+"""
+Bounded-memory heavy-hitter co-occurrence counting.
+
+The exact engine (``cooccurrence_engine``) keeps every distinct pair in a
+sparse matrix, while the lexical network only uses pairs counted at least
+``THRESHOLD`` times; most distinct pairs are count-1 noise. This module finds
+those heavy pairs with memory fixed by a user budget instead of the size of
+the pair space.
+
+1. Sketch pass: every window pair (same pairs and weights as
+   ``cooccurrence_engine.run_pairs``) is added to a count-min sketch, a ``depth x width`` table
+   of counters where each pair is hashed to one counter per row. The estimate
+   of a pair is the minimum of its counters: never below the true count, and
+   above it only through hash collisions.
+2. Candidate pass: the corpus is read again and every pair whose estimate
+   reaches ``min_count`` is kept. Since estimates never under-count, every
+   pair whose true count reaches ``min_count`` is a candidate. The candidates
+   are counted exactly on the way, so the final table holds exactly the pairs
+   with ``count >= min_count`` and their true counts; with ``exact=False`` the
+   sketch estimates (upper bounds) are reported instead.
+
+The memory budget covers both tables: ``SKETCH_SHARE`` of it is the sketch,
+the rest the candidate tables (``CandidateCounts``), whose size is checked as
+candidates are added. Half of the candidate share holds the merged table,
+the other half is split between the tables of the shards being counted, one
+per worker. When a table outgrows its share, the candidate pass starts over
+with the keys split into twice as many hash partitions, each counted by its
+own pass over the corpus and pruned to ``min_count`` before the next
+(``count_candidates``), so a small budget costs passes rather than memory.
+A budget too small even for ``MAX_PASSES`` passes is an error rather than an
+overrun. Besides the budget, every process holds the token store it reads
+and one batch of at most ``BATCH_ENTRIES`` pairs, and the parent the pairs
+already kept.
+
+There is only ever one sketch table. Pairs are added to it as per-row sums
+of their buckets, so a batch of pairs costs memory in proportion to the
+batch, not to the sketch width. With several workers the table is a
+temporary memory-mapped file: workers return the bucket sums of their shard
+to the parent, which adds them, and in the candidate pass they map the
+finished table instead of receiving a copy with every shard.
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+
+import numpy as np
+from scipy import sparse
+
+from .cooccurrence_engine import COUNT_DTYPE, run_pairs
+from .corpus_parallel import map_shards
+from .stage_metrics import timed_document
+
+SKETCH_DEPTH = 4
+SKETCH_SEED = 20240501
+COUNTER_DTYPE = np.int64
+# Share of the memory budget given to the sketch; the rest holds the candidates
+SKETCH_SHARE = 0.5
+# Pair entries hashed at once (rows, cols, weights, keys and sort temporaries:
+# about 80 bytes each)
+BATCH_ENTRIES = 1_000_000
+# Copies of a candidate alive while tables are merged (totals, buffered
+# shards, merged result and sort order)
+MERGE_COPIES = 3
+# Most passes of the candidate count before a budget is declared too small
+MAX_PASSES = 64
+PARTITION_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _bucket_sums(buckets, weights):
+    """Unique ``buckets`` (sorted) and the sum of the ``weights`` of each."""
+    if not len(buckets):
+        return buckets, weights
+    order = np.argsort(buckets, kind='stable')
+    buckets, weights = buckets[order], weights[order]
+    starts = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+    return buckets[starts], np.add.reduceat(weights, starts)
+
+
+class CountMinSketch:
+    """
+    Count-min sketch of integer keys with ``depth`` rows of ``width`` counters.
+
+    ``width`` is rounded down to a power of two: row ``j`` hashes a key with
+    the multiply-shift function ``(key * a_j + b_j) mod 2**64 >> (64 - bits)``.
+    With ``path``, the table is a zero-filled memory-mapped file there, sent to
+    worker processes by name when the sketch is pickled.
+    """
+
+    def __init__(self, width, depth=SKETCH_DEPTH, seed=SKETCH_SEED, path=None):
+        self.bits = max(1, int(width).bit_length() - 1)
+        self.width = 1 << self.bits
+        self.depth = depth
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        self.multipliers = rng.integers(0, 1 << 63, size=depth, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.offsets = rng.integers(0, 1 << 63, size=depth, dtype=np.uint64)
+        if path is None:
+            self.table = np.zeros((depth, self.width), dtype=COUNTER_DTYPE)
+        else:
+            self.table = np.memmap(path, dtype=COUNTER_DTYPE, mode='w+', shape=(depth, self.width))
+
+    @classmethod
+    def from_budget(cls, budget_bytes, depth=SKETCH_DEPTH, seed=SKETCH_SEED, path=None):
+        """Largest sketch whose table fits in ``budget_bytes``."""
+        width = budget_bytes // (depth * np.dtype(COUNTER_DTYPE).itemsize)
+        if width < 2:
+            raise ValueError(f"memory budget of {budget_bytes} bytes is too small for a sketch")
+        return cls(width, depth, seed, path)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        if isinstance(self.table, np.memmap):
+            state['table'] = (self.table.filename, self.table.shape)
+        return state
+
+    def __setstate__(self, state):
+        if isinstance(state['table'], tuple):
+            path, shape = state['table']
+            state['table'] = np.memmap(path, dtype=COUNTER_DTYPE, mode='r', shape=shape)
+        self.__dict__.update(state)
+
+    @property
+    def nbytes(self):
+        return self.table.nbytes
+
+    def _buckets(self, keys):
+        keys = np.asarray(keys, dtype=np.uint64)
+        shift = np.uint64(64 - self.bits)
+        return [((keys * a + b) >> shift).astype(np.int64) for a, b in zip(self.multipliers, self.offsets)]
+
+    def updates(self, keys, weights):
+        """Per-row ``(buckets, sums)`` of adding ``keys`` with ``weights``, as large as the keys at most."""
+        weights = np.asarray(weights, dtype=COUNTER_DTYPE)
+        return [_bucket_sums(buckets, weights) for buckets in self._buckets(keys)]
+
+    def apply(self, updates):
+        for row, (buckets, sums) in zip(self.table, updates):
+            # Buckets are unique, so the indexed sum adds every weight
+            row[buckets] += sums
+
+    def add(self, keys, weights):
+        self.apply(self.updates(keys, weights))
+
+    def estimate(self, keys):
+        estimates = None
+        for row, buckets in zip(self.table, self._buckets(keys)):
+            counts = row[buckets]
+            estimates = counts if estimates is None else np.minimum(estimates, counts)
+        return estimates
+
+
+def merge_updates(parts):
+    """Sum of several ``CountMinSketch.updates`` of the same sketch."""
+    parts = list(parts)
+    if len(parts) == 1:
+        return parts[0]
+    return [_bucket_sums(np.concatenate([part[row][0] for part in parts]),
+                         np.concatenate([part[row][1] for part in parts]))
+            for row in range(len(parts[0]))]
+
+
+@contextmanager
+def shared_sketch(budget_bytes, workers=1):
+    """
+    Count-min sketch of ``budget_bytes``; with several workers its table is a
+    temporary memory-mapped file, removed on exit.
+    """
+    if workers <= 1:
+        yield CountMinSketch.from_budget(budget_bytes)
+        return
+    with tempfile.TemporaryDirectory(prefix='sketch-', ignore_cleanup_errors=True) as directory:
+        yield CountMinSketch.from_budget(budget_bytes, path=os.path.join(directory, 'table.bin'))
+
+
+def fill_sketch(sketch, function, items, workers=1, **kwargs):
+    """Add to ``sketch`` the updates returned by ``function(shard, sketch=sketch, **kwargs)``."""
+    for updates in map_shards(function, items, workers, sketch=sketch, **kwargs):
+        sketch.apply(updates)
+
+
+class CandidateOverflow(ValueError):
+    """Candidates outgrew the memory given to them."""
+
+
+class CandidateCounts:
+    """
+    Exact counts of candidate keys, merged shard by shard within ``budget_bytes``.
+
+    Shard results are buffered and merged once they are as large as the
+    totals, so merging costs ``O(C log C)`` overall for ``C`` candidates.
+    Optional ``payload`` rows (e.g. the words of an n-gram key) are kept from
+    the first occurrence of each key in merge order. ``CandidateOverflow`` is
+    raised as soon as the merged keys do not fit.
+    """
+
+    def __init__(self, budget_bytes, label='candidates'):
+        self.budget_bytes = budget_bytes
+        self.label = label
+        self.keys = None
+        self.counts = None
+        self.payload = None
+        self._parts = []
+        self._buffered = 0
+
+    def add(self, keys, counts, payload=None):
+        if not len(keys):
+            return
+        self._parts.append((keys, counts, payload))
+        self._buffered += len(keys)
+        total = self._buffered + (0 if self.keys is None else len(self.keys))
+        entry = keys.itemsize + counts.itemsize + (0 if payload is None else payload[0].nbytes)
+        if total * entry * MERGE_COPIES > self.budget_bytes:
+            self._merge()
+            total = len(self.keys)
+            if total * entry * MERGE_COPIES > self.budget_bytes:
+                raise CandidateOverflow(
+                    f"{total:,} {self.label} need {total * entry * MERGE_COPIES / 1024 / 1024:.2f} MB, more than "
+                    f"the {self.budget_bytes / 1024 / 1024:.2f} MB left for them by the memory budget")
+        elif self.keys is None or self._buffered >= len(self.keys):
+            self._merge()
+
+    def _merge(self):
+        parts = ([] if self.keys is None else [(self.keys, self.counts, self.payload)]) + self._parts
+        self._parts, self._buffered = [], 0
+        keys = np.concatenate([part[0] for part in parts])
+        counts = np.concatenate([part[1] for part in parts])
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+        self.keys = keys[starts]
+        self.counts = np.add.reduceat(counts[order], starts)
+        if parts[0][2] is not None:
+            self.payload = np.concatenate([part[2] for part in parts])[order[starts]]
+
+    def totals(self):
+        """Sorted unique keys, their counts and their payload (None without)."""
+        if self._parts:
+            self._merge()
+        if self.keys is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=COUNT_DTYPE), None
+        return self.keys, self.counts, self.payload
+
+
+def in_pass(keys, number, passes):
+    """Mask of the ``keys`` counted by pass ``number`` of ``passes``, a hash partition of the keys."""
+    if passes == 1:
+        return np.ones(len(keys), dtype=bool)
+    hashes = (np.asarray(keys).astype(np.uint64) * PARTITION_MULTIPLIER) >> np.uint64(32)
+    return hashes % np.uint64(passes) == np.uint64(number)
+
+
+def _count_passes(function, items, budget_bytes, min_total, label, workers, passes, kwargs):
+    kept = []
+    for number in range(passes):
+        merged = CandidateCounts(budget_bytes // 2, label)
+        for keys, counts, payload in map_shards(function, items, workers, budget_bytes=budget_bytes // 2 // workers,
+                                                label=label, number=number, passes=passes, **kwargs):
+            merged.add(keys, counts, payload)
+        keys, counts, payload = merged.totals()
+        keep = counts >= min_total
+        kept.append((keys[keep], counts[keep], None if payload is None else payload[keep]))
+    keys = np.concatenate([part[0] for part in kept])
+    order = np.argsort(keys, kind='stable')
+    # Passes without candidates have no payload
+    payloads = [part[2] for part in kept if part[2] is not None]
+    payload = np.concatenate(payloads)[order] if payloads else None
+    return keys[order], np.concatenate([part[1] for part in kept])[order], payload
+
+
+def count_candidates(function, items, budget_bytes, min_total, label='candidates', workers=1, **kwargs):
+    """
+    Sorted keys counted ``min_total`` times or more, their counts and payload (None without).
+
+    ``function(shard, budget_bytes, label, number, passes, **kwargs)`` returns
+    the ``CandidateCounts.totals`` of the candidates of its shard in pass
+    ``number`` of ``passes`` (``in_pass``), counted within ``budget_bytes``.
+    Half of ``budget_bytes`` holds the merged table of a pass, the other half
+    is split between the ``workers`` shard tables. If a table overflows, the
+    count starts over in twice as many passes; ``CandidateOverflow`` is
+    raised beyond ``MAX_PASSES``.
+    """
+    workers = max(1, workers)
+    passes = 1
+    while True:
+        try:
+            return _count_passes(function, items, budget_bytes, min_total, label, workers, passes, kwargs)
+        except CandidateOverflow as error:
+            if passes >= MAX_PASSES:
+                raise CandidateOverflow(f"{error}, even counted in {passes} passes: "
+                                        f"raise --memory-budget or --min-count") from None
+            passes *= 2
+
+
+def pair_keys(rows, cols, vocab_size):
+    """One integer key per oriented pair (row-major index in the V x V matrix)."""
+    return rows * np.int64(vocab_size) + cols
+
+
+def _pair_batches(filenames, store, window_size, ranks):
+    # Window pairs of consecutive documents, concatenated into batches of
+    # about BATCH_ENTRIES entries so that hashing works on large arrays
+    batch, buffered = [], 0
+    for filename in filenames:
+        with timed_document(filename, store):
+            pairs = run_pairs(store.token_runs(filename), window_size, ranks)
+        batch.append(pairs)
+        buffered += len(pairs[2])
+        if buffered >= BATCH_ENTRIES:
+            yield tuple(np.concatenate(parts) for parts in zip(*batch))
+            batch, buffered = [], 0
+    if batch:
+        yield tuple(np.concatenate(parts) for parts in zip(*batch))
+
+
+def _sketch_shard(filenames, store, window_size, ranks, sketch):
+    vocab_size = len(store.vocabulary)
+    return merge_updates(sketch.updates(pair_keys(rows, cols, vocab_size), weights)
+                         for rows, cols, weights in _pair_batches(filenames, store, window_size, ranks))
+
+
+def _candidate_shard(filenames, store, window_size, ranks, sketch, min_count, budget_bytes, label, number, passes):
+    vocab_size = len(store.vocabulary)
+    candidates = CandidateCounts(budget_bytes, label)
+    for rows, cols, weights in _pair_batches(filenames, store, window_size, ranks):
+        keys = pair_keys(rows, cols, vocab_size)
+        # Pairs of other passes, then pairs below min_count in the sketch, are dropped before counting
+        keep = in_pass(keys, number, passes)
+        keys, weights = keys[keep], weights[keep]
+        keep = sketch.estimate(keys) >= min_count
+        candidates.add(keys[keep], weights[keep])
+    return candidates.totals()
+
+
+def heavy_cooccurrences(store, window_size, min_count, memory_budget, exact=True, workers=1):
+    """
+    Co-occurrence matrix restricted to the pairs counted ``min_count`` times or more.
+
+    ``memory_budget`` (bytes) holds the count-min sketch and the candidate
+    tables (``count_candidates``); a ``ValueError`` is raised if the
+    candidates do not fit. Returns the matrix (oriented like
+    ``count_cooccurrences``) and the sketch.
+    """
+    documents = store.documents
+    ranks = store.word_ranks()
+    vocab_size = len(store.vocabulary)
+
+    sketch_budget = int(memory_budget * SKETCH_SHARE)
+    with shared_sketch(sketch_budget, workers) as sketch:
+        fill_sketch(sketch, _sketch_shard, documents, workers, store=store, window_size=window_size, ranks=ranks)
+
+        # Without exact counts every candidate is kept, with its estimate
+        keys, counts, _ = count_candidates(_candidate_shard, documents, memory_budget - sketch_budget,
+                                           min_count if exact else 0, 'candidate pairs', workers, store=store,
+                                           window_size=window_size, ranks=ranks, sketch=sketch, min_count=min_count)
+        data = counts if exact else sketch.estimate(keys)
+    rows, cols = np.divmod(keys, vocab_size)
+    matrix = sparse.coo_matrix((data, (rows, cols)), shape=(vocab_size, vocab_size)).tocsr()
+    return matrix, sketch
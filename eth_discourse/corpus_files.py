@@ -0,0 +1,30 @@
+import os
+
+from .config import DATA_DIR, RAW_DIR, add_metrics_arguments
+from . import stage_metrics
+
+def count_txt_files(directory):
+    count = 0
+    for file in os.listdir(directory):
+        if file.endswith(".txt"):
+            count += 1
+    return count
+
+def add_arguments(parser):
+    # Relative paths from the root of the GitHub repo
+    parser.add_argument('directory', nargs='?', default=DATA_DIR,
+                        help=f"directory to count .txt files in (default: {DATA_DIR}; raw articles: {RAW_DIR})")
+    add_metrics_arguments(parser)
+
+def run(args):
+    directory = args.directory
+
+    if not os.path.exists(directory):
+        print(f"Directory '{directory}' not found. Please check the path.")
+    else:
+        metrics = stage_metrics.from_arguments('corpus_files', args)
+        with metrics.stage('count'):
+            total_files = count_txt_files(directory)
+            metrics.add(documents_read=total_files)
+        print(f"Total .txt files found in '{directory}': {total_files}")
+        metrics.write()
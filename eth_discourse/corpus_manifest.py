@@ -0,0 +1,359 @@
+"""
+Hashed corpus manifest and integrity verification.
+
+The corpus is kept three times: the extractor output
+(data/corpus_raw/individual_articles), the copy the analyses read
+(data/corpus_txt) and the article metadata
+(data/corpus_raw/ethereum_blog_articles.csv). Counting the .txt files does not
+show a truncated, edited or unlisted article. The manifest records, for every
+.txt file of both directories::
+
+    sha256, bytes, mtime_ns   SHA-256 of the file (as in the token store), size, modification time
+    words, characters         size of the body, as word_count / character_count of the CSV
+    tokens                    tokens of the file as the token store counts them
+
+Files are hashed and tokenized in parallel (``--workers``). An entry is reused
+from the saved manifest when the size and modification time of its file are
+unchanged and the tokenizer is the same, so refreshing the manifest of a large
+corpus only reads the files that changed (``--rehash`` reads them all).
+
+``verify`` reads the three sources in one pass and reports every drift::
+
+    missing_raw, missing_txt   article missing from one of the directories
+    missing_from_csv           file without a metadata row
+    missing_file               metadata row without a file
+    duplicate_csv_id           id listed more than once in the CSV
+    content_differs            raw and txt files differ ("truncated" when one body is a prefix of the other)
+    metadata_mismatch          body word or character count differs from the CSV
+    unparsable, empty          header or file name not in the extractor format, body without words
+    added, removed, changed    files added, removed or changed since the saved manifest
+
+Only the standard library is used: verifying the corpus loads neither NumPy
+nor pandas. Run from the repository root:
+
+    python -m eth_discourse manifest build [--workers 4]
+    python -m eth_discourse manifest verify [--workers 4] [--update]
+"""
+
+import csv
+import hashlib
+import inspect
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from .article_files import parse_txt_article
+from .config import DATA_DIR, MANIFEST_FILE, METADATA_FILE, OUTPUT_DIR, RAW_DIR, add_metrics_arguments
+from .corpus_parallel import map_shards
+from . import stage_metrics
+from .stage_metrics import record_document
+from . import text_normalization
+from .text_normalization import tokenize_document
+
+MANIFEST_VERSION = 1
+REPORT_FILE = os.path.join(OUTPUT_DIR, 'corpus_verification.json')
+# Documents listed for every issue in the printed report (all of them are in the JSON report)
+REPORT_LIMIT = 10
+ISSUES = ('missing_raw', 'missing_txt', 'missing_from_csv', 'missing_file', 'duplicate_csv_id', 'content_differs',
+          'metadata_mismatch', 'unparsable', 'empty', 'added', 'removed', 'changed')
+
+
+# --- HASHING ---
+
+def tokenizer_fingerprint(*parts):
+    """
+    Hash the cleaning/tokenizing functions and word lists used to build a store.
+
+    Functions and modules contribute their source code, sets contribute their
+    sorted content. Any change to the rules therefore invalidates the cache.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if callable(part) or inspect.ismodule(part):
+            part = inspect.getsource(part)
+        elif isinstance(part, (set, frozenset)):
+            part = repr(sorted(part))
+        digest.update(str(part).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_text(path):
+    """Raw bytes of a file and its text as ``open(path, 'r')`` reads it (universal newlines)."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    return data, data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+
+
+def describe_text(filename, text):
+    """Body size and token count of one article file; ``error`` if it is not in the extractor format."""
+    entry = {'tokens': len(tokenize_document(text))}
+    try:
+        article = parse_txt_article(filename, text)
+    except (ValueError, AttributeError):
+        return dict(entry, words=None, characters=None, error='unparsable')
+    return dict(entry, words=article['word_count'], characters=article['character_count'])
+
+
+def _describe_shard(items):
+    """Entries of the files of a shard of (filename, [(source, path)]) items."""
+    described = []
+    for filename, paths in items:
+        entries, by_hash = {}, {}
+        for source, path in paths:
+            start = time.perf_counter()
+            data, text = read_text(path)
+            sha256 = hashlib.sha256(data).hexdigest()
+            # Identical raw and txt files are only tokenized once
+            if sha256 not in by_hash:
+                by_hash[sha256] = describe_text(filename, text)
+            entries[source] = dict(by_hash[sha256], sha256=sha256, bytes=len(data))
+            record_document(os.path.join(source, filename), time.perf_counter() - start, len(data),
+                            entries[source]['tokens'])
+        described.append(entries)
+    return described
+
+
+# --- MANIFEST ---
+
+def scan_txt(directory):
+    """{filename: (size, mtime_ns)} of the .txt files of ``directory`` (empty if it does not exist)."""
+    if not os.path.isdir(directory):
+        return {}
+    with os.scandir(directory) as entries:
+        return {
+            entry.name: (stat.st_size, stat.st_mtime_ns)
+            for entry in entries if entry.name.endswith('.txt') and entry.is_file()
+            for stat in [entry.stat()]
+        }
+
+
+def build_manifest(directories, previous=None, workers=1, rehash=False):
+    """
+    Manifest of the .txt files of ``directories`` ({source: directory}).
+
+    Entries of ``previous`` are reused for files whose size and modification
+    time are unchanged. Returns the manifest and the number of files read.
+    """
+    fingerprint = tokenizer_fingerprint(text_normalization)
+    reusable = (previous is not None and not rehash and previous.get('version') == MANIFEST_VERSION
+                and previous.get('tokenizer') == fingerprint)
+    listings = {source: scan_txt(directory) for source, directory in directories.items()}
+    documents = {source: {} for source in directories}
+    pending = {}
+    for source, listing in listings.items():
+        known = previous['documents'].get(source, {}) if reusable else {}
+        for filename, (size, mtime_ns) in listing.items():
+            entry = known.get(filename)
+            if entry is not None and entry['bytes'] == size and entry['mtime_ns'] == mtime_ns:
+                documents[source][filename] = entry
+            else:
+                pending.setdefault(filename, []).append((source, os.path.join(directories[source], filename)))
+
+    items = sorted(pending.items())
+    described = (entries for shard in map_shards(_describe_shard, items, workers) for entries in shard)
+    for (filename, _), entries in zip(items, described):
+        for source, entry in entries.items():
+            documents[source][filename] = dict(entry, mtime_ns=listings[source][filename][1])
+
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'tokenizer': fingerprint,
+        'sources': dict(directories),
+        'documents': {source: dict(sorted(entries.items())) for source, entries in documents.items()},
+    }
+    return manifest, sum(len(paths) for _, paths in items)
+
+
+def load_manifest(path=MANIFEST_FILE):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, path=MANIFEST_FILE):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, ensure_ascii=False)
+    os.replace(path + '.tmp', path)
+
+
+# --- VERIFICATION ---
+
+def read_metadata(path=METADATA_FILE):
+    """CSV rows keyed by article id, and the ids listed more than once."""
+    rows, duplicates = {}, []
+    if not os.path.exists(path):
+        return rows, duplicates
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            if row['id'] in rows:
+                duplicates.append(row['id'])
+            rows[row['id']] = row
+    return rows, duplicates
+
+
+def _body(path):
+    filename = os.path.basename(path)
+    return parse_txt_article(filename, read_text(path)[1])['content']
+
+
+def differing_content(raw_path, txt_path):
+    """How two versions of an article differ: one body truncated, or edited."""
+    try:
+        raw, txt = _body(raw_path), _body(txt_path)
+    except (ValueError, AttributeError):
+        return "files differ"
+    if raw == txt:
+        return "headers differ"
+    if raw.startswith(txt):
+        return f"truncated in txt ({len(txt):,} of {len(raw):,} characters)"
+    if txt.startswith(raw):
+        return f"truncated in raw ({len(raw):,} of {len(txt):,} characters)"
+    return "bodies differ"
+
+
+def verify_corpus(manifest, metadata, duplicates=(), previous=None):
+    """{issue: [{'id': ..., 'detail': ...}]} of the drift between the sources (and since ``previous``)."""
+    issues = {issue: [] for issue in ISSUES}
+    raw, txt = manifest['documents'].get('raw', {}), manifest['documents'].get('txt', {})
+    directories = manifest['sources']
+    for doc_id in sorted(set(duplicates)):
+        issues['duplicate_csv_id'].append({'id': doc_id, 'detail': "listed more than once"})
+
+    filenames = set(raw) | set(txt) | {doc_id + '.txt' for doc_id in metadata}
+    for filename in sorted(filenames):
+        doc_id = filename[:-len('.txt')]
+        raw_entry, txt_entry, row = raw.get(filename), txt.get(filename), metadata.get(doc_id)
+        entry = txt_entry or raw_entry
+        if entry is None:
+            issues['missing_file'].append({'id': doc_id, 'detail': "listed in the CSV, no file"})
+            continue
+        if raw_entry is None and 'raw' in directories:
+            issues['missing_raw'].append({'id': doc_id, 'detail': "not in " + directories['raw']})
+        if txt_entry is None and 'txt' in directories:
+            issues['missing_txt'].append({'id': doc_id, 'detail': "not in " + directories['txt']})
+        if row is None:
+            issues['missing_from_csv'].append({'id': doc_id, 'detail': "no metadata row"})
+        if raw_entry is not None and txt_entry is not None and raw_entry['sha256'] != txt_entry['sha256']:
+            detail = differing_content(os.path.join(directories['raw'], filename),
+                                       os.path.join(directories['txt'], filename))
+            issues['content_differs'].append({'id': doc_id, 'detail': detail})
+        if entry.get('error'):
+            issues['unparsable'].append({'id': doc_id, 'detail': "not in the extractor .txt format"})
+            continue
+        if entry['words'] == 0:
+            issues['empty'].append({'id': doc_id, 'detail': "body without words"})
+        if row is not None:
+            expected = (int(row['word_count'] or 0), int(row['character_count'] or 0))
+            if expected != (entry['words'], entry['characters']):
+                issues['metadata_mismatch'].append({
+                    'id': doc_id,
+                    'detail': f"CSV {expected[0]:,} words / {expected[1]:,} characters, "
+                              f"file {entry['words']:,} / {entry['characters']:,}",
+                })
+
+    if previous is not None:
+        for source, entries in manifest['documents'].items():
+            before = previous['documents'].get(source, {})
+            for filename in sorted(set(entries) - set(before)):
+                issues['added'].append({'id': filename[:-len('.txt')], 'detail': source})
+            for filename in sorted(set(before) - set(entries)):
+                issues['removed'].append({'id': filename[:-len('.txt')], 'detail': source})
+            for filename in sorted(set(entries) & set(before)):
+                if entries[filename]['sha256'] != before[filename]['sha256']:
+                    old, new = before[filename], entries[filename]
+                    issues['changed'].append({
+                        'id': filename[:-len('.txt')],
+                        'detail': f"{source}: {old['bytes']:,} -> {new['bytes']:,} bytes, "
+                                  f"{old['words']} -> {new['words']} words",
+                    })
+    return issues
+
+
+def format_issues(issues, limit=REPORT_LIMIT):
+    lines = []
+    for issue, documents in issues.items():
+        if not documents:
+            continue
+        lines.append(f"{issue}: {len(documents)}")
+        lines.extend(f"  {document['id']}  ({document['detail']})" for document in documents[:limit])
+        if len(documents) > limit:
+            lines.append(f"  ... {len(documents) - limit} more")
+    return '\n'.join(lines)
+
+
+# --- MAIN ---
+
+def add_arguments(parser):
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="hash every file of the corpus directories into the manifest")
+    check = commands.add_parser('verify', help="compare the raw, txt and CSV corpus and report drift")
+    for command in (build, check):
+        command.add_argument('--manifest', default=MANIFEST_FILE, help=f"manifest file (default: {MANIFEST_FILE})")
+        command.add_argument('--raw-dir', default=RAW_DIR, help=f"extractor .txt files (default: {RAW_DIR})")
+        command.add_argument('--data-dir', default=DATA_DIR, help=f"analysed .txt files (default: {DATA_DIR})")
+        command.add_argument('--workers', type=int, default=1, help="number of worker processes (default: 1)")
+        command.add_argument('--rehash', action='store_true',
+                             help="read every file, even those whose size and modification time are unchanged")
+    check.add_argument('--metadata', default=METADATA_FILE, help=f"article metadata CSV (default: {METADATA_FILE})")
+    check.add_argument('--report', default=REPORT_FILE, help=f"JSON report (default: {REPORT_FILE})")
+    check.add_argument('--limit', type=int, default=REPORT_LIMIT,
+                       help=f"documents printed for every issue (default: {REPORT_LIMIT})")
+    check.add_argument('--update', action='store_true', help="save the new manifest after the report")
+    for command in (build, check):
+        add_metrics_arguments(command)
+
+
+def run(args):
+    metrics = stage_metrics.from_arguments(f'corpus_manifest_{args.command}', args)
+    previous = load_manifest(args.manifest)
+    directories = {'raw': args.raw_dir, 'txt': args.data_dir}
+
+    with metrics.stage('hash'):
+        manifest, read = build_manifest(directories, previous, args.workers, args.rehash)
+        files = sum(len(entries) for entries in manifest['documents'].values())
+        metrics.add(files=files, files_read=read)
+    print(f"Manifest: {files} files, {read} read, {files - read} unchanged")
+
+    if args.command == 'build':
+        with metrics.stage('write'):
+            save_manifest(manifest, args.manifest)
+        print(f"Manifest saved to {args.manifest}")
+        metrics.write()
+        return
+
+    with metrics.stage('compare'):
+        metadata, duplicates = read_metadata(args.metadata)
+        issues = verify_corpus(manifest, metadata, duplicates, previous)
+        drift = {issue: len(documents) for issue, documents in issues.items() if documents}
+        metrics.add(metadata_rows=len(metadata), **{f'issues_{issue}': count for issue, count in drift.items()})
+
+    with metrics.stage('write'):
+        os.makedirs(os.path.dirname(os.path.abspath(args.report)), exist_ok=True)
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({'manifest': args.manifest, 'sources': dict(directories, metadata=args.metadata),
+                       'issues': issues}, f, indent=1, ensure_ascii=False)
+        if args.update:
+            save_manifest(manifest, args.manifest)
+
+    if drift:
+        print(format_issues(issues, args.limit))
+        print(f"Drift found ({sum(drift.values())} issues), report written to {args.report}")
+    else:
+        print(f"No drift between {args.raw_dir}, {args.data_dir} and {args.metadata}"
+              + ("" if previous is None else f", nor since {args.manifest}"))
+    metrics.write()
+    if drift:
+        sys.exit(1)
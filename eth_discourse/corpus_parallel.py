@@ -0,0 +1,52 @@
+"""
+Process-pool map-reduce helpers for corpus passes.
+
+Documents are split into contiguous shards in corpus order. Every shard is
+handled by one call of a worker function (in a worker process when
+``workers > 1``) and the partial results are yielded in shard order, so a
+merge done in that order never depends on the number of workers or on which
+worker finishes first. Per-document costs recorded by a worker with
+``stage_metrics`` are sent back with its shard result.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from .stage_metrics import add_documents, drain_documents
+
+# Upper bound on the documents of one shard, so partial results stay small
+MAX_SHARD_SIZE = 64
+# Shards per worker, so that a slow shard does not leave the other cores idle
+SHARDS_PER_WORKER = 4
+
+
+def shards(items, workers=1):
+    """Split ``items`` into contiguous shards, preserving their order."""
+    items = list(items)
+    size = -(-len(items) // (max(1, workers) * SHARDS_PER_WORKER))
+    size = max(1, min(MAX_SHARD_SIZE, size))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _run_shard(function, part, **kwargs):
+    drain_documents()
+    return function(part, **kwargs), drain_documents()
+
+
+def map_shards(function, items, workers=1, **kwargs):
+    """
+    Yield ``function(shard, **kwargs)`` for every shard of ``items``, in order.
+
+    ``function`` must be defined at module level so that it can be sent to the
+    worker processes.
+    """
+    parts = shards(items, workers)
+    if workers <= 1 or len(parts) <= 1:
+        for part in parts:
+            yield function(part, **kwargs)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for result, documents in executor.map(partial(_run_shard, function, **kwargs), parts):
+            add_documents(documents)
+            yield result
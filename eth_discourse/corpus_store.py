@@ -0,0 +1,125 @@
+"""
+Single-file columnar corpus store.
+
+The whole corpus is kept in one Arrow IPC (Feather v2) file: one row per
+article, typed metadata columns and the article body in ``content``, without
+the ``Titre:``/``Auteur:``/... header of the .txt files. The file is written
+uncompressed so that readers memory-map it and only touch the columns they
+ask for: listing the metadata never reads the bodies, and one open replaces
+one open per article.
+
+Columns::
+
+    id, url, title, author, publication_date, slug   string
+    date                                             date32 (from year/month/day)
+    year, month, day                                 int16 / int8 / int8
+    category                                         dictionary (categorical)
+    word_count, character_count                      int32
+    content                                          large_string (body)
+
+The extractor writes the same columns (``ethereum_blog_corpus.arrow`` in its
+output directory); ``python -m eth_discourse corpus-file`` converts the
+existing data/corpus_txt files.
+"""
+
+import hashlib
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from .article_files import ID_COLUMN, parse_txt_article
+from .config import CORPUS_FILE, DATA_DIR as TXT_DIR
+
+CONTENT_COLUMN = 'content'
+
+SCHEMA = pa.schema([
+    ('id', pa.string()),
+    ('url', pa.string()),
+    ('title', pa.string()),
+    ('author', pa.string()),
+    ('publication_date', pa.string()),
+    ('date', pa.date32()),
+    ('year', pa.int16()),
+    ('month', pa.int8()),
+    ('day', pa.int8()),
+    ('slug', pa.string()),
+    ('category', pa.dictionary(pa.int32(), pa.string())),
+    ('word_count', pa.int32()),
+    ('character_count', pa.int32()),
+    ('content', pa.large_string()),
+])
+
+
+# --- WRITING ---
+
+def corpus_table(articles):
+    """Arrow table with the store schema, sorted by id, from a list of article dicts."""
+    frame = pd.DataFrame(articles, columns=[field.name for field in SCHEMA if field.name != 'date'])
+    frame = frame.sort_values(ID_COLUMN, kind='stable').reset_index(drop=True)
+    for column in ('year', 'month', 'day'):
+        frame[column] = pd.to_numeric(frame[column])
+    frame['date'] = pd.to_datetime(frame[['year', 'month', 'day']]).dt.date
+    frame['category'] = frame['category'].astype('category')
+    return pa.Table.from_pandas(frame, schema=SCHEMA, preserve_index=False)
+
+
+def write_corpus(articles, path=CORPUS_FILE):
+    """Write the store atomically (uncompressed, so that it can be memory-mapped)."""
+    table = corpus_table(articles)
+    feather.write_feather(table, path + '.tmp', compression='uncompressed')
+    os.replace(path + '.tmp', path)
+    return table.num_rows
+
+
+def read_txt_corpus(data_dir=TXT_DIR):
+    articles = []
+    for filename in sorted(f for f in os.listdir(data_dir) if f.endswith('.txt')):
+        with open(os.path.join(data_dir, filename), 'r', encoding='utf-8') as f:
+            articles.append(parse_txt_article(filename, f.read()))
+    return articles
+
+
+# --- READING ---
+
+def read_table(path=CORPUS_FILE, columns=None):
+    """Memory-mapped Arrow table; only ``columns`` (default: all) are read."""
+    return feather.read_table(path, columns=columns, memory_map=True)
+
+
+def read_corpus(path=CORPUS_FILE, columns=None):
+    """The store (or some of its columns) as a pandas DataFrame."""
+    return read_table(path, columns).to_pandas()
+
+
+def document_ids(path=CORPUS_FILE):
+    return read_table(path, [ID_COLUMN]).column(ID_COLUMN).to_pylist()
+
+
+def read_contents(path, ids):
+    """Bodies of the documents ``ids``, in that order."""
+    table = read_table(path, [ID_COLUMN, CONTENT_COLUMN])
+    rows = {doc_id: i for i, doc_id in enumerate(table.column(ID_COLUMN).to_pylist())}
+    contents = table.column(CONTENT_COLUMN)
+    return [contents[rows[doc_id]].as_py() for doc_id in ids]
+
+
+def content_hashes(path=CORPUS_FILE):
+    """SHA-256 of every body, keyed by document id."""
+    table = read_table(path, [ID_COLUMN, CONTENT_COLUMN])
+    return {
+        doc_id: hashlib.sha256(content.encode('utf-8')).hexdigest()
+        for doc_id, content in zip(table.column(ID_COLUMN).to_pylist(),
+                                   table.column(CONTENT_COLUMN).to_pylist())
+    }
+
+
+def add_arguments(parser):
+    parser.add_argument('--txt-dir', default=TXT_DIR, help=f"directory of .txt articles (default: {TXT_DIR})")
+    parser.add_argument('--output', default=CORPUS_FILE, help=f"corpus file to write (default: {CORPUS_FILE})")
+
+
+def run(args):
+    rows = write_corpus(read_txt_corpus(args.txt_dir), args.output)
+    print(f"{rows} articles written to {args.output} ({os.path.getsize(args.output) / 1e6:.1f} MB)")
@@ -0,0 +1,216 @@
+"""
+Metadata-driven corpus views.
+
+A view is a named list of document IDs selected by filters on the article
+metadata (``ethereum_blog_articles.csv``, or the metadata columns of a
+corpus file). Views are resolved against the token store and counted from
+its cached token arrays: segmenting the corpus by category, author or year
+copies no file and always reflects the current corpus.
+
+Filters are ``column=value`` expressions::
+
+    author=Vitalik Buterin               one value
+    author=Vitalik Buterin|Danny Ryan    any of several values
+    year=2014..2016                      inclusive numeric range
+
+All the views of a run are counted in one pass over the documents: every
+document is counted once and its counts are added to the row of each view
+that contains it (``grouped_counts``), across worker processes.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from . import corpus_store
+from .config import METADATA_FILE
+from .cooccurrence_engine import COUNT_DTYPE, FLUSH_ENTRIES, run_pairs
+from .cooccurrence_sketch import pair_keys
+from .corpus_parallel import map_shards
+from .stage_metrics import timed_document
+
+ID_COLUMN = corpus_store.ID_COLUMN
+FILTER = re.compile(r'^\s*(\w+)\s*=(.*)$')
+RANGE = re.compile(r'^\s*(-?\d+)\s*\.\.\s*(-?\d+)\s*$')
+
+
+# --- METADATA ---
+
+def load_metadata(source=None):
+    """
+    Metadata table with one row per article and an ``id`` column.
+
+    ``source`` is a metadata CSV (default ``METADATA_FILE``) or a corpus
+    file, whose columns except ``content`` are read.
+    """
+    source = source or METADATA_FILE
+    if source.endswith('.csv'):
+        return pd.read_csv(source)
+    columns = [field.name for field in corpus_store.SCHEMA if field.name != corpus_store.CONTENT_COLUMN]
+    return corpus_store.read_corpus(source, columns)
+
+
+def parse_filter(expression):
+    """``(column, values, range)`` of a ``column=value`` expression; see the module docstring."""
+    match = FILTER.match(expression)
+    if match is None:
+        raise ValueError(f"invalid filter {expression!r}, expected column=value")
+    column, value = match.groups()
+    bounds = RANGE.match(value)
+    if bounds:
+        return column, None, (int(bounds.group(1)), int(bounds.group(2)))
+    return column, [part.strip() for part in value.split('|')], None
+
+
+def filter_mask(metadata, filters):
+    """Boolean mask of the rows matching every filter expression."""
+    mask = np.ones(len(metadata), dtype=bool)
+    for expression in filters:
+        column, values, bounds = parse_filter(expression)
+        if column not in metadata.columns:
+            raise ValueError(f"unknown metadata column {column!r} in filter {expression!r}")
+        if bounds is not None:
+            values_in = pd.to_numeric(metadata[column], errors='coerce').between(*bounds)
+        else:
+            values_in = metadata[column].astype(str).isin(values)
+        mask &= values_in.to_numpy()
+    return mask
+
+
+def select(metadata, filters=()):
+    """IDs of the articles matching every filter, in ID order."""
+    return sorted(metadata.loc[filter_mask(metadata, filters), ID_COLUMN])
+
+
+def segment(metadata, column, filters=()):
+    """``{value: ids}``: one view per distinct value of ``column`` among the filtered articles."""
+    selected = metadata[filter_mask(metadata, filters)]
+    if column not in selected.columns:
+        raise ValueError(f"unknown metadata column {column!r}")
+    return {
+        str(value): sorted(group[ID_COLUMN])
+        for value, group in selected.groupby(column, sort=True)
+    }
+
+
+def view_documents(store, ids):
+    """
+    Token store names of the documents ``ids`` and the IDs missing from the store.
+
+    Documents are named by ID in a store built from a corpus file and by
+    ``<id>.txt`` in a store built from the .txt directory.
+    """
+    manifest = store.manifest
+    documents, missing = [], []
+    for doc_id in ids:
+        for name in (doc_id, doc_id + '.txt'):
+            if name in manifest:
+                documents.append(name)
+                break
+        else:
+            missing.append(doc_id)
+    return documents, missing
+
+
+def view_dirname(value):
+    """Directory name of a view value (spaces and slashes replaced)."""
+    return value.replace(" ", "_").replace("/", "-")
+
+
+# --- COUNTING ---
+
+class GroupCounter:
+    """Accumulates (group, column, count) entries into a sparse ``groups x columns`` matrix."""
+
+    def __init__(self, n_groups, n_columns):
+        self.shape = (n_groups, n_columns)
+        self.matrix = sparse.csr_matrix(self.shape, dtype=COUNT_DTYPE)
+        self._buffer = []
+        self._buffered = 0
+
+    def add(self, group, columns, counts):
+        self._buffer.append((np.full(len(columns), group, dtype=np.int64), columns, counts))
+        self._buffered += len(columns)
+        if self._buffered >= FLUSH_ENTRIES:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        rows, cols, counts = (np.concatenate(parts) for parts in zip(*self._buffer))
+        self.matrix = self.matrix + sparse.coo_matrix((counts, (rows, cols)), shape=self.shape).tocsr()
+        self._buffer = []
+        self._buffered = 0
+
+    def result(self):
+        self._flush()
+        return self.matrix
+
+
+def _count_shard(items, store, n_groups, window_size, ranks):
+    vocab_size = len(store.vocabulary)
+    words = GroupCounter(n_groups, vocab_size)
+    pairs = GroupCounter(n_groups, vocab_size * vocab_size)
+    for filename, groups in items:
+        with timed_document(filename, store):
+            ids = np.asarray(store.token_ids(filename), dtype=np.int64)
+            word_ids, word_counts = np.unique(ids, return_counts=True)
+            rows, cols, weights = run_pairs(store.token_runs(filename), window_size, ranks)
+            keys, key_index = np.unique(pair_keys(rows, cols, vocab_size), return_inverse=True)
+            key_counts = np.bincount(key_index, weights=weights).astype(COUNT_DTYPE)
+            # The document is counted once, then added to each of its groups
+            for group in groups:
+                words.add(group, word_ids, word_counts)
+                pairs.add(group, keys, key_counts)
+    return words.result(), pairs.result()
+
+
+def grouped_counts(store, memberships, n_groups, window_size, workers=1):
+    """
+    Word and window pair counts of ``n_groups`` groups of documents, in one pass.
+
+    ``memberships`` lists ``(document, groups)`` pairs, ``groups`` being the
+    row indices of the groups containing the document. Returns the
+    ``n_groups x V`` word count and ``n_groups x V*V`` pair count matrices;
+    pair columns are ``pair_keys`` of pairs oriented like
+    ``count_cooccurrences``. Partial counts are merged in shard order, so the
+    result does not depend on ``workers``.
+    """
+    vocab_size = len(store.vocabulary)
+    word_counts = sparse.csr_matrix((n_groups, vocab_size), dtype=COUNT_DTYPE)
+    pair_counts = sparse.csr_matrix((n_groups, vocab_size * vocab_size), dtype=COUNT_DTYPE)
+    for words, pairs in map_shards(_count_shard, memberships, workers, store=store, n_groups=n_groups,
+                                   window_size=window_size, ranks=store.word_ranks()):
+        word_counts = word_counts + words
+        pair_counts = pair_counts + pairs
+    return word_counts, pair_counts
+
+
+def view_counts(store, views, window_size, workers=1):
+    """
+    Counts of every view of ``{name: ids}``, as ``grouped_counts`` rows in ``views`` order.
+
+    Returns ``(word_counts, pair_counts, missing)``, ``missing`` listing the
+    IDs absent from the token store.
+    """
+    groups = {}
+    missing = set()
+    for group, ids in enumerate(views.values()):
+        documents, absent = view_documents(store, ids)
+        missing.update(absent)
+        for document in documents:
+            groups.setdefault(document, []).append(group)
+
+    memberships = sorted(groups.items())
+    word_counts, pair_counts = grouped_counts(store, memberships, len(views), window_size, workers)
+    return word_counts, pair_counts, sorted(missing)
+
+
+def pair_matrix(pair_row, vocab_size):
+    """``V x V`` co-occurrence matrix of one row of ``pair_keys`` columns."""
+    keys = pair_row.indices.astype(np.int64)
+    return sparse.csr_matrix(
+        (pair_row.data, (keys // vocab_size, keys % vocab_size)), shape=(vocab_size, vocab_size)
+    )
@@ -0,0 +1,237 @@
+"""
+Diachronic word frequencies and co-occurrences, per year and per month.
+
+One pass over the token store counts every document into its month
+(``corpus_views.grouped_counts``, a month being a view of the corpus):
+
+- word counts in a ``months x V`` sparse matrix;
+- window pair counts (same pairs and weights as ``compute_cooccurrences.py``)
+  in a ``months x V*V`` sparse matrix, one column per oriented pair
+  (``cooccurrence_sketch.pair_keys``).
+
+Months run without gaps from the first to the last article, so that row
+``p - n`` is always ``n`` months before row ``p``. Yearly counts are sums of
+monthly rows, and ``--rolling N`` gives the counts of the ``N`` months ending
+at each month as a difference of cumulative sums, ``C[p] - C[p - N]``, where
+``C[p]`` is the sum of rows ``0..p``.
+
+Outputs (``outputs/diachronic/``)::
+
+    word_frequencies_by_{year,month}.csv   period, word, frequency, relative_per_1000
+    cooccurrences_by_{year,month}.csv      period, word1, word2, count (top pairs)
+
+and with ``--rolling N`` the same two tables over ``N``-month windows
+(``*_by_month_rolling<N>.csv``, the period being the last month of the window).
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from .article_files import ARTICLE_ID
+from .config import (OUTPUT_DIR, add_corpus_arguments, add_dedup_argument, add_metrics_arguments, add_output_argument,
+                     corpus_source)
+from .corpus_views import grouped_counts
+from .memory_usage import format_peak_rss
+from .near_duplicates import dedup_view, format_dedup
+from . import stage_metrics
+from . import text_normalization
+from .text_normalization import tokenize_document
+from .token_store import open_token_store, tokenizer_fingerprint
+
+WINDOW_SIZE = 5
+# Pairs written per period, most frequent first
+TOP_PAIRS = 100
+
+
+# --- PERIODS ---
+
+def document_month(name):
+    """(year, month) of a document named ``YYYY-MM-DD-slug[.txt]``, or None."""
+    match = ARTICLE_ID.match(name)
+    if match is None:
+        return None
+    return int(match.group(1)), int(match.group(2))
+
+
+def month_range(first, last):
+    """Every (year, month) from ``first`` to ``last`` included."""
+    start = first[0] * 12 + first[1] - 1
+    stop = last[0] * 12 + last[1] - 1
+    return [(index // 12, index % 12 + 1) for index in range(start, stop + 1)]
+
+
+def month_years(months):
+    """Years covered by ``months`` and the year index of every month."""
+    years = sorted({year for year, _ in months})
+    return years, np.searchsorted(years, [year for year, _ in months])
+
+
+def sum_rows(matrix, groups, n_groups):
+    """
+    ``n_groups x columns`` matrix whose row ``g`` sums the rows ``p`` with ``groups[p] == g``.
+
+    Rows are regrouped through COO indices (duplicates summed by the CSR
+    conversion): a sparse product would allocate arrays as long as the
+    ``V*V`` columns of the pair matrix.
+    """
+    coo = matrix.tocoo()
+    return sparse.coo_matrix(
+        (coo.data, (np.asarray(groups)[coo.row], coo.col)), shape=(n_groups, matrix.shape[1])
+    ).tocsr()
+
+
+# --- COUNTING ---
+
+def monthly_counts(store, window_size, workers=1):
+    """
+    Word and pair counts of every month, in one pass over the corpus.
+
+    Returns ``(months, word_counts, pair_counts, skipped)``: the list of
+    (year, month), the ``months x V`` and ``months x V*V`` sparse matrices,
+    and the documents whose name carries no date.
+    """
+    dated = [(filename, document_month(filename)) for filename in store.documents]
+    skipped = [filename for filename, month in dated if month is None]
+    dated = [(filename, month) for filename, month in dated if month is not None]
+    if not dated:
+        raise ValueError("no document named YYYY-MM-DD-slug in the corpus")
+
+    months = month_range(min(month for _, month in dated), max(month for _, month in dated))
+    index = {month: i for i, month in enumerate(months)}
+    memberships = [(filename, (index[month],)) for filename, month in dated]
+
+    word_counts, pair_counts = grouped_counts(store, memberships, len(months), window_size, workers)
+    return months, word_counts, pair_counts, skipped
+
+
+def period_rows(matrix):
+    """Rows of a ``periods x columns`` matrix, one 1 x columns matrix per period."""
+    matrix = matrix.tocsr()
+    for p in range(matrix.shape[0]):
+        yield matrix[p]
+
+
+def rolling_rows(matrix, window):
+    """
+    Sum of rows ``p - window + 1 .. p`` of ``matrix``, for every period ``p``.
+
+    Each sum is ``C[p] - C[p - window]`` with ``C`` the running cumulative
+    sum, updated as ``C[p - 1] - C[p - 1 - window] + row[p] - row[p - window]``:
+    one addition and one subtraction per period whatever the window length,
+    and only the current window held in memory.
+    """
+    matrix = matrix.tocsr()
+    current = sparse.csr_matrix((1, matrix.shape[1]), dtype=matrix.dtype)
+    for p in range(matrix.shape[0]):
+        current = current + matrix[p]
+        if p >= window:
+            current = current - matrix[p - window]
+            current.eliminate_zeros()
+        yield current
+
+
+# --- OUTPUT TABLES ---
+
+def frequency_frame(labels, rows, vocabulary, ranks):
+    """``period, word, frequency, relative_per_1000``; most frequent first within each period."""
+    words = np.asarray(vocabulary, dtype=object)
+    frames = []
+    for label, row in zip(labels, rows):
+        ids, counts = row.indices, row.data
+        order = np.lexsort((ranks[ids], -counts))
+        ids, counts = ids[order], counts[order]
+        frames.append(pd.DataFrame({
+            'period': label,
+            'word': words[ids],
+            'frequency': counts,
+            'relative_per_1000': counts / max(counts.sum(), 1) * 1000,
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def top_pairs_frame(labels, rows, vocabulary, ranks, top=TOP_PAIRS):
+    """``period, word1, word2, count`` of the ``top`` most frequent pairs of each period."""
+    words = np.asarray(vocabulary, dtype=object)
+    vocab_size = len(vocabulary)
+    frames = []
+    for label, row in zip(labels, rows):
+        keys, counts = row.indices.astype(np.int64), row.data
+        if len(counts) > top:
+            # Every pair tied with the last kept count is a candidate, so ties
+            # are broken alphabetically like in cooccurrence_pairs.csv
+            cutoff = np.partition(counts, len(counts) - top)[len(counts) - top]
+            keep = counts >= cutoff
+            keys, counts = keys[keep], counts[keep]
+        first, second = keys // vocab_size, keys % vocab_size
+        order = np.lexsort((ranks[second], ranks[first], -counts))[:top]
+        frames.append(pd.DataFrame({
+            'period': label,
+            'word1': words[first[order]],
+            'word2': words[second[order]],
+            'count': counts[order],
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+# --- MAIN ---
+
+def add_arguments(parser):
+    add_corpus_arguments(parser)
+    add_output_argument(parser, os.path.join(OUTPUT_DIR, 'diachronic', ''))
+    parser.add_argument('--top', type=int, default=TOP_PAIRS,
+                        help=f"co-occurrence pairs written per period (default: {TOP_PAIRS})")
+    parser.add_argument('--rolling', type=int, default=None, metavar='N',
+                        help="also write the counts of the N months ending at every month")
+    add_dedup_argument(parser)
+    add_metrics_arguments(parser)
+
+def run(args):
+    metrics = stage_metrics.from_arguments('diachronic_counts', args)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    with metrics.stage('tokenize'):
+        store = open_token_store(
+            corpus_source(args), args.cache_dir, tokenize_document,
+            fingerprint=tokenizer_fingerprint(text_normalization),
+            workers=args.workers
+        )
+    if args.dedup:
+        store, stale = dedup_view(store, args.dedup)
+        print(format_dedup(args.dedup, store, stale))
+    metrics.record_corpus(store)
+    with metrics.stage('count'):
+        months, word_counts, pair_counts, skipped = monthly_counts(store, WINDOW_SIZE, args.workers)
+    if skipped:
+        print(f"{len(skipped)} documents without a YYYY-MM-DD date in their name were skipped")
+
+    vocabulary, ranks = store.vocabulary_array, store.word_ranks()
+    years, month_year = month_years(months)
+    month_labels = [f"{year}-{month:02d}" for year, month in months]
+
+    with metrics.stage('write'):
+        tables = {
+            'year': ([str(year) for year in years],
+                     sum_rows(word_counts, month_year, len(years)), sum_rows(pair_counts, month_year, len(years))),
+            'month': (month_labels, word_counts, pair_counts),
+        }
+        for granularity, (labels, words, pairs) in tables.items():
+            frequency_frame(labels, period_rows(words), vocabulary, ranks).to_csv(
+                os.path.join(args.output_dir, f'word_frequencies_by_{granularity}.csv'), index=False)
+            top_pairs_frame(labels, period_rows(pairs), vocabulary, ranks, args.top).to_csv(
+                os.path.join(args.output_dir, f'cooccurrences_by_{granularity}.csv'), index=False)
+
+    if args.rolling:
+        with metrics.stage('rolling'):
+            suffix = f'by_month_rolling{args.rolling}'
+            frequency_frame(month_labels, rolling_rows(word_counts, args.rolling), vocabulary, ranks).to_csv(
+                os.path.join(args.output_dir, f'word_frequencies_{suffix}.csv'), index=False)
+            top_pairs_frame(month_labels, rolling_rows(pair_counts, args.rolling), vocabulary, ranks,
+                            args.top).to_csv(os.path.join(args.output_dir, f'cooccurrences_{suffix}.csv'), index=False)
+
+    print(f"{len(years)} years, {len(months)} months: diachronic counts saved to {args.output_dir}")
+    print(format_peak_rss())
+    metrics.write()
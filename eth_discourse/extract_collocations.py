@@ -0,0 +1,202 @@
+"""
+Bigram and trigram collocations within a fixed memory budget.
+
+Every n-gram of consecutive tokens (after cleaning and stopword removal, so
+"proof of stake" is the bigram ``proof stake``) is counted by one 64-bit key,
+the hash of its word IDs (``near_duplicates.window_hashes``), so the key space
+does not grow with the vocabulary; two distinct n-grams share a key with
+negligible probability. Counting then follows ``cooccurrence_sketch``:
+
+1. Sketch pass: the keys of each order go into a count-min sketch sized from
+   ``--memory-budget``; estimates never under-count.
+2. Candidate pass: the corpus is read again and only the n-grams whose
+   estimate reaches ``--min-count`` are counted exactly, with the word IDs of
+   their first occurrence, so the rare n-grams (the vast majority) are pruned
+   as they stream by and never stored.
+
+The table holds exactly the n-grams counted ``--min-count`` times or more,
+whatever the corpus size. ``--memory-budget`` holds the sketch and the
+candidate tables of one n-gram length; candidates that do not fit are counted
+in several passes over hash partitions of the keys
+(``cooccurrence_sketch.count_candidates``), and the command stops with an
+error only if ``MAX_PASSES`` passes are not enough. Both passes run across
+worker processes, sharing one sketch, and the result does not depend on their
+number.
+
+Output: ``outputs/collocations.csv`` with ``ngram, n, count, pmi``, most
+frequent first, ties in alphabetical order, where
+``pmi = log2(count * N**(n - 1) / (f1 * ... * fn))`` from the unigram counts
+over ``N`` tokens.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from .config import (UsageError, add_corpus_arguments, add_dedup_argument, add_metrics_arguments, add_output_argument,
+                     corpus_source)
+from .cooccurrence_engine import COUNT_DTYPE
+from .cooccurrence_sketch import (BATCH_ENTRIES, SKETCH_SHARE, CandidateCounts, count_candidates, fill_sketch,
+                                  in_pass, merge_updates, shared_sketch)
+from .extract_word_frequencies import process_corpus as count_words
+from .memory_usage import format_peak_rss
+from .near_duplicates import dedup_view, format_dedup, window_hashes
+from . import stage_metrics
+from .stage_metrics import timed_document
+from . import text_normalization
+from .text_normalization import tokenize_document
+from .token_store import open_token_store, tokenizer_fingerprint
+
+ORDERS = (2, 3)
+MIN_COUNT = 5
+MEMORY_BUDGET_MB = 64
+
+
+# --- N-GRAM KEYS ---
+
+def _ngram_batches(filenames, store, n):
+    # Hashed keys and word IDs of the n-grams of consecutive documents,
+    # concatenated into batches of about BATCH_ENTRIES n-grams so that
+    # hashing works on large arrays
+    batch, buffered = [], 0
+    for filename in filenames:
+        with timed_document(filename, store):
+            # No n-gram crosses a removed passage (--dedup)
+            for ids in store.token_runs(filename):
+                batch.append((window_hashes(ids, n), ids))
+                buffered += len(batch[-1][0])
+        if buffered >= BATCH_ENTRIES:
+            yield batch
+            batch, buffered = [], 0
+    if batch:
+        yield batch
+
+
+def ngram_ids(ids, n):
+    """``len(ids) - n + 1`` x ``n`` array of the word IDs of every n-gram of ``ids``."""
+    ids = np.asarray(ids, dtype=np.uint32)
+    if len(ids) < n:
+        return np.empty((0, n), dtype=np.uint32)
+    return np.lib.stride_tricks.sliding_window_view(ids, n)
+
+
+# --- COUNTING ---
+
+def _sketch_shard(filenames, store, n, sketch):
+    updates = []
+    for batch in _ngram_batches(filenames, store, n):
+        keys = np.concatenate([keys for keys, _ in batch])
+        updates.append(sketch.updates(keys, np.ones(len(keys), dtype=COUNT_DTYPE)))
+    return merge_updates(updates) if updates else sketch.updates(np.empty(0, dtype=np.uint64), [])
+
+
+def _candidate_shard(filenames, store, n, sketch, min_count, budget_bytes, label, number, passes):
+    candidates = CandidateCounts(budget_bytes, label)
+    for batch in _ngram_batches(filenames, store, n):
+        # Streaming pruning: n-grams of other passes, then n-grams below
+        # min_count in the sketch, are dropped here
+        keys = np.concatenate([keys for keys, _ in batch])
+        keep = in_pass(keys, number, passes)
+        keep[keep] = sketch.estimate(keys[keep]) >= min_count
+        keep = np.split(keep, np.cumsum([len(keys) for keys, _ in batch])[:-1])
+        keys = np.concatenate([keys[kept] for (keys, _), kept in zip(batch, keep)])
+        words = np.concatenate([ngram_ids(ids, n)[kept] for (_, ids), kept in zip(batch, keep)])
+        candidates.add(keys, np.ones(len(keys), dtype=COUNT_DTYPE), words)
+    return candidates.totals()
+
+
+def count_ngrams(store, n, min_count, memory_budget, workers=1):
+    """
+    Word IDs (``k x n``) and exact counts of the n-grams counted ``min_count`` times or more.
+
+    N-grams are counted by a 64-bit hash of their word IDs, so any vocabulary
+    size works; the words of every candidate are kept from its first
+    occurrence. ``memory_budget`` (bytes) holds the count-min sketch and the
+    candidate tables, as in ``heavy_cooccurrences``; a ``ValueError`` is
+    raised if the candidates do not fit.
+    """
+    sketch_budget = int(memory_budget * SKETCH_SHARE)
+    with shared_sketch(sketch_budget, workers) as sketch:
+        fill_sketch(sketch, _sketch_shard, store.documents, workers, store=store, n=n)
+        _, counts, words = count_candidates(_candidate_shard, store.documents, memory_budget - sketch_budget,
+                                            min_count, f'candidate {n}-grams', workers, store=store, n=n,
+                                            sketch=sketch, min_count=min_count)
+    if words is None:
+        words = np.empty((0, n), dtype=np.uint32)
+    return words, counts
+
+
+# --- OUTPUT ---
+
+def collocation_frame(ngrams, counts, n, vocabulary, ranks, unigram_counts):
+    """``ngram, n, count, pmi`` of the ``k x n`` word IDs ``ngrams``, most frequent first, ties in alphabetical order."""
+    word_ids = np.asarray(ngrams, dtype=np.int64).T
+    order = np.lexsort(tuple(ranks[word_ids[i]] for i in range(n - 1, -1, -1)) + (-counts,))
+    word_ids, counts = word_ids[:, order], counts[order]
+
+    total = float(unigram_counts.sum())
+    log_expected = sum(np.log2(unigram_counts[word_ids[i]] / total) for i in range(n))
+    words = np.asarray(vocabulary, dtype=object)
+    ngrams = words[word_ids[0]]
+    for i in range(1, n):
+        ngrams = ngrams + ' ' + words[word_ids[i]]
+    return pd.DataFrame({
+        'ngram': ngrams,
+        'n': n,
+        'count': counts,
+        'pmi': np.log2(counts / total) - log_expected,
+    })
+
+
+def add_arguments(parser):
+    add_corpus_arguments(parser)
+    add_output_argument(parser)
+    parser.add_argument('--orders', type=int, nargs='+', default=list(ORDERS),
+                        help="n-gram lengths (default: 2 3)")
+    parser.add_argument('--min-count', type=int, default=MIN_COUNT,
+                        help=f"smallest n-gram count kept (default: {MIN_COUNT})")
+    parser.add_argument('--memory-budget', type=float, default=MEMORY_BUDGET_MB, metavar='MB',
+                        help=f"memory for the count-min sketch and candidates of each n-gram length "
+                             f"(default: {MEMORY_BUDGET_MB})")
+    add_dedup_argument(parser)
+    add_metrics_arguments(parser)
+
+def run(args):
+    metrics = stage_metrics.from_arguments('extract_collocations', args)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    with metrics.stage('tokenize'):
+        store = open_token_store(
+            corpus_source(args), args.cache_dir, tokenize_document,
+            fingerprint=tokenizer_fingerprint(text_normalization),
+            workers=args.workers
+        )
+    if args.dedup:
+        store, stale = dedup_view(store, args.dedup)
+        print(format_dedup(args.dedup, store, stale))
+    metrics.record_corpus(store)
+    vocabulary, ranks = store.vocabulary_array, store.word_ranks()
+    with metrics.stage('unigrams'):
+        unigram_counts = count_words(store, args.workers)
+
+    frames = []
+    for n in sorted(set(args.orders)):
+        # Both passes (sketch, then exact candidates) read every document
+        with metrics.stage(f'{n}-grams'):
+            try:
+                ngrams, counts = count_ngrams(store, n, args.min_count, int(args.memory_budget * 1024 * 1024),
+                                              args.workers)
+            except ValueError as error:
+                raise UsageError(str(error))
+            print(f"{n}-grams: {len(ngrams):,} with count >= {args.min_count}")
+            frames.append(collocation_frame(ngrams, counts, n, vocabulary, ranks, unigram_counts))
+
+    with metrics.stage('write'):
+        df = pd.concat(frames, ignore_index=True)
+        df.to_csv(os.path.join(args.output_dir, 'collocations.csv'), index=False, float_format='%.6g')
+
+    print("Collocation extraction completed and saved successfully.")
+    print(format_peak_rss())
+    metrics.write()
@@ -0,0 +1,196 @@
+import os
+import re
+import time
+import numpy as np
+import pandas as pd
+from collections import Counter
+
+from . import corpus_store
+from .config import (STATE_DIR, UsageError, add_corpus_arguments, add_dedup_argument, add_metadata_argument,
+                     add_metrics_arguments, add_output_argument, corpus_source)
+from .corpus_parallel import map_shards
+from .corpus_views import load_metadata, select, view_documents
+from .incremental_counts import IncrementalCounts, document_frequencies, format_changes
+from .memory_usage import format_peak_rss
+from .near_duplicates import dedup_view, format_dedup
+from . import stage_metrics
+from .stage_metrics import record_document, timed_document
+from . import text_normalization
+from .text_normalization import tokenize_document
+from .token_store import open_token_store, tokenizer_fingerprint
+
+# --- STREAMING MODE ---
+
+# Characters read per chunk; memory is bounded by the vocabulary, not the corpus size
+CHUNK_SIZE = 1 << 20
+LAST_WHITESPACE = re.compile(r'\s\S*\Z')
+
+def read_chunks(path, chunk_size=CHUNK_SIZE):
+    # Chunks are cut on whitespace: no cleaning rule spans whitespace, so
+    # cleaning chunk by chunk yields exactly the tokens of the whole file
+    with open(path, 'r', encoding='utf-8') as f:
+        carry = ''
+        for block in iter(lambda: f.read(chunk_size), ''):
+            block = carry + block
+            match = LAST_WHITESPACE.search(block)
+            if match is None:
+                carry = block
+                continue
+            carry = block[match.start():]
+            yield block[:match.start()]
+        if carry:
+            yield carry
+
+def stream_tokens(paths):
+    for path in paths:
+        for chunk in read_chunks(path):
+            yield from tokenize_document(chunk)
+
+def stream_count_shard(paths):
+    counter = Counter()
+    for path in paths:
+        start = time.perf_counter()
+        counts = Counter(stream_tokens([path]))
+        counter.update(counts)
+        record_document(os.path.basename(path), time.perf_counter() - start,
+                        os.path.getsize(path), sum(counts.values()))
+    return counter
+
+def stream_count_rows(ids, corpus_file):
+    # Bodies are read one shard at a time from the memory-mapped corpus file
+    counter = Counter()
+    for doc_id, content in zip(ids, corpus_store.read_contents(corpus_file, ids)):
+        start = time.perf_counter()
+        tokens = tokenize_document(content)
+        counter.update(tokens)
+        record_document(doc_id, time.perf_counter() - start, len(content.encode('utf-8')), len(tokens))
+    return counter
+
+def stream_corpus(source, workers=1):
+    counter = Counter()
+    if os.path.isdir(source):
+        filenames = sorted(f for f in os.listdir(source) if f.endswith('.txt'))
+        paths = [os.path.join(source, filename) for filename in filenames]
+        partials = map_shards(stream_count_shard, paths, workers)
+    else:
+        partials = map_shards(stream_count_rows, corpus_store.document_ids(source), workers, corpus_file=source)
+
+    for partial in partials:
+        counter.update(partial)
+
+    return counter
+
+# --- CACHED MODE ---
+
+def count_shard(filenames, store):
+    counts = np.zeros(len(store.vocabulary), dtype=np.int64)
+
+    for filename in filenames:
+        with timed_document(filename, store):
+            counts += np.bincount(store.token_ids(filename), minlength=len(counts))
+
+    return counts
+
+def process_corpus(store, workers=1, documents=None):
+    counts = np.zeros(len(store.vocabulary), dtype=np.int64)
+    documents = store.documents if documents is None else documents
+
+    # Partial counts are merged in shard order: output is identical for any worker count
+    for partial in map_shards(count_shard, documents, workers, store=store):
+        counts += partial
+
+    return counts
+
+# --- OUTPUT ---
+
+def ranked_frame(ranked):
+    ranked = list(ranked)
+    total_tokens = sum(freq for _, freq in ranked)
+
+    data = [
+        {
+            'word': word,
+            'frequency': freq,
+            'relative_per_1000': freq / total_tokens * 1000
+        }
+        for word, freq in ranked
+    ]
+
+    return pd.DataFrame(data, columns=['word', 'frequency', 'relative_per_1000'])
+
+def frequency_frame(vocabulary, counts, ranks):
+    # Most frequent first, ties in alphabetical order
+    order = np.lexsort((ranks, -counts))
+    order = order[counts[order] > 0]
+    return ranked_frame(zip(vocabulary[order].tolist(), counts[order].tolist()))
+
+def add_arguments(parser):
+    add_corpus_arguments(parser)
+    add_output_argument(parser)
+    parser.add_argument('--stream', action='store_true',
+                        help="count in constant memory, reading files in chunks without the token cache")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only count added/edited/deleted documents since the last incremental run")
+    parser.add_argument('--state-dir', default=os.path.join(STATE_DIR, 'word_frequencies'),
+                        help="state of --incremental (default: %(default)s)")
+    parser.add_argument('--where', action='append', default=[], metavar='COLUMN=VALUE',
+                        help="only count the articles matching this metadata filter, e.g. "
+                             "author=Vitalik Buterin or year=2014..2016 (repeatable, see corpus_views.py)")
+    add_metadata_argument(parser)
+    add_dedup_argument(parser)
+    add_metrics_arguments(parser)
+
+def run(args):
+    if args.where and (args.stream or args.incremental):
+        raise UsageError("--where cannot be combined with --stream or --incremental")
+    if args.dedup and (args.stream or args.incremental):
+        raise UsageError("--dedup cannot be combined with --stream or --incremental")
+    source = corpus_source(args)
+    metrics = stage_metrics.from_arguments('extract_word_frequencies', args)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    if args.stream:
+        with metrics.stage('count'):
+            counter = stream_corpus(source, args.workers)
+            # Most frequent first, ties in alphabetical order
+            df = ranked_frame(sorted(counter.items(), key=lambda item: (-item[1], item[0])))
+    else:
+        with metrics.stage('tokenize'):
+            store = open_token_store(
+                source, args.cache_dir, tokenize_document,
+                fingerprint=tokenizer_fingerprint(text_normalization),
+                workers=args.workers
+            )
+        if args.dedup:
+            store, stale = dedup_view(store, args.dedup)
+            print(format_dedup(args.dedup, store, stale))
+        documents = None
+        with metrics.stage('count'):
+            if args.incremental:
+                totals, changes = IncrementalCounts(args.state_dir, 'word_frequencies').update(
+                    store, document_frequencies, (1, len(store.vocabulary)), args.workers
+                )
+                counts = totals.toarray().ravel()
+                print(format_changes(changes))
+            elif args.where:
+                metadata = load_metadata(args.corpus or args.metadata)
+                documents, missing = view_documents(store, select(metadata, args.where))
+                print(f"{len(documents)} articles match {' and '.join(args.where)}")
+                if missing:
+                    print(f"WARNING: {len(missing)} matching articles are not in the corpus")
+                if args.dedup:
+                    documents = store.kept(documents)
+                counts = process_corpus(store, args.workers, documents)
+            else:
+                counts = process_corpus(store, args.workers)
+
+            df = frequency_frame(store.vocabulary_array, counts, store.word_ranks())
+        metrics.record_corpus(store, documents)
+
+    with metrics.stage('write'):
+        df.to_csv(os.path.join(args.output_dir, 'word_frequencies.csv'), index=False)
+
+    print("Word frequencies extracted and saved successfully.")
+    print(format_peak_rss())
+    metrics.write()
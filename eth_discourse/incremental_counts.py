@@ -0,0 +1,160 @@
+"""
+Incremental delta updates of corpus-wide counts.
+
+The state directory keeps, for one counting stage, the corpus totals plus the
+counts of every document, all as SciPy sparse matrices indexed by the token
+IDs of a ``TokenStore``::
+
+    manifest.json         stage key, store generation, totals file, {filename: sha256}
+    totals-<n>.npz        sum of the per-document counts (n-th update)
+    documents/<sha>.npz   counts of one document
+
+On each update the manifest is compared with the token store. Counts of
+deleted documents are subtracted, new documents are counted and added, and
+edited documents are subtracted then added again, so only changed documents
+are processed and the totals stay exactly equal to a full recount (all
+counts are integers). If the stage key (counting parameters) or the store
+generation (token IDs reassigned) differ, the state is rebuilt from scratch.
+"""
+
+import json
+import os
+import shutil
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+
+from .corpus_parallel import map_shards
+from .stage_metrics import timed_document
+
+COUNT_DTYPE = np.int64
+MANIFEST_FILE = 'manifest.json'
+DOCUMENTS_DIR = 'documents'
+
+
+def document_frequencies(ids, vocab_size):
+    """Word counts of one document as a 1 x vocab_size sparse row."""
+    words, counts = np.unique(np.asarray(ids), return_counts=True)
+    return sparse.csr_matrix(
+        (counts.astype(COUNT_DTYPE), (np.zeros(len(words), dtype=np.int64), words)),
+        shape=(1, vocab_size)
+    )
+
+
+def _count_documents(filenames, store, count_document):
+    counted = []
+    for filename in filenames:
+        with timed_document(filename, store):
+            counted.append(count_document(store.token_ids(filename), len(store.vocabulary)))
+    return counted
+
+
+def _resized(matrix, shape):
+    # Token IDs are append-only: a larger vocabulary only adds empty rows/columns
+    if matrix.shape != shape:
+        matrix = matrix.tocsr(copy=True)
+        matrix.resize(shape)
+    return matrix
+
+
+class IncrementalCounts:
+    """Totals of one counting stage, kept in sync with a ``TokenStore``."""
+
+    def __init__(self, state_dir, key):
+        self.state_dir = state_dir
+        self.key = key
+        self.documents_dir = os.path.join(state_dir, DOCUMENTS_DIR)
+
+    def _load(self, store):
+        manifest_path = os.path.join(self.state_dir, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            return {'documents': {}, 'update': 0}, None
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            stored = json.load(f)
+        if stored['key'] != self.key or stored['generation'] != store.generation:
+            shutil.rmtree(self.state_dir)
+            return {'documents': {}, 'update': 0}, None
+        return stored, sparse.load_npz(os.path.join(self.state_dir, stored['totals']))
+
+    def _document_path(self, sha):
+        return os.path.join(self.documents_dir, sha + '.npz')
+
+    def _save(self, state, totals, store):
+        previous = state.get('totals')
+        state['update'] += 1
+        state['totals'] = f"totals-{state['update']}.npz"
+        sparse.save_npz(os.path.join(self.state_dir, state['totals']), totals)
+
+        # The manifest switches to the new totals atomically: an interrupted
+        # update leaves the previous, consistent state in place
+        manifest_path = os.path.join(self.state_dir, MANIFEST_FILE)
+        with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({
+                'key': self.key,
+                'generation': store.generation,
+                'update': state['update'],
+                'totals': state['totals'],
+                'documents': state['documents'],
+            }, f, indent=1)
+        os.replace(manifest_path + '.tmp', manifest_path)
+        if previous is not None:
+            os.remove(os.path.join(self.state_dir, previous))
+
+    def update(self, store, count_document, shape, workers=1):
+        """
+        Bring the totals up to date with ``store`` and return them.
+
+        ``count_document(ids, vocab_size)`` returns the sparse counts of one
+        document with the given ``shape`` (it must be picklable when
+        ``workers > 1``). Also returns a dict listing the added, deleted and
+        edited documents.
+        """
+        state, totals = self._load(store)
+        documents = state['documents']
+        totals = sparse.csr_matrix(shape, dtype=COUNT_DTYPE) if totals is None else _resized(totals, shape)
+        os.makedirs(self.documents_dir, exist_ok=True)
+
+        current = {filename: store.manifest[filename]['sha256'] for filename in store.documents}
+        changes = {
+            'added': [f for f in current if f not in documents],
+            'deleted': [f for f in documents if f not in current],
+            'edited': [f for f in current if f in documents and documents[f] != current[f]],
+        }
+        if not any(changes.values()) and 'totals' in state:
+            return totals, changes
+
+        # Subtract the stored counts of deleted and edited documents
+        references = Counter(documents.values())
+        stale = set()
+        for filename in changes['deleted'] + changes['edited']:
+            sha = documents.pop(filename)
+            totals = totals - _resized(sparse.load_npz(self._document_path(sha)), shape)
+            references[sha] -= 1
+            if references[sha] == 0:
+                stale.add(sha)
+
+        # Count and add new and edited documents
+        to_count = sorted(changes['added'] + changes['edited'])
+        pending = iter(to_count)
+        for counted in map_shards(_count_documents, to_count, workers,
+                                  store=store, count_document=count_document):
+            for counts in counted:
+                filename = next(pending)
+                sha = current[filename]
+                documents[filename] = sha
+                sparse.save_npz(self._document_path(sha), counts)
+                stale.discard(sha)
+                totals = totals + counts
+
+        totals.eliminate_zeros()
+        self._save(state, totals, store)
+        for sha in stale:
+            os.remove(self._document_path(sha))
+        return totals, changes
+
+
+def format_changes(changes):
+    return "Incremental update: {} added, {} edited, {} deleted documents".format(
+        len(changes['added']), len(changes['edited']), len(changes['deleted'])
+    )
@@ -0,0 +1,26 @@
+"""
+Peak memory reporting for the analysis scripts.
+"""
+
+import sys
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_bytes():
+    """Peak resident set size of the current process, or None if unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, in kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def format_peak_rss():
+    peak = peak_rss_bytes()
+    if peak is None:
+        return "Peak RSS: unavailable on this platform"
+    return f"Peak RSS: {peak / (1024 * 1024):.1f} MB"
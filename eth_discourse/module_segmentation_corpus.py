@@ -0,0 +1,79 @@
+import os
+
+from .config import (OUTPUT_DIR, add_corpus_arguments, add_metadata_argument, add_metrics_arguments,
+                     add_output_argument, corpus_source)
+from .cooccurrence_engine import cooccurrence_frame
+from .corpus_views import load_metadata, pair_matrix, segment, select, view_counts, view_dirname
+from .extract_word_frequencies import frequency_frame
+from .memory_usage import format_peak_rss
+from . import stage_metrics
+from . import text_normalization
+from .text_normalization import tokenize_document
+from .token_store import open_token_store, tokenizer_fingerprint
+
+WINDOW_SIZE = 5
+
+# --- SEGMENTATION ---
+
+def segment_views(metadata, columns, filters):
+    """{(column, value): ids} for every segmentation column, or the filtered corpus alone."""
+    if not columns:
+        return {('selection', 'all'): select(metadata, filters)}
+    return {
+        (column, value): ids
+        for column in columns
+        for value, ids in segment(metadata, column, filters).items()
+    }
+
+def add_arguments(parser):
+    parser.add_argument('--by', action='append', default=None, metavar='COLUMN',
+                        help="metadata column to segment on, repeatable (default: category)")
+    parser.add_argument('--where', action='append', default=[], metavar='COLUMN=VALUE',
+                        help="only keep articles matching this filter, e.g. author=Vitalik Buterin "
+                             "or year=2014..2016 (repeatable)")
+    parser.add_argument('--all', action='store_true',
+                        help="no segmentation: one result for the articles matching --where")
+    add_corpus_arguments(parser)
+    add_metadata_argument(parser)
+    # Output directory of the per-segment results (no corpus file is copied)
+    add_output_argument(parser, os.path.join(OUTPUT_DIR, 'segments', ''))
+    add_metrics_arguments(parser)
+
+def run(args):
+    columns = [] if args.all else (args.by or ['category'])
+    metrics = stage_metrics.from_arguments('module_segmentation_corpus', args)
+
+    with metrics.stage('metadata'):
+        metadata = load_metadata(args.corpus or args.metadata)
+        views = segment_views(metadata, columns, args.where)
+
+    with metrics.stage('tokenize'):
+        store = open_token_store(
+            corpus_source(args), args.cache_dir, tokenize_document,
+            fingerprint=tokenizer_fingerprint(text_normalization),
+            workers=args.workers
+        )
+    metrics.record_corpus(store)
+    # All segments are counted in one parallel pass over the documents
+    with metrics.stage('count'):
+        word_counts, pair_counts, missing = view_counts(store, views, WINDOW_SIZE, args.workers)
+    for doc_id in missing:
+        print(f"WARNING: File not found in corpus: {doc_id}")
+
+    vocabulary, ranks = store.vocabulary_array, store.word_ranks()
+    with metrics.stage('write'):
+        for row, ((column, value), ids) in enumerate(views.items()):
+            target_dir = os.path.join(args.output_dir, column, view_dirname(value))
+            os.makedirs(target_dir, exist_ok=True)
+
+            counts = word_counts[row].toarray().ravel()
+            frequency_frame(vocabulary, counts, ranks).to_csv(
+                os.path.join(target_dir, 'word_frequencies.csv'), index=False)
+            cooccurrence_frame(pair_matrix(pair_counts[row], len(vocabulary)), vocabulary, ranks,
+                               counts, WINDOW_SIZE).to_csv(
+                os.path.join(target_dir, 'cooccurrence_pairs.csv'), index=False, float_format='%.6g')
+
+    print(f"✅ Segmentation complete: {len(views)} segments of {sum(map(len, views.values()))} "
+          f"articles, results located in: {args.output_dir}")
+    print(format_peak_rss())
+    metrics.write()
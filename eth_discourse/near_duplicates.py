@@ -0,0 +1,503 @@
+"""
+Near-duplicate articles and repeated passages (boilerplate), found before counting.
+
+Reposts, translations of the same announcement and recurring blocks (security
+alert footers, "this week in Ethereum" headers...) inflate the word and pair
+counts. This command finds them in the token store, in time close to linear
+in the corpus size, and writes a plan that the counting commands apply with
+``--dedup``.
+
+1. Signatures: every document is reduced to the set of hashes of its
+   ``--shingle-size`` consecutive tokens (shingles), and that set to a MinHash
+   signature of ``NUM_PERMUTATIONS`` values, the minimum of each of as many
+   hash functions over the set. Two signatures agree on a position with
+   probability equal to the Jaccard similarity of the two shingle sets.
+2. Clusters (LSH banding): signatures are cut into ``BANDS`` bands of
+   ``ROWS`` values and documents with an identical band fall into the same
+   bucket. Only documents sharing a bucket are compared, every pair of them
+   (documents with identical signatures once), and pairs whose estimated
+   similarity reaches ``--threshold`` are merged into clusters. Pairs of similarity ``s`` share
+   a bucket with probability ``1 - (1 - s**ROWS)**BANDS``: 0.96 at ``s = 0.8``,
+   0.06 at ``s = 0.5``. No pairwise comparison of the whole corpus is ever
+   made. The earliest document of a cluster (corpus order) represents it.
+3. Boilerplate: every window of ``--passage-size`` tokens is hashed and the
+   number of documents containing it is estimated by a count-min sketch
+   (``cooccurrence_sketch``) of ``--memory-budget``, a near-duplicate cluster
+   counting once. Windows found in ``--min-documents`` documents or more are
+   repeated; overlapping repeated windows form the repeated passages of a
+   document.
+
+Paragraph breaks do not survive the text cleaning of the corpus, so passages
+are found on the token sequence rather than by paragraph.
+
+The plan (``data/near_duplicates.json``) lists the documents dropped
+(``--duplicates drop``: all but the representative of each cluster) and the
+token spans removed from the others (``--boilerplate drop``: every repeated
+passage; ``once``: all but the first occurrence of each passage, which is
+then counted once). ``dedup_view`` applies it to a token store; documents
+edited since the plan was written are counted whole. A removed passage also
+cuts the document in two runs of tokens (``DedupedStore.token_runs``), so
+that co-occurrence windows and n-grams never join the words on either side.
+
+Outputs (``outputs/duplicates/``)::
+
+    clusters.csv      cluster, document, representative, similarity, tokens
+    boilerplate.csv   passage, documents, tokens, document (first containing it)
+"""
+
+import json
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from .config import (DEDUP_FILE, OUTPUT_DIR, add_corpus_arguments, add_metrics_arguments, add_output_argument,
+                     corpus_source)
+from .cooccurrence_sketch import fill_sketch, shared_sketch
+from .corpus_parallel import map_shards
+from .memory_usage import format_peak_rss
+from . import stage_metrics
+from .stage_metrics import timed_document
+from . import text_normalization
+from .text_normalization import tokenize_document
+from .token_store import open_token_store, tokenizer_fingerprint
+
+PLAN_VERSION = 1
+SHINGLE_SIZE = 5
+NUM_PERMUTATIONS = 128
+BANDS = 16
+ROWS = NUM_PERMUTATIONS // BANDS
+THRESHOLD = 0.8
+PASSAGE_SIZE = 8
+MIN_DOCUMENTS = 5
+MEMORY_BUDGET_MB = 16
+MINHASH_SEED = 20240501
+# Shingles hashed at once by the permutations, bounding the temporary arrays
+MINHASH_CHUNK = 4096
+HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+DUPLICATE_MODES = ('keep', 'drop')
+BOILERPLATE_MODES = ('keep', 'drop', 'once')
+
+
+# --- HASHING ---
+
+def _mix(values):
+    """splitmix64 finalizer: spreads the bits of uint64 values."""
+    values = values ^ (values >> np.uint64(30))
+    values = values * np.uint64(0xBF58476D1CE4E5B9)
+    values = values ^ (values >> np.uint64(27))
+    values = values * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def window_hashes(token_ids, size):
+    """uint64 hash of every window of ``size`` consecutive token IDs, in order."""
+    ids = np.asarray(token_ids, dtype=np.uint64)
+    count = len(ids) - size + 1
+    hashes = np.zeros(max(count, 0), dtype=np.uint64)
+    if count <= 0:
+        return hashes
+    for offset in range(size):
+        hashes = _mix(hashes * HASH_MULTIPLIER + ids[offset:offset + count] + np.uint64(1))
+    return hashes
+
+
+def permutations(count=NUM_PERMUTATIONS, seed=MINHASH_SEED):
+    """Odd multipliers and offsets of ``count`` multiply-shift hash functions."""
+    rng = np.random.default_rng(seed)
+    multipliers = rng.integers(0, 1 << 63, size=count, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    offsets = rng.integers(0, 1 << 63, size=count, dtype=np.uint64)
+    return multipliers, offsets
+
+
+def minhash(shingles, multipliers, offsets):
+    """MinHash signature (uint32, high bits of each minimum) of a set of shingle hashes."""
+    signature = np.full(len(multipliers), np.iinfo(np.uint64).max, dtype=np.uint64)
+    for start in range(0, len(shingles), MINHASH_CHUNK):
+        chunk = shingles[start:start + MINHASH_CHUNK, None]
+        np.minimum(signature, (chunk * multipliers + offsets).min(axis=0), out=signature)
+    return (signature >> np.uint64(32)).astype(np.uint32)
+
+
+# --- NEAR-DUPLICATE CLUSTERS ---
+
+def _signature_shard(filenames, store, shingle_size, multipliers, offsets):
+    signatures = np.zeros((len(filenames), len(multipliers)), dtype=np.uint32)
+    valid = np.zeros(len(filenames), dtype=bool)
+    for row, filename in enumerate(filenames):
+        with timed_document(filename, store):
+            shingles = np.unique(window_hashes(store.token_ids(filename), shingle_size))
+            if len(shingles):
+                signatures[row] = minhash(shingles, multipliers, offsets)
+                valid[row] = True
+    return signatures, valid
+
+
+def signatures(store, documents, shingle_size=SHINGLE_SIZE, workers=1):
+    """
+    MinHash signatures of ``documents`` (one row each) and the mask of the
+    documents long enough to have a shingle.
+    """
+    multipliers, offsets = permutations()
+    parts = list(map_shards(_signature_shard, documents, workers, store=store, shingle_size=shingle_size,
+                            multipliers=multipliers, offsets=offsets))
+    if not parts:
+        return np.zeros((0, NUM_PERMUTATIONS), dtype=np.uint32), np.zeros(0, dtype=bool)
+    return np.concatenate([part[0] for part in parts]), np.concatenate([part[1] for part in parts])
+
+
+def _root(parent, node):
+    while parent[node] != node:
+        parent[node] = parent[parent[node]]
+        node = parent[node]
+    return node
+
+
+def _join(parent, first, second):
+    first, second = _root(parent, first), _root(parent, second)
+    if first != second:
+        # The earliest document stays the root
+        parent[max(first, second)] = min(first, second)
+
+
+def _join_bucket(parent, signatures, members, threshold):
+    """Join every pair of ``members`` (rows sharing a bucket) whose estimated similarity reaches ``threshold``."""
+    # Identical signatures are joined once, then compared through their first row
+    _, first, group = np.unique(signatures[members], axis=0, return_index=True, return_inverse=True)
+    for member, head in zip(members.tolist(), members[first[group.ravel()]].tolist()):
+        _join(parent, head, member)
+    distinct = members[np.sort(first)]
+    for i, row in enumerate(distinct[:-1].tolist()):
+        others = distinct[i + 1:]
+        for other in others[(signatures[others] == signatures[row]).mean(axis=1) >= threshold].tolist():
+            _join(parent, row, other)
+
+
+def lsh_clusters(signatures, valid, threshold=THRESHOLD, bands=BANDS):
+    """
+    Clusters of near-duplicate rows of ``signatures``, by LSH banding.
+
+    Every pair of rows sharing a bucket in some band is compared, so the
+    clusters do not depend on the order of the documents. Returns a list of
+    clusters, each a sorted array of row indices (at least two), its first
+    row being the representative.
+    """
+    rows = signatures.shape[1] // bands
+    candidates = np.flatnonzero(valid)
+    parent = np.arange(len(signatures))
+    for band in range(bands):
+        block = np.ascontiguousarray(signatures[candidates, band * rows:(band + 1) * rows])
+        keys = block.view(np.dtype((np.void, block.itemsize * rows))).ravel()
+        _, bucket, sizes = np.unique(keys, return_inverse=True, return_counts=True)
+        bucket = bucket.ravel()
+        # Rows of the buckets holding two rows or more, grouped by bucket in increasing order
+        shared = np.flatnonzero(sizes[bucket] > 1)
+        order = shared[np.argsort(bucket[shared], kind='stable')]
+        for members in np.split(candidates[order], np.flatnonzero(np.diff(bucket[order])) + 1):
+            if len(members):
+                _join_bucket(parent, signatures, members, threshold)
+
+    roots = np.array([_root(parent, node) for node in range(len(parent))], dtype=np.int64)
+    grouped = np.flatnonzero(roots != np.arange(len(roots)))
+    members = {}
+    for node in grouped.tolist():
+        members.setdefault(int(roots[node]), [int(roots[node])]).append(node)
+    return [np.array(sorted(cluster)) for _, cluster in sorted(members.items())]
+
+
+# --- REPEATED PASSAGES ---
+
+def _passage_sketch_shard(filenames, store, passage_size, sketch):
+    keys = []
+    for filename in filenames:
+        with timed_document(filename, store):
+            # One count per document containing the window, however often it repeats there
+            keys.append(np.unique(window_hashes(store.token_ids(filename), passage_size)))
+    keys = np.concatenate(keys) if keys else np.zeros(0, dtype=np.uint64)
+    return sketch.updates(keys, np.ones(len(keys), dtype=np.int64))
+
+
+def repeated_spans(token_ids, passage_size, sketch, min_documents):
+    """
+    Repeated passages of one document: ``(spans, keys)``, ``spans`` the
+    ``[start, end)`` token ranges covered by windows estimated in
+    ``min_documents`` documents or more, ``keys`` the smallest window hash of
+    each span, which names the passage across documents.
+    """
+    keys = window_hashes(token_ids, passage_size)
+    starts = np.flatnonzero(sketch.estimate(keys) >= min_documents) if len(keys) else np.zeros(0, dtype=np.int64)
+    if not len(starts):
+        return np.zeros((0, 2), dtype=np.int64), np.zeros(0, dtype=np.uint64)
+    boundaries = np.zeros(len(token_ids) + 1, dtype=np.int64)
+    np.add.at(boundaries, starts, 1)
+    np.add.at(boundaries, starts + passage_size, -1)
+    covered = (np.cumsum(boundaries[:-1]) > 0).astype(np.int8)
+    spans = np.flatnonzero(np.diff(np.concatenate(([0], covered, [0])))).reshape(-1, 2)
+    span_of_window = np.searchsorted(spans[:, 0], starts, side='right') - 1
+    first_window = np.searchsorted(span_of_window, np.arange(len(spans)))
+    return spans, np.minimum.reduceat(keys[starts], first_window)
+
+
+def _passage_shard(filenames, store, passage_size, sketch, min_documents):
+    return [repeated_spans(store.token_ids(filename), passage_size, sketch, min_documents)
+            for filename in filenames]
+
+
+def repeated_passages(store, documents, counted, passage_size=PASSAGE_SIZE, min_documents=MIN_DOCUMENTS,
+                      memory_budget=MEMORY_BUDGET_MB * 1024 * 1024, workers=1):
+    """
+    Repeated passages of every document of ``documents``, as ``repeated_spans`` pairs.
+
+    Document frequencies are estimated over the ``counted`` documents only
+    (near-duplicates left out, so that a cluster counts once). Worker
+    processes share one sketch (``cooccurrence_sketch.shared_sketch``).
+    """
+    passages = []
+    with shared_sketch(memory_budget, workers) as sketch:
+        fill_sketch(sketch, _passage_sketch_shard, counted, workers, store=store, passage_size=passage_size)
+        for part in map_shards(_passage_shard, documents, workers, store=store, passage_size=passage_size,
+                               sketch=sketch, min_documents=min_documents):
+            passages.extend(part)
+    return passages, sketch
+
+
+# --- PLAN ---
+
+def build_plan(store, documents, clusters, passages, duplicates='drop', boilerplate='once'):
+    """
+    Plan of the documents dropped and of the spans removed from the others.
+
+    Returns ``{document: {'sha256', 'drop': True}}`` for dropped documents and
+    ``{document: {'sha256', 'spans': [[start, end], ...]}}`` for trimmed ones.
+    """
+    plan = {}
+    if duplicates == 'drop':
+        for cluster in clusters:
+            for row in cluster[1:].tolist():
+                plan[documents[row]] = {'sha256': store.manifest[documents[row]]['sha256'], 'drop': True}
+    if boilerplate == 'keep':
+        return plan
+
+    seen = set()
+    for filename, (spans, keys) in zip(documents, passages):
+        if filename in plan or not len(spans):
+            continue
+        removed = []
+        for (start, end), key in zip(spans.tolist(), keys.tolist()):
+            if boilerplate == 'once' and key not in seen:
+                seen.add(key)
+                continue
+            removed.append([start, end])
+        if removed:
+            plan[filename] = {'sha256': store.manifest[filename]['sha256'], 'spans': removed}
+    return plan
+
+
+def save_plan(path, documents, options):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    state = {
+        'version': PLAN_VERSION,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        **options,
+        'documents': documents,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+
+
+class DedupedStore:
+    """
+    Token store without the dropped documents and with the removed spans cut
+    out of the others; every other attribute is the underlying store's.
+
+    The manifest still lists the dropped documents, so that metadata views
+    resolve them; ``kept`` filters such a list of documents.
+    """
+
+    def __init__(self, store, dropped, spans):
+        self.store = store
+        self.dropped = frozenset(dropped)
+        self.spans = spans
+
+    def __getattr__(self, name):
+        # Guarded so that unpickling (before ``store`` is set) does not recurse
+        if name == 'store' or name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.store, name)
+
+    @property
+    def documents(self):
+        return self.kept(self.store.documents)
+
+    def kept(self, documents):
+        """``documents`` without the dropped ones, in the same order."""
+        return [name for name in documents if name not in self.dropped]
+
+    def token_count(self, filename):
+        spans = self.spans.get(filename)
+        removed = 0 if spans is None else int((spans[:, 1] - spans[:, 0]).sum())
+        return self.store.token_count(filename) - removed
+
+    def token_runs(self, filename):
+        """Token IDs of one document as the runs between its removed spans (at least one run)."""
+        token_ids = self.store.token_ids(filename)
+        spans = self.spans.get(filename)
+        if spans is None:
+            return [token_ids]
+        bounds = np.concatenate(([0], spans.ravel(), [len(token_ids)])).reshape(-1, 2)
+        runs = [token_ids[start:end] for start, end in bounds.tolist() if end > start]
+        return runs or [token_ids[:0]]
+
+    def token_ids(self, filename):
+        """Token IDs of one document without its removed spans (the runs joined, for word counts)."""
+        runs = self.token_runs(filename)
+        return runs[0] if len(runs) == 1 else np.concatenate(runs)
+
+    def tokens(self, filename):
+        vocabulary = self.vocabulary
+        return [vocabulary[i] for i in self.token_ids(filename).tolist()]
+
+
+def dedup_view(store, path):
+    """
+    ``DedupedStore`` of ``store`` applying the plan written to ``path`` by
+    this command, and the documents of the plan missing from ``store`` or
+    edited since (counted whole).
+    """
+    with open(path, encoding='utf-8') as f:
+        plan = json.load(f)
+    if plan.get('version') != PLAN_VERSION:
+        raise ValueError(f"{path} is not a near-duplicate plan of version {PLAN_VERSION}")
+    dropped, spans, stale = [], {}, []
+    for name, entry in plan['documents'].items():
+        current = store.manifest.get(name)
+        if current is None or current['sha256'] != entry['sha256']:
+            stale.append(name)
+        elif entry.get('drop'):
+            dropped.append(name)
+        else:
+            spans[name] = np.asarray(entry['spans'], dtype=np.int64).reshape(-1, 2)
+    return DedupedStore(store, dropped, spans), stale
+
+
+def format_dedup(path, view, stale):
+    """Summary of the ``dedup_view`` of the plan ``path``, printed by the counting commands."""
+    lines = [f"Near-duplicate plan {path}: {len(view.dropped)} documents dropped, "
+             f"passages removed from {len(view.spans)} documents"]
+    if stale:
+        lines.append(f"WARNING: {len(stale)} documents of the plan are missing or were edited since: "
+                     f"they are counted whole (run the duplicates command again)")
+    return '\n'.join(lines)
+
+
+# --- REPORTS ---
+
+def cluster_frame(store, documents, clusters, signatures):
+    records = []
+    # Largest clusters first, then in corpus order
+    for number, cluster in enumerate(sorted(clusters, key=lambda rows: (-len(rows), rows[0])), start=1):
+        representative = signatures[cluster[0]]
+        for row in cluster.tolist():
+            records.append({
+                'cluster': number,
+                'document': documents[row],
+                'representative': documents[cluster[0]],
+                'similarity': round(float((signatures[row] == representative).mean()), 4),
+                'tokens': store.manifest[documents[row]]['tokens'],
+            })
+    return pd.DataFrame(records, columns=['cluster', 'document', 'representative', 'similarity', 'tokens'])
+
+
+def passage_frame(store, documents, passages):
+    found = {}
+    for filename, (spans, keys) in zip(documents, passages):
+        for (start, end), key in zip(spans.tolist(), keys.tolist()):
+            if key in found:
+                found[key]['documents'] += 1
+            else:
+                found[key] = {'documents': 1, 'tokens': end - start, 'document': filename, 'span': (start, end)}
+    vocabulary = store.vocabulary_array
+    records = []
+    for passage in found.values():
+        start, end = passage.pop('span')
+        token_ids = np.asarray(store.token_ids(passage['document'])[start:end], dtype=np.int64)
+        records.append({'passage': ' '.join(vocabulary[token_ids]), **passage})
+    frame = pd.DataFrame(records, columns=['passage', 'documents', 'tokens', 'document'])
+    return frame.sort_values(['documents', 'tokens', 'document'], ascending=[False, False, True], kind='stable')
+
+
+# --- COMMAND ---
+
+def add_arguments(parser):
+    add_corpus_arguments(parser)
+    add_output_argument(parser, os.path.join(OUTPUT_DIR, 'duplicates', ''))
+    parser.add_argument('--plan', default=DEDUP_FILE,
+                        help=f"plan read by the counting commands with --dedup (default: {DEDUP_FILE})")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help=f"estimated Jaccard similarity of near-duplicates (default: {THRESHOLD})")
+    parser.add_argument('--shingle-size', type=int, default=SHINGLE_SIZE,
+                        help=f"tokens per shingle (default: {SHINGLE_SIZE})")
+    parser.add_argument('--passage-size', type=int, default=PASSAGE_SIZE,
+                        help=f"tokens of the shortest repeated passage (default: {PASSAGE_SIZE})")
+    parser.add_argument('--min-documents', type=int, default=MIN_DOCUMENTS,
+                        help=f"documents a passage must appear in to be boilerplate (default: {MIN_DOCUMENTS})")
+    parser.add_argument('--memory-budget', type=float, default=MEMORY_BUDGET_MB, metavar='MB',
+                        help=f"count-min sketch size for passage document counts (default: {MEMORY_BUDGET_MB})")
+    parser.add_argument('--duplicates', choices=DUPLICATE_MODES, default='drop',
+                        help="drop all but the earliest document of each cluster, or keep them (default: drop)")
+    parser.add_argument('--boilerplate', choices=BOILERPLATE_MODES, default='once',
+                        help="remove repeated passages everywhere (drop), everywhere but their first "
+                             "document (once), or keep them (default: once)")
+    add_metrics_arguments(parser)
+
+def run(args):
+    metrics = stage_metrics.from_arguments('near_duplicates', args)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    with metrics.stage('tokenize'):
+        store = open_token_store(
+            corpus_source(args), args.cache_dir, tokenize_document,
+            fingerprint=tokenizer_fingerprint(text_normalization),
+            workers=args.workers
+        )
+    metrics.record_corpus(store)
+    documents = store.documents
+
+    with metrics.stage('signatures'):
+        matrix, valid = signatures(store, documents, args.shingle_size, args.workers)
+    with metrics.stage('clusters'):
+        clusters = lsh_clusters(matrix, valid, args.threshold)
+    duplicates = {row for cluster in clusters for row in cluster[1:].tolist()}
+    print(f"{len(clusters)} clusters of near-duplicates, {len(duplicates)} documents "
+          f"besides their representatives (similarity >= {args.threshold})")
+
+    with metrics.stage('passages'):
+        counted = [filename for row, filename in enumerate(documents) if row not in duplicates]
+        passages, sketch = repeated_passages(store, documents, counted, args.passage_size, args.min_documents,
+                                             int(args.memory_budget * 1024 * 1024), args.workers)
+
+    with metrics.stage('write'):
+        cluster_frame(store, documents, clusters, matrix).to_csv(
+            os.path.join(args.output_dir, 'clusters.csv'), index=False)
+        passage_table = passage_frame(store, documents, passages)
+        passage_table.to_csv(os.path.join(args.output_dir, 'boilerplate.csv'), index=False)
+        plan = build_plan(store, documents, clusters, passages, args.duplicates, args.boilerplate)
+        save_plan(args.plan, plan, {
+            'source': os.path.abspath(corpus_source(args)),
+            'threshold': args.threshold, 'shingle_size': args.shingle_size,
+            'passage_size': args.passage_size, 'min_documents': args.min_documents,
+            'duplicates': args.duplicates, 'boilerplate': args.boilerplate,
+            'sketch': f"{sketch.depth}x{sketch.width}",
+        })
+
+    removed = sum(end - start for entry in plan.values() for start, end in entry.get('spans', ()))
+    print(f"{len(passage_table)} repeated passages found in {sum(1 for spans, _ in passages if len(spans))} "
+          f"documents (>= {args.min_documents} documents); {removed:,} tokens removed by --boilerplate "
+          f"{args.boilerplate}")
+    print(f"Plan saved to {args.plan}; apply it with --dedup {args.plan}")
+    print(format_peak_rss())
+    metrics.write()
@@ -0,0 +1,309 @@
+"""
+Positional inverted index with keyword-in-context (KWIC) queries.
+
+The index is built from the token store, so words and positions follow the
+cleaning and tokenizing rules of the analysis stages (``tokenize_document``,
+i.e. ``tokenize_strict(clean_text_advanced(...))``): stopwords are already
+gone, so "proof of stake" is the two-word phrase ``proof stake``. Queries are
+tokenized the same way.
+
+Layout of the index directory (NumPy arrays, memory-mapped when querying)::
+
+    manifest.json        store fingerprint/generation/documents it was built from
+    vocab.txt            one word per line, line number = word ID
+    documents.txt        one document name per line, in corpus order
+    tokens.npy           word IDs of the whole corpus, documents concatenated
+    doc_offsets.npy      document i spans tokens[doc_offsets[i]:doc_offsets[i + 1]]
+    postings.npy         positions in tokens.npy, grouped by word, ascending
+    word_offsets.npy     positions of word w are postings[word_offsets[w]:word_offsets[w + 1]]
+
+Positions index ``tokens.npy`` directly, so the context of any hit is a slice
+of the token stream and a phrase or proximity query is a few vectorized
+``searchsorted``/``intersect1d`` calls over the postings of its words.
+
+Usage:
+
+    python -m eth_discourse index build
+    python -m eth_discourse index kwic "smart contract" [--width 8] [--limit 20] [--index-dir DIR]
+    python -m eth_discourse index near proof stake [--distance 5]
+    python -m eth_discourse index count ethereum "proof of stake"
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+from .config import INDEX_DIR, UsageError, add_corpus_arguments, add_metrics_arguments, corpus_source
+from . import stage_metrics
+from .stage_metrics import timed_document
+from . import text_normalization
+from .text_normalization import tokenize_document
+from .token_store import open_token_store, tokenizer_fingerprint
+
+MANIFEST_FILE = 'manifest.json'
+POSITION_DTYPE = np.int64
+
+# Context words on each side of a KWIC hit, hits printed by default
+KWIC_WIDTH = 8
+KWIC_LIMIT = 20
+NEAR_DISTANCE = 5
+
+
+def store_stamp(store):
+    """Identifies the store content an index was built from."""
+    digest = hashlib.sha256()
+    digest.update(store.fingerprint.encode('utf-8'))
+    digest.update(store.generation.encode('utf-8'))
+    for filename in store.documents:
+        digest.update(f"{filename}\0{store.manifest[filename]['sha256']}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _save_array(directory, name, array):
+    path = os.path.join(directory, name)
+    with open(path + '.tmp', 'wb') as f:
+        np.save(f, array)
+    os.replace(path + '.tmp', path)
+
+
+def _write_lines(directory, name, lines):
+    path = os.path.join(directory, name)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        f.write(''.join(line + '\n' for line in lines))
+    os.replace(path + '.tmp', path)
+
+
+# --- BUILDING ---
+
+def build_index(store, index_dir=INDEX_DIR, force=False):
+    """
+    Write the index of ``store`` to ``index_dir``; returns False if it was up to date.
+
+    Postings come from one stable argsort of the concatenated token stream:
+    positions end up grouped by word ID, ascending within each word.
+    """
+    stamp = store_stamp(store)
+    manifest_path = os.path.join(index_dir, MANIFEST_FILE)
+    if not force and os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            if json.load(f).get('stamp') == stamp:
+                return False
+
+    documents = store.documents
+    lengths = np.array([store.manifest[filename]['tokens'] for filename in documents], dtype=POSITION_DTYPE)
+    doc_offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(POSITION_DTYPE)
+    tokens = np.empty(doc_offsets[-1], dtype=np.uint32)
+    for filename, start, stop in zip(documents, doc_offsets[:-1], doc_offsets[1:]):
+        with timed_document(filename, store):
+            tokens[start:stop] = store.token_ids(filename)
+
+    vocab_size = len(store.vocabulary)
+    postings = np.argsort(tokens, kind='stable').astype(POSITION_DTYPE)
+    word_offsets = np.concatenate([[0], np.cumsum(np.bincount(tokens, minlength=vocab_size))]).astype(POSITION_DTYPE)
+
+    os.makedirs(index_dir, exist_ok=True)
+    _write_lines(index_dir, 'vocab.txt', store.vocabulary)
+    _write_lines(index_dir, 'documents.txt', documents)
+    _save_array(index_dir, 'tokens.npy', tokens)
+    _save_array(index_dir, 'doc_offsets.npy', doc_offsets)
+    _save_array(index_dir, 'postings.npy', postings)
+    _save_array(index_dir, 'word_offsets.npy', word_offsets)
+    # Written last: an interrupted build is rebuilt on the next run
+    with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({'stamp': stamp, 'documents': len(documents), 'tokens': int(len(tokens)),
+                   'vocabulary': vocab_size}, f, indent=1)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    return True
+
+
+# --- QUERYING ---
+
+class PositionalIndex:
+    """Read-only, memory-mapped positional index of ``index_dir``."""
+
+    def __init__(self, index_dir=INDEX_DIR):
+        if not os.path.exists(os.path.join(index_dir, MANIFEST_FILE)):
+            raise FileNotFoundError(f"no positional index in {index_dir}: run 'python -m eth_discourse index build' first")
+        with open(os.path.join(index_dir, 'vocab.txt'), 'r', encoding='utf-8') as f:
+            self.vocabulary = f.read().split('\n')[:-1]
+        with open(os.path.join(index_dir, 'documents.txt'), 'r', encoding='utf-8') as f:
+            self.documents = f.read().split('\n')[:-1]
+        self.word_ids = {word: i for i, word in enumerate(self.vocabulary)}
+        self.tokens = np.load(os.path.join(index_dir, 'tokens.npy'), mmap_mode='r')
+        self.doc_offsets = np.load(os.path.join(index_dir, 'doc_offsets.npy'))
+        self.postings = np.load(os.path.join(index_dir, 'postings.npy'), mmap_mode='r')
+        self.word_offsets = np.load(os.path.join(index_dir, 'word_offsets.npy'), mmap_mode='r')
+
+    def positions(self, word):
+        """Ascending positions of ``word`` (empty if unknown)."""
+        word_id = self.word_ids.get(word)
+        if word_id is None:
+            return np.empty(0, dtype=POSITION_DTYPE)
+        return self.postings[self.word_offsets[word_id]:self.word_offsets[word_id + 1]]
+
+    def document_of(self, positions):
+        """Document index of every position."""
+        return np.searchsorted(self.doc_offsets, positions, side='right') - 1
+
+    def phrase(self, words):
+        """Start positions of the consecutive ``words`` within one document."""
+        if not words:
+            return np.empty(0, dtype=POSITION_DTYPE)
+        starts = np.asarray(self.positions(words[0]))
+        for offset, word in enumerate(words[1:], start=1):
+            starts = np.intersect1d(starts, np.asarray(self.positions(word)) - offset, assume_unique=True)
+        if len(words) > 1 and len(starts):
+            starts = starts[self.document_of(starts) == self.document_of(starts + len(words) - 1)]
+        return starts
+
+    def near(self, first, second, distance=NEAR_DISTANCE):
+        """
+        Positions of ``first`` with ``second`` at most ``distance`` tokens away (either
+        side, same document), and the position of the nearest such ``second``.
+        """
+        anchors = np.asarray(self.positions(first))
+        targets = np.asarray(self.positions(second))
+        if not len(anchors) or not len(targets):
+            empty = np.empty(0, dtype=POSITION_DTYPE)
+            return empty, empty
+
+        documents = self.document_of(anchors)
+        low = np.maximum(anchors - distance, self.doc_offsets[documents])
+        high = np.minimum(anchors + distance, self.doc_offsets[documents + 1] - 1)
+        # Nearest target strictly before and strictly after every anchor (the
+        # anchor itself when both words are the same), kept if inside [low, high]
+        after = np.searchsorted(targets, anchors, side='right')
+        before = np.searchsorted(targets, anchors, side='left') - 1
+        next_target = targets[np.minimum(after, len(targets) - 1)]
+        previous_target = targets[np.maximum(before, 0)]
+        has_next = (after < len(targets)) & (next_target <= high)
+        has_previous = (before >= 0) & (previous_target >= low)
+
+        nearest = np.where(has_previous & (~has_next | (anchors - previous_target <= next_target - anchors)),
+                           previous_target, next_target)
+        keep = has_next | has_previous
+        return anchors[keep], nearest[keep]
+
+    def kwic(self, starts, length=1, width=KWIC_WIDTH, limit=KWIC_LIMIT):
+        """
+        ``(document, left, match, right)`` of the first ``limit`` hits (``limit=None``
+        for all), context clipped to the document.
+        """
+        starts = np.asarray(starts)[:limit]
+        documents = self.document_of(starts)
+        lines = []
+        for start, document in zip(starts.tolist(), documents.tolist()):
+            doc_start, doc_stop = self.doc_offsets[document], self.doc_offsets[document + 1]
+            stop = start + length
+            words = [self.vocabulary[i] for i in self.tokens[max(start - width, doc_start):min(stop + width, doc_stop)]]
+            left_size = start - max(start - width, doc_start)
+            lines.append((self.documents[document], ' '.join(words[:left_size]),
+                          ' '.join(words[left_size:left_size + length]), ' '.join(words[left_size + length:])))
+        return lines
+
+    def query(self, text):
+        """Start positions and length of a word or phrase, tokenized like the corpus."""
+        words = tokenize_document(text)
+        return self.phrase(words), len(words)
+
+
+def format_kwic(lines):
+    left_width = max((len(left) for _, left, _, _ in lines), default=0)
+    return '\n'.join(
+        f"{document[:40]:<40}  {left:>{left_width}}  [{match}]  {right}"
+        for document, left, match, right in lines
+    )
+
+
+# --- MAIN ---
+
+def add_arguments(parser):
+    parser.add_argument('--index-dir', default=INDEX_DIR, help=f"index directory (default: {INDEX_DIR})")
+    # Also accepted after the subcommand; suppressed there by default so that
+    # it does not override a value given before it
+    index_options = argparse.ArgumentParser(add_help=False)
+    index_options.add_argument('--index-dir', default=argparse.SUPPRESS,
+                               help=f"index directory (default: {INDEX_DIR})")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', parents=[index_options],
+                                help="build or refresh the index from the token store")
+    add_corpus_arguments(build)
+    build.add_argument('--force', action='store_true', help="rebuild even if the index is up to date")
+
+    kwic = commands.add_parser('kwic', parents=[index_options], help="keyword in context of a word or phrase")
+    kwic.add_argument('phrase')
+    near = commands.add_parser('near', parents=[index_options],
+                               help="occurrences of WORD with OTHER at most --distance tokens away")
+    near.add_argument('word')
+    near.add_argument('other')
+    near.add_argument('--distance', type=int, default=NEAR_DISTANCE,
+                      help=f"largest distance in tokens (default: {NEAR_DISTANCE})")
+    for command in (kwic, near):
+        command.add_argument('--width', type=int, default=KWIC_WIDTH,
+                             help=f"context words on each side (default: {KWIC_WIDTH})")
+        command.add_argument('--limit', type=int, default=KWIC_LIMIT,
+                             help=f"hits shown (default: {KWIC_LIMIT})")
+
+    count = commands.add_parser('count', parents=[index_options], help="occurrences and documents of words or phrases")
+    count.add_argument('phrases', nargs='+')
+    for command in (build, kwic, near, count):
+        add_metrics_arguments(command)
+
+def run(args):
+    metrics = stage_metrics.from_arguments(f'positional_index_{args.command}', args)
+
+    if args.command == 'build':
+        with metrics.stage('tokenize'):
+            store = open_token_store(
+                corpus_source(args), args.cache_dir, tokenize_document,
+                fingerprint=tokenizer_fingerprint(text_normalization),
+                workers=args.workers
+            )
+        start = time.perf_counter()
+        with metrics.stage('index'):
+            built = build_index(store, args.index_dir, args.force)
+        if built:
+            print(f"Positional index of {len(store.documents)} documents built in "
+                  f"{time.perf_counter() - start:.2f} s: {args.index_dir}")
+        else:
+            print(f"Positional index is up to date: {args.index_dir}")
+        metrics.write()
+        return
+
+    with metrics.stage('open'):
+        index = PositionalIndex(args.index_dir)
+    start = time.perf_counter()
+    with metrics.stage('query'):
+        if args.command == 'kwic':
+            starts, length = index.query(args.phrase)
+            if not length:
+                raise UsageError("kwic takes a word or phrase that is not only stopwords")
+            lines = index.kwic(starts, length, args.width, args.limit)
+            hits = len(starts)
+        elif args.command == 'near':
+            first, second = tokenize_document(args.word), tokenize_document(args.other)
+            if len(first) != 1 or len(second) != 1:
+                raise UsageError("near takes two single words that are not stopwords")
+            anchors, nearest = index.near(first[0], second[0], args.distance)
+            # Highlight the span from the word to its nearest neighbour
+            starts = np.minimum(anchors, nearest)
+            lines = [index.kwic([s], int(abs(a - n)) + 1, args.width)[0]
+                     for s, a, n in zip(starts[:args.limit], anchors[:args.limit], nearest[:args.limit])]
+            hits = len(anchors)
+        else:
+            for phrase in args.phrases:
+                starts, _ = index.query(phrase)
+                print(f"{phrase}: {len(starts):,} occurrences in "
+                      f"{len(np.unique(index.document_of(starts))):,} documents")
+
+    if args.command == 'count':
+        print(f"({(time.perf_counter() - start) * 1000:.1f} ms)")
+    else:
+        print(format_kwic(lines))
+        print(f"\n{hits:,} hits, {len(lines)} shown ({(time.perf_counter() - start) * 1000:.1f} ms)")
+    metrics.write()
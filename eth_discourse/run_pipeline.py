@@ -0,0 +1,398 @@
+"""
+Cached DAG runner for the analysis pipeline.
+
+Replaces running ``notebooks/ETH_Foundation_Master_Pipeline.ipynb`` cell by
+cell, or the commands by hand in the right order. Each stage declares its
+command, parameters, input paths and output paths; a stage depends on the
+stages producing its inputs::
+
+    corpus -> tokens -> frequencies -> frequency_charts
+                     -> cooccurrences -> network
+
+With ``--dedup`` a ``duplicates`` stage (``near_duplicates``) runs between
+``tokens`` and the counting stages, which then leave out the near-duplicate
+articles and repeated passages it finds.
+
+A stage is skipped when its key is unchanged and its outputs are still those
+it wrote. The key hashes the content of its inputs, its parameters and the
+source of its module and of the package modules the module imports, so
+editing ``THRESHOLD`` of the network stage (``--set network.threshold=8``)
+re-renders the network without recounting the corpus. Stages whose
+dependencies are done run concurrently (``--jobs``).
+
+State is kept in ``data/pipeline_state.json``. Every stage command writes its
+own metrics report (``stage_metrics``); the runner collects their stage
+timings and peak RSS into ``outputs/metrics/run_pipeline.json``. With
+``--profile DIR`` every stage that runs dumps cProfile statistics to ``DIR``
+(``--force`` the stages to profile if they are up to date), and with
+``--vocabulary-growth`` its report includes the vocabulary growth curve.
+
+Run from the repository root:
+
+    python -m eth_discourse pipeline [--jobs 2] [--set network.threshold=8] [--force network] [--dry-run]
+"""
+
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .config import (CACHE_DIR, DATA_DIR, DEDUP_FILE, OUTPUT_DIR, PIPELINE_STATE_FILE as STATE_FILE, UsageError,
+                     add_metrics_arguments)
+from .corpus_manifest import file_sha256
+from . import stage_metrics
+from .stage_metrics import GROWTH_ENV, PROFILE_ENV
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+PACKAGE = os.path.basename(PACKAGE_DIR)
+
+# Parameters passed to the commands as --name value; 'workers' does not change
+# any result, so it is left out of the stage keys
+RUNTIME_PARAMETERS = {'workers'}
+
+
+def pipeline_stages(data_dir=DATA_DIR, cache_dir=CACHE_DIR, output_dir=OUTPUT_DIR, dedup_file=None):
+    """
+    The pipeline stages over the given corpus, cache and output directories.
+
+    ``command`` is the ``python -m eth_discourse`` command of the stage and
+    ``module`` the package module implementing it; ``arguments`` locate its
+    inputs and outputs. With ``dedup_file``, the ``duplicates`` stage writes
+    its plan there and the counting stages apply it. Every command writes
+    its metrics report to ``metrics``, under ``output_dir``.
+    """
+    tokens = [os.path.join(cache_dir, 'manifest.json'), os.path.join(cache_dir, 'vocab.txt')]
+    frequencies = os.path.join(output_dir, 'word_frequencies.csv')
+    pairs = os.path.join(output_dir, 'cooccurrence_pairs.csv')
+    corpus_arguments = ['--data-dir', data_dir, '--cache-dir', cache_dir]
+    counted, count_arguments = tokens, corpus_arguments
+    deduplication = {}
+    if dedup_file:
+        duplicates_dir = os.path.join(output_dir, 'duplicates')
+        deduplication['duplicates'] = {
+            'command': 'duplicates',
+            'module': 'near_duplicates',
+            'arguments': corpus_arguments + ['--output-dir', duplicates_dir, '--plan', dedup_file],
+            'inputs': tokens,
+            'outputs': [dedup_file, os.path.join(duplicates_dir, 'clusters.csv'),
+                        os.path.join(duplicates_dir, 'boilerplate.csv')],
+            'parameters': {},
+        }
+        counted, count_arguments = tokens + [dedup_file], corpus_arguments + ['--dedup', dedup_file]
+    stages = {
+        'tokens': {
+            'command': 'tokenize',
+            'module': 'token_store',
+            'arguments': corpus_arguments,
+            'inputs': [data_dir],
+            'outputs': tokens,
+            'parameters': {},
+        },
+        **deduplication,
+        'frequencies': {
+            'command': 'frequencies',
+            'module': 'extract_word_frequencies',
+            'arguments': count_arguments + ['--output-dir', output_dir],
+            'inputs': counted,
+            'outputs': [frequencies],
+            'parameters': {},
+        },
+        'frequency_charts': {
+            'command': 'frequency-charts',
+            'module': 'visualize_frequencies',
+            'arguments': ['--input', frequencies, '--output-dir', output_dir],
+            'inputs': [frequencies],
+            'outputs': [os.path.join(output_dir, 'top_words_bar_chart.png'), os.path.join(output_dir, 'wordcloud.png')],
+            'parameters': {},
+        },
+        'cooccurrences': {
+            'command': 'cooccurrences',
+            'module': 'compute_cooccurrences',
+            'arguments': count_arguments + ['--output-dir', output_dir],
+            'inputs': counted,
+            'outputs': [pairs],
+            'parameters': {},
+        },
+        'network': {
+            'command': 'network',
+            'module': 'visualize_lexical_network',
+            'arguments': ['--input', pairs, '--output-dir', output_dir],
+            'inputs': [pairs],
+            'outputs': [os.path.join(output_dir, 'lexical_network.png'),
+                        os.path.join(output_dir, 'lexical_network.graphml')],
+            'parameters': {'threshold': 5},
+        },
+    }
+    for stage in stages.values():
+        stage['metrics'] = os.path.join(output_dir, 'metrics', stage['module'] + '.json')
+        stage['arguments'] = stage['arguments'] + ['--metrics', stage['metrics']]
+    return stages
+
+
+STAGES = pipeline_stages(dedup_file=DEDUP_FILE)
+
+
+# --- HASHING ---
+
+def path_hash(path):
+    """SHA-256 of a file, or of the names and contents of the files of a directory; None if missing."""
+    if os.path.isfile(path):
+        return file_sha256(path)
+    if not os.path.isdir(path):
+        return None
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            digest.update(f"{os.path.relpath(file_path, path)}\0{file_sha256(file_path)}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def local_imports(module, package_dir=PACKAGE_DIR):
+    """The module file and every module of ``package_dir`` it imports (relative imports), directly or not."""
+    pending, seen = [module + '.py'], set()
+    while pending:
+        name = pending.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        with open(os.path.join(package_dir, name), 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if not (isinstance(node, ast.ImportFrom) and node.level == 1):
+                continue
+            # from .module import name, or from . import module
+            modules = [node.module] if node.module else [alias.name for alias in node.names]
+            pending.extend(module + '.py' for module in modules
+                           if os.path.exists(os.path.join(package_dir, module + '.py')))
+    return sorted(seen)
+
+
+def stage_key(stage, parameters):
+    digest = hashlib.sha256()
+    for module in local_imports(stage['module']):
+        digest.update(f"{module}\0{file_sha256(os.path.join(PACKAGE_DIR, module))}\n".encode('utf-8'))
+    kept = {name: value for name, value in parameters.items() if name not in RUNTIME_PARAMETERS}
+    digest.update(json.dumps(kept, sort_keys=True).encode('utf-8'))
+    for path in stage['inputs']:
+        digest.update(f"{path}\0{path_hash(path)}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+# --- STATE ---
+
+def load_state(path=STATE_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_state(state, path=STATE_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def up_to_date(record, key, stage):
+    """The stage ran with this key and its outputs are unchanged since."""
+    return (record is not None and record['key'] == key and
+            all(record['outputs'].get(path) == path_hash(path) for path in stage['outputs']))
+
+
+# --- SCHEDULING ---
+
+def dependencies(stages):
+    """{stage: stages producing one of its inputs}."""
+    producers = {path: name for name, stage in stages.items() for path in stage['outputs']}
+    return {
+        name: sorted({producers[path] for path in stage['inputs'] if path in producers} - {name})
+        for name, stage in stages.items()
+    }
+
+
+def topological_order(stages):
+    requires = dependencies(stages)
+    order, done = [], set()
+    while len(order) < len(stages):
+        ready = [name for name in stages if name not in done and set(requires[name]) <= done]
+        if not ready:
+            raise ValueError("the pipeline stages have a dependency cycle")
+        order.extend(ready)
+        done.update(ready)
+    return order
+
+
+def command(stage, parameters):
+    arguments = []
+    for name, value in parameters.items():
+        arguments += [f"--{name.replace('_', '-')}", str(value)]
+    return [sys.executable, '-m', PACKAGE, stage['command']] + stage['arguments'] + arguments
+
+
+def run_stage(name, stage, parameters):
+    """Run one stage command; returns (name, seconds, completed process)."""
+    # The package is importable from the stage process whatever the working directory
+    environment = dict(os.environ)
+    environment['PYTHONPATH'] = os.pathsep.join(
+        [os.path.dirname(PACKAGE_DIR)] + [path for path in [os.environ.get('PYTHONPATH')] if path])
+    start = time.perf_counter()
+    process = subprocess.run(command(stage, parameters), capture_output=True, text=True, env=environment)
+    return name, time.perf_counter() - start, process
+
+
+def stage_report(stage):
+    """Summary of the metrics report written by the stage command, or None."""
+    path = stage['metrics']
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        report = json.load(f)
+    return {
+        'path': path,
+        'peak_rss_mb': report['peak_rss_mb'],
+        'stages': {name: step['seconds'] for name, step in report['stages'].items()},
+    }
+
+
+def run_pipeline(stages, parameters, jobs=1, force=(), dry_run=False, state_path=STATE_FILE, metrics=None):
+    """
+    Run the out-of-date stages, each as soon as its dependencies are done.
+
+    A stage is (re)run when its key changed (inputs are hashed once its
+    dependencies are done, so it re-runs when they wrote different outputs),
+    when one of its outputs differs from what it wrote, or when it is in
+    ``force``. Returns {stage: 'skipped' | 'ran' | 'failed' | 'blocked' | 'pending'}.
+    Stages that ran are added to ``metrics`` (a ``RunMetrics``) if given.
+    """
+    requires = dependencies(stages)
+    state = load_state(state_path)
+    status = {}
+
+    def schedule(name):
+        # Keys can only be computed once the inputs produced upstream exist
+        if any(status[dep] in ('failed', 'blocked') for dep in requires[name]):
+            status[name] = 'blocked'
+            return None
+        key = stage_key(stages[name], parameters[name])
+        # In a dry run, the inputs of a stage downstream of a pending one are not written yet
+        upstream_pending = any(status[dep] == 'pending' for dep in requires[name])
+        if not (upstream_pending or name in force) and up_to_date(state.get(name), key, stages[name]):
+            status[name] = 'skipped'
+            print(f"[{name}] up to date, skipped")
+            return None
+        return key
+
+    remaining = topological_order(stages)
+    running = {}
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        while remaining or running:
+            for name in list(remaining):
+                if any(dep not in status or status[dep] == 'running' for dep in requires[name]):
+                    continue
+                remaining.remove(name)
+                key = schedule(name)
+                if key is not None and dry_run:
+                    status[name] = 'pending'
+                    print(f"[{name}] would run: {' '.join(command(stages[name], parameters[name])[1:])}")
+                elif key is not None:
+                    status[name] = 'running'
+                    print(f"[{name}] running")
+                    running[executor.submit(run_stage, name, stages[name], parameters[name])] = key
+
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                key = running.pop(future)
+                name, seconds, process = future.result()
+                if metrics is not None:
+                    report = stage_report(stages[name]) if process.returncode == 0 else None
+                    metrics.add_stage(name, round(seconds, 3), exit_code=process.returncode, report=report)
+                if process.returncode != 0:
+                    status[name] = 'failed'
+                    print(f"[{name}] FAILED after {seconds:.1f} s (exit code {process.returncode})")
+                    print(process.stdout + process.stderr, end='')
+                    continue
+                status[name] = 'ran'
+                state[name] = {
+                    'key': key,
+                    'outputs': {path: path_hash(path) for path in stages[name]['outputs']},
+                    'seconds': round(seconds, 3),
+                }
+                save_state(state, state_path)
+                print(f"[{name}] done in {seconds:.1f} s")
+    return status
+
+
+# --- MAIN ---
+
+def parse_settings(settings, stages):
+    """{stage: {parameter: value}} from the defaults and ``stage.parameter=value`` overrides."""
+    parameters = {name: dict(stage['parameters']) for name, stage in stages.items()}
+    for setting in settings:
+        target, _, value = setting.partition('=')
+        name, _, parameter = target.partition('.')
+        if name not in stages or not parameter or not value:
+            raise ValueError(f"invalid setting {setting!r}, expected stage.parameter=value")
+        parameters[name][parameter] = value
+    return parameters
+
+
+def add_arguments(parser):
+    parser.add_argument('--data-dir', default=DATA_DIR, help=f"directory of the .txt articles (default: {DATA_DIR})")
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help=f"token cache directory (default: {CACHE_DIR})")
+    parser.add_argument('--output-dir', default=OUTPUT_DIR, help=f"output directory (default: {OUTPUT_DIR})")
+    parser.add_argument('--state-file', default=STATE_FILE, help=f"pipeline state (default: {STATE_FILE})")
+    parser.add_argument('--jobs', type=int, default=2, help="stages run at the same time (default: 2)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="--workers passed to the corpus stages (tokens, duplicates, frequencies, cooccurrences)")
+    parser.add_argument('--dedup', nargs='?', const=DEDUP_FILE, default=None, metavar='PLAN',
+                        help=f"add the duplicates stage, writing PLAN (default: {DEDUP_FILE}), and count "
+                             f"without the near-duplicates and repeated passages it finds")
+    parser.add_argument('--set', action='append', default=[], metavar='STAGE.PARAMETER=VALUE',
+                        help="stage parameter, passed as --parameter value (e.g. network.threshold=8)")
+    parser.add_argument('--force', nargs='*', default=None, metavar='STAGE',
+                        help="re-run these stages (all of them without names)")
+    parser.add_argument('--dry-run', action='store_true', help="only show which stages would run")
+    parser.add_argument('--stages', nargs='+', default=None, choices=sorted(STAGES),
+                        help="only run these stages (their inputs must exist)")
+    add_metrics_arguments(parser)
+
+def run(args):
+    metrics = stage_metrics.from_arguments('run_pipeline', args)
+    if args.profile:
+        # Inherited by the stage commands
+        os.environ[PROFILE_ENV] = os.path.abspath(args.profile)
+    if args.vocabulary_growth:
+        os.environ[GROWTH_ENV] = '1'
+
+    all_stages = pipeline_stages(args.data_dir, args.cache_dir, args.output_dir, args.dedup)
+    if args.stages and 'duplicates' in args.stages and not args.dedup:
+        raise UsageError("the duplicates stage only runs with --dedup")
+    stages = {name: all_stages[name] for name in (args.stages or all_stages)}
+    try:
+        parameters = parse_settings(args.set, stages)
+    except ValueError as error:
+        raise UsageError(str(error))
+    if args.workers is not None:
+        for name in ('tokens', 'duplicates', 'frequencies', 'cooccurrences'):
+            if name in parameters:
+                parameters[name]['workers'] = args.workers
+    force = set(stages) if args.force == [] else set(args.force or ())
+
+    start = time.perf_counter()
+    status = run_pipeline(stages, parameters, args.jobs, force, args.dry_run, args.state_file, metrics)
+    counts = {value: sum(1 for s in status.values() if s == value) for value in sorted(set(status.values()))}
+    print(f"Pipeline finished in {time.perf_counter() - start:.1f} s: "
+          + ', '.join(f"{count} {value}" for value, count in counts.items()))
+    if not args.dry_run:
+        metrics.write()
+    if any(value in ('failed', 'blocked') for value in status.values()):
+        sys.exit(1)
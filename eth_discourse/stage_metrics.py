@@ -0,0 +1,234 @@
+"""
+Structured run metrics of the analysis scripts.
+
+Every command fills a ``RunMetrics`` report and writes it as JSON when it
+finishes (``outputs/metrics/<module>.json`` by default, ``--metrics FILE``):
+
+- wall time of each stage (``with metrics.stage('count'):``)
+- memory of each stage: ``peak_rss_increase_mb``, how much the stage raised
+  the peak RSS of the process (zero unless it set a new peak), and
+  ``cumulative_peak_rss_mb``, the peak RSS of the process so far, which
+  never decreases: every stage after the heaviest one repeats its value
+- documents, bytes and tokens read by each stage
+- the slowest documents of each stage, with their time, bytes and tokens
+- the corpus size (documents and tokens, from the token store manifest)
+
+Per-document costs are recorded by the corpus loops with ``timed_document``
+or ``record_document``, in worker processes too: ``corpus_parallel`` sends
+them back with every shard result. When a run gets slower, comparing its
+report with an earlier one shows which stage, and which documents, changed.
+
+Profiling is opt-in: with ``--profile DIR``, or the ``PIPELINE_PROFILE_DIR``
+environment variable (set for every stage by ``pipeline --profile``),
+each stage runs under cProfile and its statistics are dumped to
+``DIR/<module>.<stage>.prof``, to be read with ``python -m pstats``. Only the
+main process is profiled, not the worker processes.
+
+The vocabulary growth curve (distinct words after the first k documents, in
+corpus order) reads every document once more, so it is opt-in too:
+``--vocabulary-growth``, or the ``PIPELINE_VOCABULARY_GROWTH`` environment
+variable (set by ``pipeline --vocabulary-growth``).
+"""
+
+import cProfile
+import heapq
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from .config import METRICS_DIR
+from .memory_usage import peak_rss_bytes
+
+PROFILE_ENV = 'PIPELINE_PROFILE_DIR'
+GROWTH_ENV = 'PIPELINE_VOCABULARY_GROWTH'
+# Slowest documents listed for each stage
+SLOWEST_DOCUMENTS = 10
+# Points of the vocabulary growth curve
+GROWTH_POINTS = 50
+
+# Documents processed by this process since the last drain: (name, seconds, bytes, tokens)
+_documents = []
+
+
+# --- PER-DOCUMENT COSTS ---
+
+def record_document(name, seconds, nbytes=0, tokens=0):
+    _documents.append((name, seconds, nbytes, tokens))
+
+
+@contextmanager
+def timed_document(name, store=None):
+    """
+    Record the time spent in the block on document ``name``.
+
+    With a token store, the document's tokens and the bytes of its token IDs
+    are recorded too.
+    """
+    start = time.perf_counter()
+    yield
+    seconds = time.perf_counter() - start
+    if store is None:
+        record_document(name, seconds)
+    else:
+        tokens = store.manifest[name]['tokens']
+        record_document(name, seconds, tokens * store.token_bytes, tokens)
+
+
+def drain_documents():
+    """Return and forget the documents recorded by this process."""
+    global _documents
+    drained, _documents = _documents, []
+    return drained
+
+
+def add_documents(documents):
+    """Add documents recorded by a worker process."""
+    _documents.extend(documents)
+
+
+def vocabulary_growth(store, documents=None, points=GROWTH_POINTS):
+    """``[documents, tokens, distinct words]`` after the first k documents, for about ``points`` values of k."""
+    # Imported here: the commands that never open a token store do not load NumPy
+    import numpy as np
+
+    documents = store.documents if documents is None else documents
+    seen = np.zeros(len(store.vocabulary), dtype=bool)
+    step = max(1, -(-len(documents) // points))
+    curve, tokens, distinct = [], 0, 0
+    for k, name in enumerate(documents, 1):
+        ids = store.token_ids(name)
+        new = np.unique(ids[~seen[ids]])
+        seen[new] = True
+        tokens += len(ids)
+        distinct += len(new)
+        if k % step == 0 or k == len(documents):
+            curve.append([k, tokens, distinct])
+    return curve
+
+
+# --- RUN REPORT ---
+
+def _megabytes(nbytes):
+    return None if nbytes is None else round(nbytes / (1024 * 1024), 1)
+
+
+class RunMetrics:
+    """Stage timings, reads, slowest documents and peak RSS of one script run."""
+
+    def __init__(self, script, path=None, profile_dir=None, slowest=SLOWEST_DOCUMENTS, growth=False):
+        self.script = script
+        self.path = path or os.path.join(METRICS_DIR, script + '.json')
+        self.profile_dir = profile_dir or os.environ.get(PROFILE_ENV) or None
+        self.growth = growth or bool(os.environ.get(GROWTH_ENV))
+        self.slowest = slowest
+        self.started = datetime.now().isoformat(timespec='seconds')
+        self.stages = {}
+        self.corpus = None
+        self._start = time.perf_counter()
+        self._current = None
+        # Documents recorded before the first stage are not attributed to it
+        drain_documents()
+
+    @contextmanager
+    def stage(self, name):
+        """Time the block as stage ``name`` (a repeated name adds to the same stage)."""
+        stage = self.stages.setdefault(name, {
+            'seconds': 0.0, 'documents_read': 0, 'bytes_read': 0, 'tokens': 0, 'slowest_documents': [],
+        })
+        previous, self._current = self._current, stage
+        profiler = cProfile.Profile() if self.profile_dir else None
+        start_peak = peak_rss_bytes()
+        start = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield stage
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            stage['seconds'] += time.perf_counter() - start
+            peak = peak_rss_bytes()
+            if peak is not None:
+                stage['peak_rss_increase_mb'] = round(
+                    stage.get('peak_rss_increase_mb', 0) + _megabytes(peak - start_peak), 1)
+            stage['cumulative_peak_rss_mb'] = _megabytes(peak)
+            self._add_documents(stage, drain_documents())
+            self._current = previous
+            if profiler is not None:
+                os.makedirs(self.profile_dir, exist_ok=True)
+                profiler.dump_stats(os.path.join(self.profile_dir, f"{self.script}.{name}.prof"))
+
+    def _add_documents(self, stage, documents):
+        stage['documents_read'] += len(documents)
+        stage['bytes_read'] += sum(document[2] for document in documents)
+        stage['tokens'] += sum(document[3] for document in documents)
+        slowest = [(d['seconds'], d['document'], d['bytes'], d['tokens']) for d in stage['slowest_documents']]
+        slowest += [(seconds, name, nbytes, tokens) for name, seconds, nbytes, tokens in documents]
+        stage['slowest_documents'] = [
+            {'document': name, 'seconds': seconds, 'bytes': nbytes, 'tokens': tokens}
+            for seconds, name, nbytes, tokens in heapq.nlargest(self.slowest, slowest)
+        ]
+
+    def add(self, **counters):
+        """Add to counters of the current stage, e.g. ``bytes_read`` of a file read whole."""
+        for name, value in counters.items():
+            self._current[name] = self._current.get(name, 0) + value
+
+    def add_stage(self, name, seconds, **details):
+        """Record a stage timed elsewhere (e.g. a subprocess)."""
+        self.stages[name] = {'seconds': seconds, **details}
+
+    def record_corpus(self, store, documents=None):
+        """
+        Size of the documents of a token store, from its manifest, and with
+        ``growth`` their vocabulary growth curve (a pass over every document).
+        """
+        documents = store.documents if documents is None else documents
+        self.corpus = {
+            'documents': len(documents),
+            'tokens': sum(store.token_count(name) for name in documents),
+        }
+        if self.growth:
+            growth = vocabulary_growth(store, documents)
+            self.corpus['vocabulary'] = growth[-1][2] if growth else 0
+            self.corpus['vocabulary_growth'] = {'columns': ['documents', 'tokens', 'vocabulary'], 'points': growth}
+
+    def report(self):
+        stages = {}
+        for name, stage in self.stages.items():
+            stage = dict(stage, seconds=round(stage['seconds'], 4))
+            if 'slowest_documents' in stage:
+                stage['slowest_documents'] = [dict(d, seconds=round(d['seconds'], 6))
+                                              for d in stage['slowest_documents']]
+            stages[name] = stage
+        return {
+            'script': self.script,
+            'argv': sys.argv[1:],
+            'started': self.started,
+            'seconds': round(time.perf_counter() - self._start, 4),
+            'peak_rss_mb': _megabytes(peak_rss_bytes()),
+            'profile_dir': self.profile_dir,
+            'stages': stages,
+            'corpus': self.corpus,
+        }
+
+    def write(self):
+        """Write the report to ``self.path`` and print a one-line summary."""
+        report = self.report()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=1, ensure_ascii=False)
+        os.replace(self.path + '.tmp', self.path)
+        timings = ', '.join(f"{name} {stage['seconds']:.2f} s" for name, stage in report['stages'].items())
+        print(f"Metrics written to {self.path} ({timings})")
+        return report
+
+
+# --- COMMAND LINE ---
+
+def from_arguments(script, args):
+    """Report of a command run with ``config.add_metrics_arguments`` options."""
+    return RunMetrics(script, args.metrics, args.profile, growth=args.vocabulary_growth)
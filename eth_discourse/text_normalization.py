@@ -0,0 +1,106 @@
+"""
+Shared text normalization: cleaning rules, stopwords and tokenizer.
+
+Every analysis stage cleans and tokenizes the corpus through this module, so
+the rules exist in one place and are compiled once at import time:
+
+1. lowercase the text;
+2. drop URLs, then e-mail addresses, then Ethereum addresses (``0x`` + 40
+   hex digits); each rule only scans the text when its marker substring
+   (``http``, ``@``, ``0x``) is present, which a C-level ``in`` test decides;
+3. drop punctuation and digits with a single character-class regex pass;
+4. split on whitespace and keep words of 3+ characters that are not stopwords.
+
+The choices follow benchmarks/bench_text_normalization.py: a single
+alternation of the three structured rules is bounded by the e-mail branch,
+tried at every position (~45 MB/s), while gated passes run at ~1 GB/s when
+no ``@`` is present; ``str.translate`` with deletions is ~4x slower than the
+character-class regex on non-ASCII text.
+
+``TextNormalizer`` counts how often each rule fires (``hits``): the number of
+matches removed for the structured rules, the number of characters removed
+for ``punctuation_digits``.
+"""
+
+import re
+import string
+from collections import Counter
+
+# --- MINIMAL SYNTAXIC STOPWORDS (strict STS filtering) ---
+
+STOPWORDS_MINIMAL = frozenset([
+    'the', 'and', 'of', 'to', 'in', 'for', 'is', 'on', 'that', 'with', 'as',
+    'by', 'it', 'are', 'at', 'from', 'an', 'be', 'or', 'we', 'can',
+    'have', 'has', 'our', 'also', 'which', 'their', 'will', 'all',
+    'but', 'was', 'they', 'these', 'may', 'you', 'been', 'its',
+    'if', 'do', 'does', 'did', 'because', 'however', 'therefore', 'thus',
+    'when', 'then', 'now', 'always', 'never', 'this', 'a',
+    'very', 'most', 'some', 'many', 'such', 'would', 'could', 'should'
+])
+
+MIN_WORD_LENGTH = 3
+
+# --- CLEANING RULES ---
+
+# (name, marker substring required for a match, pattern), applied in this order
+STRUCTURED_RULES = [
+    ('url', 'http', re.compile(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\,]|(?:%[0-9a-fA-F][0-9a-fA-F]))+')),
+    ('email', '@', re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')),
+    ('eth_address', '0x', re.compile(r'0x[a-fA-F0-9]{40,}')),
+]
+
+# ASCII punctuation and every Unicode digit
+PUNCTUATION_DIGITS = re.compile('[' + re.escape(string.punctuation) + r'\d]+')
+
+
+class TextNormalizer:
+    """Compiled cleaner and tokenizer that counts how often each rule fires."""
+
+    def __init__(self, stopwords=STOPWORDS_MINIMAL, min_length=MIN_WORD_LENGTH):
+        self.stopwords = stopwords
+        self.min_length = min_length
+        self.hits = Counter()
+
+    def strip(self, text):
+        """Steps 1-3: lowercase and remove every matched span, whitespace untouched."""
+        text = text.lower()
+        for name, marker, pattern in STRUCTURED_RULES:
+            if marker in text:
+                text, count = pattern.subn('', text)
+                self.hits[name] += count
+
+        length = len(text)
+        text = PUNCTUATION_DIGITS.sub('', text)
+        self.hits['punctuation_digits'] += length - len(text)
+        return text
+
+    def clean(self, text):
+        """Cleaned text with whitespace runs collapsed to single spaces."""
+        return ' '.join(self.strip(text).split())
+
+    def tokenize(self, text):
+        """Clean ``text`` and return its words, filtered like ``tokenize_strict``."""
+        stopwords = self.stopwords
+        min_length = self.min_length
+        return [word for word in self.strip(text).split()
+                if len(word) >= min_length and word not in stopwords]
+
+
+DEFAULT_NORMALIZER = TextNormalizer()
+
+
+# --- FUNCTIONAL API ---
+
+def clean_text_advanced(text):
+    return DEFAULT_NORMALIZER.clean(text)
+
+
+def tokenize_strict(text, stopwords=STOPWORDS_MINIMAL):
+    tokens = text.split()
+    clean_tokens = [word for word in tokens if word not in stopwords and len(word) >= MIN_WORD_LENGTH]
+    return clean_tokens
+
+
+def tokenize_document(content):
+    """Clean and tokenize a raw document in one go (same result as tokenize_strict(clean_text_advanced(...)))."""
+    return DEFAULT_NORMALIZER.tokenize(content)
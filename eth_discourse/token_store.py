@@ -0,0 +1,281 @@
+"""
+Tokenized corpus store shared by the frequency and co-occurrence stages.
+
+Every document of the corpus is cleaned and tokenized once, encoded as a
+stream of integer token IDs and saved as a compact ``.npy`` array. A single
+vocabulary file maps the IDs back to words. The analysis scripts memory-map
+these arrays instead of re-reading and re-tokenizing the text files, and a
+document is only tokenized again when its content hash changes.
+
+The corpus is either a directory of .txt files (documents named by filename)
+or a single columnar corpus file from ``corpus_store`` (documents named by
+article id, only the ``content`` column is tokenized).
+
+Layout of the cache directory::
+
+    manifest.json        tokenizer fingerprint, generation + {filename: {sha256, tokens}}
+    vocab.txt            one word per line, line number = token ID
+    tokens/<sha256>.npy  uint32 token IDs of one document
+"""
+
+import json
+import os
+import time
+import uuid
+
+import numpy as np
+
+from .config import add_corpus_arguments, add_metrics_arguments, corpus_source
+from .corpus_manifest import file_sha256, tokenizer_fingerprint
+from .corpus_parallel import map_shards
+from . import stage_metrics
+from .stage_metrics import record_document
+from . import text_normalization
+from .text_normalization import tokenize_document
+
+TOKEN_DTYPE = np.uint32
+TOKEN_BYTES = np.dtype(TOKEN_DTYPE).itemsize
+MANIFEST_FILE = 'manifest.json'
+VOCAB_FILE = 'vocab.txt'
+TOKENS_DIR = 'tokens'
+
+
+def _tokenize_files(filenames, tokenize, data_dir):
+    tokenized = []
+    for filename in filenames:
+        start = time.perf_counter()
+        path = os.path.join(data_dir, filename)
+        with open(path, 'r', encoding='utf-8') as f:
+            tokenized.append(tokenize(f.read()))
+        record_document(filename, time.perf_counter() - start, os.path.getsize(path), len(tokenized[-1]))
+    return tokenized
+
+
+def _tokenize_rows(ids, tokenize, corpus_file):
+    # corpus_store (pandas, pyarrow) is only imported for a corpus file
+    from . import corpus_store
+
+    tokenized = []
+    for doc_id, content in zip(ids, corpus_store.read_contents(corpus_file, ids)):
+        start = time.perf_counter()
+        tokenized.append(tokenize(content))
+        record_document(doc_id, time.perf_counter() - start, len(content.encode('utf-8')), len(tokenized[-1]))
+    return tokenized
+
+
+def corpus_hashes(source):
+    """{document name: SHA-256} of a .txt directory or of a corpus file."""
+    if os.path.isdir(source):
+        filenames = sorted(f for f in os.listdir(source) if f.endswith('.txt'))
+        return {filename: file_sha256(os.path.join(source, filename)) for filename in filenames}
+    from . import corpus_store
+    return corpus_store.content_hashes(source)
+
+
+def _write_atomic(path, text):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class TokenStore:
+    """
+    On-disk store of integer-encoded documents.
+
+    Documents are listed in sorted filename order so that every stage reading
+    the store sees the corpus in the same, reproducible order.
+    """
+
+    token_bytes = TOKEN_BYTES
+
+    def __init__(self, cache_dir, fingerprint):
+        self.cache_dir = cache_dir
+        self.fingerprint = fingerprint
+        self.tokens_dir = os.path.join(cache_dir, TOKENS_DIR)
+        self.vocabulary = []
+        self.word_ids = {}
+        self.manifest = {}
+        # Changes whenever token IDs are reassigned from scratch
+        self.generation = uuid.uuid4().hex
+        self._vocab_array = None
+        self._load()
+
+    def __getstate__(self):
+        # Sent to worker processes: the cached object array is rebuilt on demand
+        state = self.__dict__.copy()
+        state['_vocab_array'] = None
+        return state
+
+    # --- LOADING / SAVING ---
+
+    def _load(self):
+        manifest_path = os.path.join(self.cache_dir, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            return
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            stored = json.load(f)
+        if stored.get('fingerprint') != self.fingerprint or 'generation' not in stored:
+            # Cleaning rules changed (or older cache format): every cached document is stale
+            return
+        with open(os.path.join(self.cache_dir, VOCAB_FILE), 'r', encoding='utf-8') as f:
+            self.vocabulary = f.read().split('\n')[:-1]
+        self.word_ids = {word: i for i, word in enumerate(self.vocabulary)}
+        self.manifest = stored['documents']
+        self.generation = stored['generation']
+
+    def _save(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        _write_atomic(
+            os.path.join(self.cache_dir, VOCAB_FILE),
+            ''.join(word + '\n' for word in self.vocabulary)
+        )
+        _write_atomic(
+            os.path.join(self.cache_dir, MANIFEST_FILE),
+            json.dumps({
+                'fingerprint': self.fingerprint,
+                'generation': self.generation,
+                'documents': self.manifest,
+            }, indent=1)
+        )
+
+    # --- BUILDING ---
+
+    def encode(self, tokens):
+        """Map words to IDs, appending unseen words to the vocabulary."""
+        word_ids = self.word_ids
+        ids = []
+        for word in tokens:
+            word_id = word_ids.get(word)
+            if word_id is None:
+                word_id = len(self.vocabulary)
+                word_ids[word] = word_id
+                self.vocabulary.append(word)
+            ids.append(word_id)
+        self._vocab_array = None
+        return np.asarray(ids, dtype=TOKEN_DTYPE)
+
+    def update(self, source, tokenize, workers=1):
+        """
+        Synchronize the store with ``source``, a .txt directory or a corpus file.
+
+        Only documents whose SHA-256 differs from the manifest are read and
+        passed to ``tokenize`` (a module-level function text -> list of words),
+        across ``workers`` processes. Token IDs are assigned in corpus order,
+        whatever the number of workers. Entries of deleted documents are
+        dropped. Returns the list of re-tokenized files.
+        """
+        os.makedirs(self.tokens_dir, exist_ok=True)
+        if os.path.isdir(source):
+            tokenize_shard, location = _tokenize_files, {'data_dir': source}
+        else:
+            tokenize_shard, location = _tokenize_rows, {'corpus_file': source}
+
+        manifest = {}
+        stale = []
+        for filename, sha in sorted(corpus_hashes(source).items()):
+            entry = self.manifest.get(filename)
+            if entry is not None and entry['sha256'] == sha and os.path.exists(self._array_path(sha)):
+                manifest[filename] = entry
+            else:
+                manifest[filename] = {'sha256': sha}
+                stale.append(filename)
+
+        pending = iter(stale)
+        for tokenized in map_shards(tokenize_shard, stale, workers, tokenize=tokenize, **location):
+            for tokens in tokenized:
+                entry = manifest[next(pending)]
+                ids = self.encode(tokens)
+                np.save(self._array_path(entry['sha256']), ids)
+                entry['tokens'] = int(len(ids))
+
+        changed = bool(stale) or manifest.keys() != self.manifest.keys()
+        self.manifest = manifest
+        if changed:
+            self._save()
+            self._remove_orphans()
+        return stale
+
+    def _remove_orphans(self):
+        live = {entry['sha256'] + '.npy' for entry in self.manifest.values()}
+        for name in os.listdir(self.tokens_dir):
+            if name not in live:
+                os.remove(os.path.join(self.tokens_dir, name))
+
+    def _array_path(self, sha):
+        return os.path.join(self.tokens_dir, sha + '.npy')
+
+    # --- READING ---
+
+    @property
+    def documents(self):
+        return sorted(self.manifest)
+
+    @property
+    def vocabulary_array(self):
+        """Vocabulary as a NumPy object array, for vectorized ID -> word lookups."""
+        if self._vocab_array is None:
+            self._vocab_array = np.array(self.vocabulary, dtype=object)
+        return self._vocab_array
+
+    def word_ranks(self):
+        """Alphabetical rank of every token ID, used to sort and orient words by ID."""
+        vocabulary = self.vocabulary
+        ranks = np.empty(len(vocabulary), dtype=np.int64)
+        ranks[sorted(range(len(vocabulary)), key=vocabulary.__getitem__)] = np.arange(len(vocabulary))
+        return ranks
+
+    def token_count(self, filename):
+        """Tokens of one document, from the manifest."""
+        return self.manifest[filename]['tokens']
+
+    def token_ids(self, filename):
+        """Memory-mapped uint32 array of the token IDs of one document."""
+        entry = self.manifest[filename]
+        if entry['tokens'] == 0:
+            return np.empty(0, dtype=TOKEN_DTYPE)
+        return np.load(self._array_path(entry['sha256']), mmap_mode='r')
+
+    def token_runs(self, filename):
+        """
+        Token IDs of one document as a list of contiguous runs, which windows
+        of consecutive tokens must not cross: the whole document here
+        (``near_duplicates.DedupedStore`` cuts it where passages were removed).
+        """
+        return [self.token_ids(filename)]
+
+    def tokens(self, filename):
+        vocabulary = self.vocabulary
+        return [vocabulary[i] for i in self.token_ids(filename).tolist()]
+
+
+def open_cached_store(cache_dir):
+    """Open an existing store as-is, without checking it against the corpus."""
+    with open(os.path.join(cache_dir, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+        fingerprint = json.load(f)['fingerprint']
+    return TokenStore(cache_dir, fingerprint)
+
+
+def open_token_store(source, cache_dir, tokenize, fingerprint, workers=1):
+    """Load the store from ``cache_dir``, refresh it against ``source`` and return it."""
+    store = TokenStore(cache_dir, fingerprint)
+    store.update(source, tokenize, workers=workers)
+    return store
+
+
+def add_arguments(parser):
+    add_corpus_arguments(parser)
+    add_metrics_arguments(parser)
+
+
+def run(args):
+    """Tokenize new or changed documents into the token store."""
+    metrics = stage_metrics.from_arguments('token_store', args)
+
+    with metrics.stage('tokenize'):
+        store = TokenStore(args.cache_dir, tokenizer_fingerprint(text_normalization))
+        stale = store.update(corpus_source(args), tokenize_document, workers=args.workers)
+    metrics.record_corpus(store)
+    print(f"Token store: {len(store.documents)} documents, {len(store.vocabulary):,} words, "
+          f"{len(stale)} (re)tokenized")
+    metrics.write()
@@ -0,0 +1,62 @@
+import os
+
+import matplotlib.pyplot as plt
+import pandas as pd
+from wordcloud import WordCloud
+
+from .config import OUTPUT_DIR, add_metrics_arguments, add_output_argument
+from . import stage_metrics
+
+# --- SETUP ---
+
+INPUT_FILE = os.path.join(OUTPUT_DIR, 'word_frequencies.csv')
+
+N = 30  # Nombre de mots à visualiser
+
+
+def add_arguments(parser):
+    parser.add_argument('--input', default=INPUT_FILE, help=f"word frequencies CSV (default: {INPUT_FILE})")
+    add_output_argument(parser)
+    parser.add_argument('--top', type=int, default=N, help=f"words in the bar chart (default: {N})")
+    add_metrics_arguments(parser)
+
+
+def run(args):
+    os.makedirs(args.output_dir, exist_ok=True)
+    metrics = stage_metrics.from_arguments('visualize_frequencies', args)
+
+    # --- LOAD DATA ---
+
+    with metrics.stage('load'):
+        df = pd.read_csv(args.input)
+        metrics.add(bytes_read=os.path.getsize(args.input))
+
+    # --- BAR CHART ---
+
+    with metrics.stage('bar_chart'):
+        top_words = df.head(args.top)
+
+        plt.figure(figsize=(12, 6))
+        plt.bar(top_words['word'], top_words['frequency'], color='skyblue')
+        plt.xticks(rotation=45, ha='right')
+        plt.title(f'Top {args.top} most frequent words (STS filtered)')
+        plt.tight_layout()
+        plt.savefig(os.path.join(args.output_dir, 'top_words_bar_chart.png'))
+        plt.close()
+
+    # --- WORD CLOUD ---
+
+    with metrics.stage('wordcloud'):
+        word_freq = dict(zip(df['word'], df['frequency']))
+
+        wordcloud = WordCloud(width=1600, height=800, background_color='white').generate_from_frequencies(word_freq)
+
+        plt.figure(figsize=(16, 8))
+        plt.imshow(wordcloud, interpolation='bilinear')
+        plt.axis('off')
+        plt.title('Word Cloud (STS filtered)')
+        plt.savefig(os.path.join(args.output_dir, 'wordcloud.png'))
+        plt.close()
+
+    print("Visualizations generated successfully.")
+    metrics.write()
@@ -0,0 +1,208 @@
+import json
+import os
+
+import matplotlib.pyplot as plt
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from .config import OUTPUT_DIR, add_metrics_arguments, add_output_argument
+from . import stage_metrics
+
+# --- SETUP ---
+
+INPUT_FILE = os.path.join(OUTPUT_DIR, 'cooccurrence_pairs.csv')
+# Node positions cached in the output directory
+LAYOUT_NAME = 'lexical_network_layout.json'
+LAYOUT_FILE = os.path.join(OUTPUT_DIR, LAYOUT_NAME)
+
+# Seuil de fréquence minimale pour garder les liaisons les plus significatives
+THRESHOLD = 5
+
+# Backbone: disparity filter significance level, or edges kept per node for top-k
+ALPHA = 0.05
+TOP_K = 10
+
+# The drawing is bounded whatever the corpus size: only the strongest nodes of
+# the backbone are laid out and drawn, and only the strongest of them labelled
+MAX_DRAWN_NODES = 300
+MAX_LABELS = 60
+LAYOUT_ITERATIONS = 50
+# Fewer iterations when most drawn nodes start from their cached position
+CACHED_LAYOUT_ITERATIONS = 10
+
+# --- BACKBONE EXTRACTION ---
+
+def node_codes(df):
+    """Integer code of every word, and the word1/word2 columns as codes."""
+    codes, words = pd.factorize(pd.concat([df['word1'], df['word2']], ignore_index=True))
+    return codes[:len(df)], codes[len(df):], words
+
+def disparity_alpha(source, target, weights, n_nodes):
+    """
+    Disparity filter (Serrano et al., 2009) p-value of every edge.
+
+    From each endpoint of degree k and strength s, the edge weight w is tested
+    against a uniform split of s over k edges: alpha = (1 - w/s) ** (k - 1).
+    An edge keeps the smaller of its two values (significant for either end).
+    """
+    weights = weights.astype(np.float64)
+    strength = np.bincount(source, weights, n_nodes) + np.bincount(target, weights, n_nodes)
+    degree = np.bincount(source, minlength=n_nodes) + np.bincount(target, minlength=n_nodes)
+
+    def endpoint_alpha(node):
+        alpha = (1 - weights / strength[node]) ** (degree[node] - 1)
+        # A single edge carries all the strength of its node: no test possible
+        return np.where(degree[node] > 1, alpha, 1.0)
+
+    return np.minimum(endpoint_alpha(source), endpoint_alpha(target))
+
+def top_k_edges(source, target, weights, k):
+    """Mask of the edges ranked in the k heaviest of at least one endpoint."""
+    edge = np.concatenate([np.arange(len(weights))] * 2)
+    node = np.concatenate([source, target])
+    weight = np.concatenate([weights, weights])
+
+    order = np.lexsort((edge, -weight, node))
+    node_sorted = node[order]
+    first = np.r_[0, np.flatnonzero(node_sorted[1:] != node_sorted[:-1]) + 1]
+    group_start = np.repeat(first, np.diff(np.r_[first, len(order)]))
+    rank = np.arange(len(order)) - group_start
+
+    keep = np.zeros(len(weights), dtype=bool)
+    keep[edge[order[rank < k]]] = True
+    return keep
+
+def backbone(df, method, alpha=ALPHA, top_k=TOP_K):
+    if method == 'none' or df.empty:
+        return df
+    source, target, words = node_codes(df)
+    weights = df['count'].to_numpy()
+    if method == 'disparity':
+        keep = disparity_alpha(source, target, weights, len(words)) < alpha
+    else:
+        keep = top_k_edges(source, target, weights, top_k)
+    return df[keep]
+
+# --- LAYOUT ---
+
+def load_layout(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return {word: np.array(xy) for word, xy in json.load(f).items()}
+
+def save_layout(path, positions):
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({word: [round(float(x), 6), round(float(y), 6)] for word, (x, y) in positions.items()}, f)
+    os.replace(path + '.tmp', path)
+
+def layout(G, cache_path, use_cache=True):
+    """
+    Force-directed positions of G, starting from the cached positions.
+
+    When every node already has a cached position it is reused as is.
+    Otherwise cached nodes are held fixed and only the new ones, starting at
+    random positions, move through the spring iterations (fewer when most
+    nodes are cached). The cache keeps the positions of every node ever laid
+    out, so they stay stable from one run to the next.
+    """
+    cached = load_layout(cache_path) if use_cache else {}
+    initial = {node: cached[node] for node in G if node in cached}
+    if len(initial) == len(G) and len(G) > 0:
+        return initial
+
+    iterations = CACHED_LAYOUT_ITERATIONS if len(initial) > len(G) / 2 else LAYOUT_ITERATIONS
+    pos = nx.spring_layout(G, pos=initial or None, fixed=list(initial) or None, seed=42, k=0.4,
+                           iterations=iterations, weight=None)
+    cached.update(pos)
+    save_layout(cache_path, cached)
+    return pos
+
+# --- MAIN ---
+
+def add_arguments(parser):
+    parser.add_argument('--input', default=INPUT_FILE,
+                        help=f"co-occurrence pairs CSV (default: {INPUT_FILE})")
+    add_output_argument(parser)
+    parser.add_argument('--threshold', type=int, default=THRESHOLD,
+                        help=f"smallest co-occurrence count kept (default: {THRESHOLD})")
+    parser.add_argument('--backbone', choices=['disparity', 'topk', 'none'], default='disparity',
+                        help="edge backbone extraction (default: disparity filter)")
+    parser.add_argument('--alpha', type=float, default=ALPHA,
+                        help=f"significance level of the disparity filter (default: {ALPHA})")
+    parser.add_argument('--top-k', type=int, default=TOP_K,
+                        help=f"edges kept per node with --backbone topk (default: {TOP_K})")
+    parser.add_argument('--max-nodes', type=int, default=MAX_DRAWN_NODES,
+                        help=f"strongest nodes drawn (default: {MAX_DRAWN_NODES})")
+    parser.add_argument('--fresh-layout', action='store_true',
+                        help="ignore the cached node positions")
+    add_metrics_arguments(parser)
+
+def run(args):
+    metrics = stage_metrics.from_arguments('visualize_lexical_network', args)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    # --- LOAD DATA ---
+
+    with metrics.stage('load'):
+        # Words such as 'nan' or 'null' are words here, not missing values
+        df = pd.read_csv(args.input, keep_default_na=False)
+        metrics.add(bytes_read=os.path.getsize(args.input))
+
+    # --- FILTER CO-OCCURRENCES ---
+
+    with metrics.stage('backbone'):
+        df_filtered = df[df['count'] >= args.threshold]
+        df_backbone = backbone(df_filtered, args.backbone, args.alpha, args.top_k)
+
+    # --- BUILD GRAPH ---
+
+    with metrics.stage('graph'):
+        G = nx.Graph()
+        G.add_weighted_edges_from(zip(
+            df_backbone['word1'].tolist(), df_backbone['word2'].tolist(), df_backbone['count'].tolist()
+        ))
+
+    # --- DRAW GRAPH ---
+
+    with metrics.stage('layout'):
+        strength = dict(G.degree(weight='weight'))
+        drawn = sorted(G, key=lambda node: (-strength[node], node))[:args.max_nodes]
+        H = G.subgraph(drawn)
+        pos = layout(H, os.path.join(args.output_dir, LAYOUT_NAME), use_cache=not args.fresh_layout)
+
+    with metrics.stage('draw'):
+        plt.figure(figsize=(14, 10))
+
+        # Épaisseur des arêtes proportionnelle aux cooccurrences
+        weights = np.array([H[u][v]['weight'] for u, v in H.edges()], dtype=np.float64)
+        widths = 0.2 + 2.8 * weights / weights.max() if len(weights) else []
+        nx.draw_networkx_edges(H, pos, edge_color='gray', width=widths, alpha=0.5)
+
+        # Noeuds (taille selon la force du noeud)
+        sizes = np.array([strength[node] for node in H], dtype=np.float64)
+        nx.draw_networkx_nodes(H, pos, node_color='skyblue',
+                               node_size=30 + 470 * np.sqrt(sizes / sizes.max()) if len(sizes) else [])
+
+        # Étiquettes (noeuds les plus forts seulement)
+        labels = {node: node for node in drawn[:MAX_LABELS]}
+        nx.draw_networkx_labels(H, pos, labels=labels, font_size=10)
+
+        plt.title('Lexical Co-occurrence Network (STS filtered)')
+        plt.axis('off')
+        plt.tight_layout()
+
+        plt.savefig(os.path.join(args.output_dir, 'lexical_network.png'))
+        plt.close()
+
+    # --- SAVE GRAPH STRUCTURE ---
+
+    with metrics.stage('write'):
+        nx.write_graphml(G, os.path.join(args.output_dir, 'lexical_network.graphml'))
+
+    print(f"Backbone ({args.backbone}): {G.number_of_edges():,} of {len(df_filtered):,} edges, "
+          f"{G.number_of_nodes():,} nodes; {H.number_of_nodes()} nodes drawn")
+    print("Lexical network visualizations generated successfully.")
+    metrics.write()